@@ -0,0 +1,261 @@
+import importlib
+import os
+import random
+import runpy
+import select
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import traceback
+from typing import List, Optional, Sequence
+
+# modules the children of algo_main spend their startup importing, imported once by the fork server so every child
+# forked from it starts with them loaded and shares their memory copy-on-write.
+PRELOAD_MODULES = ("websocket", "alpaca_trade_api", "pandas", "pandas_ta", "ta", "yahoo_fin.stock_info",
+                   "pytrader.marketData.marketData", "algo_main")
+FORK_SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "algo_forkserver.py")
+# forking children needs pidfds to watch them and fd passing to hand them their pipes, both linux only.
+FORK_SERVER_SUPPORTED = hasattr(os, "fork") and hasattr(os, "pidfd_open") and hasattr(socket, "send_fds")
+MAX_REQUEST_SIZE = 4096
+SERVER_EXIT_TIMEOUT = 5
+
+
+def preload(modules: Sequence[str] = PRELOAD_MODULES) -> List[str]:
+    """
+    Imports the modules, skipping any that fail to import. \n
+    :param modules: (list) names of the modules.
+    :return: (list) names of the modules that were imported.
+    """
+    loaded = []
+    for module in modules:
+        try:
+            importlib.import_module(module)
+            loaded.append(module)
+        except Exception as e:
+            print(f"fork server unable to preload {module}: {e}", file=sys.stderr)
+    return loaded
+
+
+def _reap(signum, frame):
+    """
+    SIGCHLD handler of the fork server, reaps every child that has exited.
+    """
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+
+def _runChild(control: socket.socket, fds: List[int], argv: List[str]):
+    """
+    Runs in the forked child, runs the script on the pipes it was handed as stdin and stdout and never returns.
+    """
+    code = 1
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGCHLD})
+        control.close()
+        os.dup2(fds[0], 0)
+        os.dup2(fds[1], 1)
+        for fd in fds:
+            os.close(fd)
+        sys.argv = argv
+        # every child would otherwise inherit the server's random state, and generate the same order ids.
+        random.seed()
+        runpy.run_path(argv[0], run_name="__main__")
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def serve(control: socket.socket):
+    """
+    Fork server loop, forks a child per request until algo_main closes the control socket.  A request is the child's
+    argv with its stdin and stdout pipes attached, and is answered with the child's pid and a pidfd for it. \n
+    :param control: (socket) seqpacket socket to algo_main.
+    """
+    signal.signal(signal.SIGCHLD, _reap)
+    while True:
+        message, fds, _, _ = socket.recv_fds(control, MAX_REQUEST_SIZE, 2)
+        if len(message) == 0:
+            return
+        argv = message.decode("UTF-8").split("\0")
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # the child can't be reaped until its pidfd is open, so its pid can't be reused by then.
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGCHLD})
+        try:
+            pid = os.fork()
+            if pid == 0:
+                _runChild(control, fds, argv)
+            pidfd = os.pidfd_open(pid)
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGCHLD})
+        for fd in fds:
+            os.close(fd)
+        try:
+            socket.send_fds(control, [struct.pack("!q", pid)], [pidfd])
+        finally:
+            os.close(pidfd)
+
+
+class ForkedProcess:
+    """
+    Child forked by the :class:`ForkServer`, with the parts of the subprocess.Popen interface that algo_main uses.
+    The fork server reaps its children, so their exit status isn't known and returncode is 0 once they have exited.
+    """
+
+    def __init__(self, name, pid, pidfd, stdin, stdout):
+        self.name = name
+        self.pid = pid
+        self.stdin = stdin
+        self.stdout = stdout
+        self.returncode = None
+        self.__pidfd = pidfd
+
+    def __del__(self):
+        self.__closePidfd()
+
+    @property
+    def pidfd(self):
+        """
+        pidfd of the child, readable once it has exited and closed once its exit has been collected.
+        """
+        return self.__pidfd
+
+    def poll(self):
+        """
+        Returns the returncode, None while the child is running.
+        """
+        return self.wait(0)
+
+    def wait(self, timeout=None):
+        """
+        Waits for the child to exit. \n
+        :param timeout: (float) seconds to wait for, forever if None.
+        :return: the returncode, None if the child is still running.
+        """
+        if self.returncode is None and self.__pidfd is not None:
+            if len(select.select([self.__pidfd], [], [], timeout)[0]) > 0:
+                self.returncode = 0
+                self.__closePidfd()
+        return self.returncode
+
+    def terminate(self):
+        self.__signal(signal.SIGTERM)
+
+    def kill(self):
+        self.__signal(signal.SIGKILL)
+
+    def __signal(self, signum):
+        if self.returncode is None and self.__pidfd is not None:
+            try:
+                signal.pidfd_send_signal(self.__pidfd, signum)
+            except ProcessLookupError:
+                pass
+
+    def __closePidfd(self):
+        if self.__pidfd is not None:
+            os.close(self.__pidfd)
+            self.__pidfd = None
+
+
+class ForkServer:
+    """
+    Template process that imports the modules the children need once, then forks a child per ticker, so each child
+    starts without paying for interpreter startup or the heavy imports and shares their memory copy-on-write.
+    """
+
+    def __init__(self, script=FORK_SERVER_SCRIPT):
+        """
+        :param script: (str) path of the fork server script.
+        """
+        self.__script = script
+        self.__process: Optional[subprocess.Popen] = None
+        self.__control: Optional[socket.socket] = None
+        self.__lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.__process is not None and self.__process.poll() is None
+
+    def start(self):
+        """
+        Starts the fork server, it preloads in the background and the first spawn waits for it.
+        """
+        if self.running:
+            return
+        if not FORK_SERVER_SUPPORTED:
+            raise OSError("the fork server needs fork, pidfds and fd passing, which this platform lacks.")
+        self.__control, server_control = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self.__process = subprocess.Popen([sys.executable, "-u", self.__script, str(server_control.fileno())],
+                                              pass_fds=[server_control.fileno()])
+        finally:
+            server_control.close()
+
+    def spawn(self, script, args=(), name=None):
+        """
+        Forks a child from the fork server that runs the script as __main__, with argv and pipes as if it had been
+        started by subprocess.Popen([sys.executable, "-u", script, *args], stdin=PIPE, stdout=PIPE). \n
+        :param script: (str) path of the script the child runs.
+        :param args: (list) arguments of the script.
+        :param name: name of the child.
+        :return: (ForkedProcess) the child.
+        """
+        child_stdin, stdin = os.pipe()
+        stdout, child_stdout = os.pipe()
+        try:
+            with self.__lock:
+                if not self.running:
+                    self.start()
+                request = "\0".join([script, *args]).encode("UTF-8")
+                socket.send_fds(self.__control, [request], [child_stdin, child_stdout])
+                message, fds, _, _ = socket.recv_fds(self.__control, 8, 1)
+            if len(message) == 0:
+                raise OSError("the fork server exited before forking the child.")
+        except BaseException:
+            os.close(stdin)
+            os.close(stdout)
+            raise
+        finally:
+            os.close(child_stdin)
+            os.close(child_stdout)
+        pid = struct.unpack("!q", message)[0]
+        return ForkedProcess(name, pid, fds[0], os.fdopen(stdin, "wb", 0), os.fdopen(stdout, "rb", 0))
+
+    def close(self):
+        """
+        Stops the fork server, children already forked carry on.
+        """
+        if self.__control is not None:
+            self.__control.close()
+            self.__control = None
+        if self.__process is not None:
+            try:
+                self.__process.wait(SERVER_EXIT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.__process.kill()
+            self.__process = None
+
+
+def main():
+    control = socket.socket(fileno=int(sys.argv[1]))
+    preload()
+    serve(control)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import collections
+import enum
+import itertools
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+# frame header: magic, version, message type, flags, request id and payload length, followed by the payload.
+HEADER = struct.Struct("!2sBBBII")
+MAGIC = b"PT"
+VERSION = 1
+MAX_PAYLOAD = 1 << 20
+READ_SIZE = 1 << 16
+FLAG_RESPONSE = 1
+REQUEST_IDS = 1 << 32
+ALLOWANCE_REQUEST = struct.Struct("!d")
+ALLOWANCE_RESPONSE = struct.Struct("!d")
+
+
+class ProtocolError(Exception):
+    """
+    Raised when a frame can't be decoded, after which the stream can't be trusted.
+    """
+
+
+class MessageType(enum.IntEnum):
+    """
+    Type of a message between algo_main and algo_spawn, a response has the type of its request.
+    """
+    ALLOWANCE = 1
+    ERROR = 2
+
+
+class Frame(NamedTuple):
+    type: int
+    request_id: int
+    payload: bytes
+    flags: int = 0
+
+    @property
+    def is_response(self) -> bool:
+        return bool(self.flags & FLAG_RESPONSE)
+
+
+def encodeFrame(message_type: int, request_id: int, payload: bytes = b"", flags: int = 0) -> bytes:
+    """
+    Encodes a frame. \n
+    :param message_type: see :class:`MessageType`.
+    :param request_id: id of the request, a response carries the id of its request.
+    :param payload: encoded message.
+    :param flags: FLAG_RESPONSE for a response.
+    :return: the frame.
+    """
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError(f"payload of {len(payload)} bytes is larger than {MAX_PAYLOAD}.")
+    return HEADER.pack(MAGIC, VERSION, message_type, flags, request_id, len(payload)) + payload
+
+
+class FrameDecoder:
+    """
+    Incremental decoder, fed whatever has been read and returns the frames completed by it.
+    """
+
+    def __init__(self):
+        self.__buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[Frame]:
+        """
+        :param data: bytes read from the stream.
+        :return: frames completed, in order.
+        """
+        self.__buffer += data
+        frames = []
+        offset = 0
+        while len(self.__buffer) - offset >= HEADER.size:
+            magic, version, message_type, flags, request_id, length = HEADER.unpack_from(self.__buffer, offset)
+            if magic != MAGIC or version != VERSION or length > MAX_PAYLOAD:
+                raise ProtocolError(f"bad frame header {bytes(self.__buffer[offset:offset + HEADER.size])!r}.")
+            end = offset + HEADER.size + length
+            if len(self.__buffer) < end:
+                break
+            frames.append(Frame(message_type, request_id, bytes(self.__buffer[offset + HEADER.size:end]), flags))
+            offset = end
+        del self.__buffer[:offset]
+        return frames
+
+
+def encodeAllowanceRequest(name: str, confidence: float) -> bytes:
+    return ALLOWANCE_REQUEST.pack(confidence) + name.encode("UTF-8")
+
+
+def decodeAllowanceRequest(payload: bytes) -> Tuple[str, float]:
+    """
+    :return: name of the stock and the confidence of the call.
+    """
+    (confidence,) = ALLOWANCE_REQUEST.unpack_from(payload)
+    return payload[ALLOWANCE_REQUEST.size:].decode("UTF-8"), confidence
+
+
+def encodeAllowanceResponse(allowance: float) -> bytes:
+    return ALLOWANCE_RESPONSE.pack(allowance)
+
+
+def decodeAllowanceResponse(payload: bytes) -> float:
+    return ALLOWANCE_RESPONSE.unpack(payload)[0]
+
+
+class Channel:
+    """
+    One end of the framed connection between algo_main and a child, over a pair of pipes.  Requests are sent without
+    waiting and matched to their responses by request id, which can be polled for or waited on.  Requests from the
+    other end are returned by receive to be answered with respond.
+    """
+
+    def __init__(self, read_fd: int, write_fd: int):
+        """
+        :param read_fd: file descriptor frames are read from.
+        :param write_fd: file descriptor frames are written to.
+        """
+        self.__read_fd = read_fd
+        self.__write_fd = write_fd
+        self.__decoder = FrameDecoder()
+        self.__request_ids = itertools.count(1)
+        self.__write_lock = threading.Lock()
+        self.__responses: Dict[int, Frame] = {}
+        self.__requests: Deque[Frame] = collections.deque()
+        self.__closed = False
+
+    @classmethod
+    def fromStdio(cls) -> "Channel":
+        """
+        Child end over stdin and stdout.  stdout is kept for frames alone, anything else written to it (prints, library
+        warnings) goes to stderr instead so it can't corrupt the stream.
+        """
+        sys.stdout.flush()
+        write_fd = os.dup(1)
+        os.dup2(2, 1)
+        return cls(0, write_fd)
+
+    @property
+    def closed(self) -> bool:
+        """
+        whether the other end has closed the connection.
+        """
+        return self.__closed
+
+    def fileno(self) -> int:
+        return self.__read_fd
+
+    def request(self, message_type: int, payload: bytes = b"") -> int:
+        """
+        Sends a request without waiting for its response. \n
+        :param message_type: see :class:`MessageType`.
+        :param payload: encoded request.
+        :return: id of the request, to poll or wait for its response.
+        """
+        request_id = next(self.__request_ids) % REQUEST_IDS
+        self.__write(encodeFrame(message_type, request_id, payload))
+        return request_id
+
+    def respond(self, request: Frame, payload: bytes = b"", message_type: Optional[int] = None):
+        """
+        Sends the response to a request. \n
+        :param request: the request.
+        :param payload: encoded response.
+        :param message_type: type of the response, the request's type if None, e.g. MessageType.ERROR on failure.
+        """
+        message_type = request.type if message_type is None else message_type
+        self.__write(encodeFrame(message_type, request.request_id, payload, FLAG_RESPONSE))
+
+    def poll(self, request_id: int) -> Optional[Frame]:
+        """
+        Returns the response to the request if it has arrived, without blocking.
+        """
+        if request_id not in self.__responses:
+            self.__read(0.0)
+        return self.__responses.pop(request_id, None)
+
+    def wait(self, request_id: int, timeout: Optional[float] = None) -> Frame:
+        """
+        Waits for the response to the request. \n
+        :param request_id: id of the request.
+        :param timeout: seconds to wait for, forever if None.
+        :return: the response.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while request_id not in self.__responses:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            if not self.__read(remaining) and remaining == 0.0:
+                raise TimeoutError(f"no response to request {request_id} within {timeout}s.")
+        return self.__responses.pop(request_id)
+
+    def receive(self, timeout: Optional[float] = 0.0) -> List[Frame]:
+        """
+        Returns the requests received, reading what has arrived within the timeout. \n
+        :param timeout: seconds to wait for, 0 returns straight away, None blocks until something is read.
+        :return: requests, in order.
+        """
+        if len(self.__requests) == 0:
+            self.__read(timeout)
+        requests = list(self.__requests)
+        self.__requests.clear()
+        return requests
+
+    def __read(self, timeout: Optional[float]) -> bool:
+        if self.__closed:
+            raise EOFError("the channel has been closed by the other end.")
+        if timeout is not None and len(select.select([self.__read_fd], [], [], timeout)[0]) == 0:
+            return False
+        data = os.read(self.__read_fd, READ_SIZE)
+        if len(data) == 0:
+            self.__closed = True
+            raise EOFError("the channel has been closed by the other end.")
+        for frame in self.__decoder.feed(data):
+            if frame.is_response:
+                self.__responses[frame.request_id] = frame
+            else:
+                self.__requests.append(frame)
+        return True
+
+    def __write(self, frame: bytes):
+        with self.__write_lock:
+            view = memoryview(frame)
+            while len(view) > 0:
+                view = view[os.write(self.__write_fd, view):]
@@ -1,5 +1,6 @@
 import enum
-import queue
+import os
+import selectors
 import threading
 import time
 import warnings
@@ -8,6 +9,9 @@ from subprocess import Popen, PIPE
 import alpaca_trade_api as tradeapi
 import psutil
 
+from pytrader.algo.algo_forkserver import ForkServer, FORK_SERVER_SUPPORTED
+from pytrader.algo.algo_ipc import Channel, Frame, MessageType, decodeAllowanceRequest, encodeAllowanceResponse
+from pytrader.algo.algo_pool import TickerWorkerPool, TickerResult
 from pytrader.config import ALPACA_PAPER_KEY, ALPACA_PAPER_SECRET, ALPACA_PAPER_ADDRESS
 
 warnings.filterwarnings("ignore")
@@ -54,26 +58,17 @@ class Subprocess:
      name: name of subprocess ticker. \n
      stock_type: see :class:`StockType` \n
      process: subprocess. see :class:`NamedPopen`  \n
-     out_comm_thread: listens to process calls. \n
-     comm_queue: contains out_comm_thread data.
+     channel: framed connection to the process. see :class:`Channel`
      """
 
-    def __init__(self, name, process, in_comm_thread, out_comm_thread, comm_queue, stock_type=StockType.STOCK):
+    def __init__(self, name, process, channel, stock_type=StockType.STOCK):
         self.name = name
         self.type = stock_type
         self.process = process
-        self.in_comm_thread = in_comm_thread
-        self.in_comm_thread.daemon = True
-        self.in_comm_thread.start()
-        self.out_comm_thread = out_comm_thread
-        self.out_comm_thread.daemon = True
-        self.out_comm_thread.start()
-        self.comm_queue = comm_queue
+        self.channel = channel
 
     def __del__(self):
         self.process.kill()
-        self.out_comm_thread.join()
-        self.in_comm_thread.join()
 
     def poll(self):
         """
@@ -81,19 +76,6 @@ class Subprocess:
          """
         self.process.poll()
 
-    def checkRequests(self):
-        """
-        checks for any requests from the subprocesses. This will typically be a request for allowance.\n
-        """
-        if self.comm_queue.qsize() > 0 and self.process.returncode is None:
-            try:
-                interpreted_request = decodeRequest(self.comm_queue.get(False)) + "\n"
-                # p1_out, p1_err = self.process.communicate(input=interpreted_request.encode())[0]
-                self.process.stdin.write(interpreted_request.encode("UTF-8"))
-            except Exception as e:
-                print("checkRequests: ", e)
-                pass
-
     def flush(self):
         if not self.process.stdin.closed:
             self.process.stdin.flush()
@@ -106,6 +88,77 @@ class Subprocess:
         self.process.terminate()
 
 
+class SubprocessSelector:
+    """
+    Watches every subprocess from a single selector, rather than a thread or two per subprocess.  Requests are answered
+    as soon as they arrive on a subprocess' channel, and a subprocess' exit is seen through its pidfd, or where pidfds
+    aren't available through its channel closing. \n
+    """
+
+    def __init__(self):
+        self.__selector = selectors.DefaultSelector()
+        # pidfds opened for the subprocesses, forked subprocesses bring their own.
+        self.__pidfds = {}
+
+    def __len__(self):
+        return len(self.__pidfds)
+
+    def register(self, subprocess):
+        """
+        Starts watching the subprocess. \n
+        :param subprocess: (Subprocess) subprocess.
+        """
+        pidfd = getattr(subprocess.process, "pidfd", None)
+        owned = False
+        if pidfd is None and hasattr(os, "pidfd_open"):
+            try:
+                pidfd, owned = os.pidfd_open(subprocess.process.pid), True
+            except ProcessLookupError:
+                pass
+        self.__pidfds[subprocess] = (pidfd, owned)
+        self.__selector.register(subprocess.channel.fileno(), selectors.EVENT_READ, (subprocess, False))
+        if pidfd is not None:
+            self.__selector.register(pidfd, selectors.EVENT_READ, (subprocess, True))
+
+    def unregister(self, subprocess):
+        """
+        Stops watching the subprocess. \n
+        :param subprocess: (Subprocess) subprocess.
+        """
+        pidfd, owned = self.__pidfds.pop(subprocess, (None, False))
+        for fd in [subprocess.channel.fileno(), pidfd]:
+            if fd is not None and fd in self.__selector.get_map():
+                self.__selector.unregister(fd)
+        if owned:
+            os.close(pidfd)
+
+    def select(self, timeout=None):
+        """
+        Answers the requests that arrive within the timeout and collects the subprocesses that exit. \n
+        :param timeout: (float) seconds to wait for, forever if None.
+        :return: (list) subprocesses that have exited, no longer watched.
+        """
+        exited = []
+        for key, _ in self.__selector.select(timeout):
+            subprocess, is_exit = key.data
+            if subprocess not in self.__pidfds:
+                continue
+            if not is_exit:
+                try:
+                    for request in subprocess.channel.receive(0):
+                        answerRequest(subprocess.channel, request)
+                    continue
+                except (EOFError, OSError):
+                    self.__selector.unregister(key.fd)
+                    if self.__pidfds[subprocess][0] is not None:
+                        # its pidfd reports the exit.
+                        continue
+            self.unregister(subprocess)
+            subprocess.process.wait()
+            exited.append(subprocess)
+        return exited
+
+
 class SharedCashPile(object):
     """
     TODO - currently not feeding into subprocs, do this for efficiency \n
@@ -139,6 +192,23 @@ MAX_CPU_PERCENT = 90
 MAX_MEMORY_PERCENT = 90
 MAX_STOCK_ALLOWANCE = 0.2
 MAX_SUBPROCESS_INIT = 5
+MAX_TICKER_COUNT = 50
+# worker processes analysing the tickers, memory scales with these rather than the number of tickers.
+WORKER_COUNT = os.cpu_count() or 1
+# seconds between analyses of a ticker, and between rebalancing the tickers across the workers.
+ANALYSIS_INTERVAL = 60
+REBALANCE_INTERVAL = 300
+# analyse the tickers on a pool of workers rather than a subprocess each, False falls back on a subprocess per ticker.
+USE_WORKER_POOL = True
+# fork the subprocesses from a server that has preloaded their imports, rather than starting each from scratch.
+USE_FORK_SERVER = True
+FORK_SERVER = ForkServer()
+# feeds the bars of every ticker into shared memory from one process, read by the subprocesses or workers rather than
+# each fetching its own, see startSharedBarsFeeder.
+SHARED_BARS_FEEDER = None
+SUBPROCESS_SELECTOR = SubprocessSelector()
+# seconds between checks for stocks that need a subprocess.
+MANAGE_INTERVAL = 1
 ACTIVE_STOCKS = []
 CHILD_SCRIPT_NAME = "algo_spawn.py"
 PRIMARY_STOCK_LIST = ['TSLA', 'AAPL', 'AMZN', 'BABA', 'AMD', 'GOLD', 'BA', 'BBY']
@@ -149,27 +219,31 @@ SECONDARY_STOCK_LIST = ['AA', 'AAL', 'AAPL', 'AIG', 'AMAT', 'AMC', 'AMD', 'AMGN'
                         'CBL', 'CBD', 'CBFV', 'CBAY', 'CBAN', 'CANF', 'CAMT', 'CAMP']
 
 
-def interpretRequest(request, name, data):
-    if request == "ALLOWANCE":
-        return str(allocateChildAllowance(float(getAvailableCash()), name, float(data)))
-
-
-def decodeRequest(request_string):
+def interpretRequest(request: Frame) -> bytes:
     """
-    the notation for request string is defined as request~name~data. \n
-    :param request_string: (string) sent from subprocess.
-    :return: (str) containing response to request from subprocess.
+    Carries out a request from a subprocess. \n
+    :param request: (Frame) request, see :class:`MessageType` for the types.
+    :return: (bytes) payload of the response.
     """
-    request_string = request_string.decode('UTF-8')
-    key = "~"
-    first_break = request_string.find(key)
-    second_break = request_string.find(key, first_break + 1)
+    if request.type == MessageType.ALLOWANCE:
+        name, confidence = decodeAllowanceRequest(request.payload)
+        return encodeAllowanceResponse(allocateChildAllowance(float(getAvailableCash()), name, confidence))
+    raise ValueError(f"unknown request type {request.type}")
 
-    request = request_string[:first_break]
-    name = request_string[first_break + 1:second_break]
-    data = request_string[second_break + 1:]
 
-    return interpretRequest(request, name, data)
+def answerRequest(channel: Channel, request: Frame):
+    """
+    Answers a request from a subprocess, with an error response if it couldn't be carried out. \n
+    :param channel: (Channel) connection to the subprocess.
+    :param request: (Frame) request.
+    """
+    try:
+        channel.respond(request, interpretRequest(request))
+    except OSError:
+        raise
+    except Exception as e:
+        print(f"answerRequest: {e}")
+        channel.respond(request, str(e).encode("UTF-8"), MessageType.ERROR)
 
 
 def getAvailableCash():
@@ -204,20 +278,23 @@ def getYesterdaysEquity():
     return api.get_account().last_equity
 
 
-def getDailyChangeInEquity():
+def getDailyChangeInEquity(account=None):
     """
     Returns daily change in equity. \n
     TODO - add capacity for multiple exchanges.
+    :param account: account to use, fetched if not given.
     """
-    return (float(api.get_account().equity) - float(api.get_account().last_equity)) / float(
-        api.get_account().last_equity)
+    account = account if account is not None else api.get_account()
+    return (float(account.equity) - float(account.last_equity)) / float(account.last_equity)
 
 
 def dailyReport():
-    print(f"The cash available is: {getAvailableCash()}.")
-    print(f"We made {getDailyTradeCount()} trades today.")
-    print(f"Our equity is valued at {getEquity()} compared to yesterdays {getYesterdaysEquity()}.")
-    print(f"This means there was a daily gain/loss of {getDailyChangeInEquity()}%")
+    # one account request, so every figure in the report is from the same moment.
+    account = api.get_account()
+    print(f"The cash available is: {account.cash}.")
+    print(f"We made {account.daytrade_count} trades today.")
+    print(f"Our equity is valued at {account.equity} compared to yesterdays {account.last_equity}.")
+    print(f"This means there was a daily gain/loss of {getDailyChangeInEquity(account)}%")
 
 
 # --------
@@ -225,28 +302,35 @@ def dailyReport():
 # --------
 
 
-def startSubprocess(stock_name):
-    return NamedPopen(["python", "-u", CHILD_SCRIPT_NAME, stock_name],
-                      stdin=PIPE, stdout=PIPE, bufsize=0, name=stock_name)
-
+def startSharedBarsFeeder():
+    """
+    Starts the process that feeds the latest bars of the stocks into shared memory. \n
+    :return: (SharedBarsFeeder) the feeder.
+    """
+    global SHARED_BARS_FEEDER
+    # imported here, as marketData imports this module for its api.
+    from pytrader.marketData.sharedBars import SharedBarsFeeder
+    SHARED_BARS_FEEDER = SharedBarsFeeder(MAX_TICKER_COUNT)
+    return SHARED_BARS_FEEDER
 
-def readOutput(pipe, q):
-    """reads output from `pipe`, when line has been read, puts
-        line on Queue `q`"""
 
-    while pipe.returncode is None:
+def startSubprocess(stock_name):
+    """
+    Starts the subprocess of a stock, handing it the name of the shared bars to read its bars from. \n
+    :param stock_name: (string) name of stock.
+    :return: the subprocess.
+    """
+    args = [stock_name]
+    if SHARED_BARS_FEEDER is not None:
+        SHARED_BARS_FEEDER.add(stock_name)
+        args.append(SHARED_BARS_FEEDER.name)
+    if USE_FORK_SERVER and FORK_SERVER_SUPPORTED:
         try:
-            line = pipe.stdout.readline()
-            if len(line) > 0:
-                q.put(line)
-        except Exception as e:
-            print(f"readOutput error: {e}")
-            break
-
-
-def readInput(pipe, string):
-    """reads input from a pipe with name `read_pipe_name`,
-writing this input straight into `write_pipe`"""
+            return FORK_SERVER.spawn(CHILD_SCRIPT_NAME, args, name=stock_name)
+        except OSError as e:
+            print(f"startSubprocess: fork server unavailable, starting {stock_name} from scratch. {e}")
+    return NamedPopen(["python", "-u", CHILD_SCRIPT_NAME, *args],
+                      stdin=PIPE, stdout=PIPE, bufsize=0, name=stock_name)
 
 
 # ------------
@@ -256,7 +340,8 @@ writing this input straight into `write_pipe`"""
 # Returns sum of child processes.
 def childCount():
     current_process = psutil.Process()
-    children = current_process.children()
+    # recursive, as subprocesses forked by the fork server are its children rather than ours.
+    children = current_process.children(recursive=True)
     return len(children)
 
 
@@ -279,12 +364,12 @@ def childPreCreateResourceCheck():
         return False
 
     # Check memory capacity
-    if childCount() >= MAX_MEMORY_PERCENT:
+    if psutil.virtual_memory().percent >= MAX_MEMORY_PERCENT:
         print("Max memory allowance exceeded.")
         return False
 
     # Check CPU capacity
-    if childCount() >= MAX_CPU_PERCENT:
+    if psutil.cpu_percent() >= MAX_CPU_PERCENT:
         print("Max CPU allowance exceeded.")
         return False
 
@@ -349,10 +434,10 @@ def generateSubprocess(stock_name):
     :return: (Subprocess) object
     """
     process = startSubprocess(stock_name)
-    comm_queue = queue.Queue()
-    in_thread = threading.Thread(target=readInput, args=(process, "teee"))
-    out_thread = threading.Thread(target=readOutput, args=(process, comm_queue))
-    return Subprocess(stock_name, process, in_thread, out_thread, comm_queue)
+    channel = Channel(process.stdout.fileno(), process.stdin.fileno())
+    subprocess = Subprocess(stock_name, process, channel)
+    SUBPROCESS_SELECTOR.register(subprocess)
+    return subprocess
 
 
 def generateSubprocesses(stock_list):
@@ -380,20 +465,16 @@ def generateSubprocesses(stock_list):
         print(f"thread count: {threading.active_count()}")
 
 
-def monitorChildren():
+def monitorChildren(timeout=0):
     """
-    monitors subprocesses to see if there is any requests inbound or if they have terminated. \n
+    monitors subprocesses, answering their requests as they arrive and removing those that have terminated. \n
+    :param timeout: (float) seconds to monitor for.
     """
-    for idx, val in enumerate(ACTIVE_STOCKS):
-        # Subprocess is finished
-        if val.process.returncode == 0:
-            ACTIVE_STOCKS.remove(val)
-            del val
-            continue
-        else:
-            val.poll()
-            val.checkRequests()
-            val.flush()
+    for val in SUBPROCESS_SELECTOR.select(timeout):
+        print(f"{val.name} subprocess finished with {val.process.returncode}.")
+        ACTIVE_STOCKS.remove(val)
+        if SHARED_BARS_FEEDER is not None:
+            SHARED_BARS_FEEDER.remove(val.name)
 
 
 def addChildFromList(in_list, out_list):
@@ -436,24 +517,107 @@ def manageChildren():
         generateSubprocesses(add_stocks)
 
 
+def addTickersFromList(pool, in_list):
+    """
+    Adds the stocks from the list that aren't already being analysed to the worker pool. \n
+    :param pool: (TickerWorkerPool) pool analysing the stocks.
+    :param in_list: (list) names of stocks to add, at most MAX_SUBPROCESS_INIT are added per call.
+    """
+    added = 0
+    for i in in_list:
+        if added >= MAX_SUBPROCESS_INIT or len(pool) >= MAX_TICKER_COUNT or not childPreCreateResourceCheck():
+            return
+        if i in pool:
+            continue
+        pool.add(i)
+        added += 1
+
+
+def manageTickers(pool):
+    """
+    Manages the tickers in the worker pool, ensuring that we have all priority stocks analysed, then filling spare
+    capacity with other stocks. \n
+    :param pool: (TickerWorkerPool) pool analysing the stocks.
+    """
+    addTickersFromList(pool, PRIMARY_STOCK_LIST)
+    addTickersFromList(pool, SECONDARY_STOCK_LIST)
+
+
+def interpretResult(result: TickerResult):
+    """
+    Handles the outcome of a ticker analysis from the worker pool. \n
+    :param result: (TickerResult) outcome of the analysis.
+    """
+    if result.error is not None:
+        print(f"{result.name} analysis failed on worker {result.worker}: {result.error}")
+    else:
+        print(f"{result.name} has a confidence of {result.confidence}, "
+              f"analysed in {result.seconds:.2f}s on worker {result.worker}.")
+
+
+def runWorkerPool(init_list):
+    """
+    Analyses the stocks on a fixed pool of worker processes, each ticker analysed every ANALYSIS_INTERVAL seconds by
+    the worker that owns it, and the tickers rebalanced across the workers every REBALANCE_INTERVAL seconds. \n
+    :param init_list: (list) names of the stocks to start with.
+    """
+    feeder = startSharedBarsFeeder()
+    pool = TickerWorkerPool(WORKER_COUNT, shared_bars=feeder.name)
+    # time each ticker is next due an analysis, tickers with an analysis outstanding aren't due.
+    due = {}
+    rebalance_at = time.monotonic() + REBALANCE_INTERVAL
+    try:
+        for name in init_list:
+            pool.add(name)
+        while True:
+            manageTickers(pool)
+            now = time.monotonic()
+            for name in pool.tickers():
+                feeder.add(name)
+                if due.get(name, now) <= now:
+                    pool.submit(name)
+                    due[name] = float("inf")
+            for result in pool.results(timeout=1):
+                due[result.name] = time.monotonic() + ANALYSIS_INTERVAL
+                interpretResult(result)
+            if now >= rebalance_at:
+                moved = pool.rebalance()
+                if moved > 0:
+                    print(f"moved {moved} tickers between workers.")
+                rebalance_at = now + REBALANCE_INTERVAL
+    finally:
+        pool.close()
+        feeder.close()
+
+
 # ------------
 # Main
 # ------------
 def main():
     # Get the currently owned stocks, these are the priority to monitor
     init_list = generateInitList()
-    if len(init_list) > 0:
-        print(f"We currently own {init_list}, let's spin up some subprocs for them.")
-        generateSubprocesses(init_list)
-    else:
-        print(f"We currently own nothing, let's spin up some subprocs for {PRIMARY_STOCK_LIST}.")
-        generateSubprocesses(PRIMARY_STOCK_LIST)
-    while True:
-        monitorChildren()
-        manageChildren()
-        if childCount() == 0:
-            break
-        time.sleep(1)
+    if USE_WORKER_POOL:
+        print(f"We currently own {init_list}, analysing them on {WORKER_COUNT} workers.")
+        runWorkerPool(init_list if len(init_list) > 0 else PRIMARY_STOCK_LIST)
+        return
+    feeder = startSharedBarsFeeder()
+    try:
+        if len(init_list) > 0:
+            print(f"We currently own {init_list}, let's spin up some subprocs for them.")
+            generateSubprocesses(init_list)
+        else:
+            print(f"We currently own nothing, let's spin up some subprocs for {PRIMARY_STOCK_LIST}.")
+            generateSubprocesses(PRIMARY_STOCK_LIST)
+        manage_at = time.monotonic() + MANAGE_INTERVAL
+        while len(ACTIVE_STOCKS) > 0:
+            # requests are answered as they arrive, the interval only paces the search for stocks to add.
+            monitorChildren(max(manage_at - time.monotonic(), 0))
+            if time.monotonic() >= manage_at:
+                manageChildren()
+                manage_at = time.monotonic() + MANAGE_INTERVAL
+    finally:
+        FORK_SERVER.close()
+        feeder.close()
 
 
 if __name__ == "__main__":
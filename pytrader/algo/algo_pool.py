@@ -0,0 +1,251 @@
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from pytrader.common.indicator import Indicator
+from pytrader.common.tradeIntent import TradeIntent
+
+# seconds close waits for a worker to exit before terminating it.
+WORKER_JOIN_TIMEOUT: float = 5.0
+
+
+@dataclass
+class TickerState:
+    """
+    State of a ticker, kept by the worker that owns it between analyses and handed over when it is moved.
+    """
+    name: str
+    trade_intent: TradeIntent = TradeIntent.SHORT_TRADE
+    indicators: List[Indicator] = field(default_factory=lambda: [Indicator.MACD, Indicator.RSI])
+    confidence: Optional[float] = None
+    analyses: int = 0
+
+
+@dataclass
+class TickerResult:
+    """
+    Result of a ticker analysis.
+    """
+    name: str
+    confidence: Optional[float]
+    worker: int
+    seconds: float
+    error: Optional[str] = None
+
+
+def analyse_ticker(state: TickerState) -> float:
+    """
+    Default analysis, the summed confidence of the ticker's indicators.  marketData is imported by the worker on its
+    first analysis, once per worker rather than once per ticker.
+    """
+    from pytrader.marketData.marketData import analyse_indicators
+    return sum(analyse_indicators(state.name, state.trade_intent, state.indicators).values())
+
+
+def _work(worker: int, tasks: multiprocessing.Queue, results: multiprocessing.Queue,
+          analyse: Callable[[TickerState], float], shared_bars: Optional[str]):
+    """
+    Worker loop, runs the tasks for the tickers the worker owns until it is sent None.
+    """
+    if shared_bars is not None:
+        from pytrader.marketData.sharedBars import attach_shared_bars
+        attach_shared_bars(shared_bars)
+    states: Dict[str, TickerState] = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        action, name, payload = task
+        if action == "adopt":
+            states[name] = payload
+        elif action == "release":
+            results.put(("released", name, states.pop(name, None)))
+        elif action == "analyse":
+            state = states.setdefault(name, TickerState(name))
+            before = time.perf_counter()
+            try:
+                state.confidence, error = analyse(state), None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            seconds = time.perf_counter() - before
+            state.analyses += 1
+            results.put(("result", name, TickerResult(name, state.confidence, worker, seconds, error)))
+
+
+class TickerWorkerPool:
+    """
+    Fixed pool of worker processes that analyse tickers, in place of a process per ticker.  Each ticker is owned by one
+    worker, which keeps its state (and whatever its analysis caches, e.g. its bars) between analyses, and its tasks go
+    to that worker's own queue.  New tickers go to the worker with the fewest, and rebalance moves tickers from the
+    busiest workers to the idlest by handing their state over through the parent, holding back their tasks meanwhile.
+    Memory scales with the number of workers rather than the number of tickers.
+    """
+
+    def __init__(self, workers: Optional[int] = None, analyse: Optional[Callable[[TickerState], float]] = None,
+                 shared_bars: Optional[str] = None):
+        """
+        :param workers: number of worker processes, defaults to the number of cores.
+        :param analyse: analysis run by the workers, must be picklable, defaults to analyse_ticker.
+        :param shared_bars: name of the shared bars the workers read their bars from, see :class:`SharedBarsFeeder`.
+        """
+        self.__workers: int = workers if workers is not None else os.cpu_count() or 1
+        if self.__workers < 1:
+            raise ValueError(f"TickerWorkerPool: workers must be at least 1, not {self.__workers}.")
+        self.__results: multiprocessing.Queue = multiprocessing.Queue()
+        self.__tasks: List[multiprocessing.Queue] = [multiprocessing.Queue() for _ in range(self.__workers)]
+        self.__processes: List[multiprocessing.Process] = [
+            multiprocessing.Process(target=_work, name=f"TickerWorker-{worker}", daemon=True,
+                                    args=(worker, self.__tasks[worker], self.__results,
+                                          analyse if analyse is not None else analyse_ticker, shared_bars))
+            for worker in range(self.__workers)]
+        for process in self.__processes:
+            process.start()
+        self.__owners: Dict[str, int] = {}
+        self.__tickers: List[Set[str]] = [set() for _ in range(self.__workers)]
+        # seconds each ticker's analyses have taken, as reported in its results.
+        self.__busy: Dict[str, float] = {}
+        # tickers being moved, with the worker they are moving to and the tasks held back until they arrive.
+        self.__moving: Dict[str, Tuple[int, List[tuple]]] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.__owners
+
+    def __len__(self) -> int:
+        return len(self.__owners)
+
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    def tickers(self, worker: Optional[int] = None) -> List[str]:
+        """
+        Returns the tickers of a worker, or every ticker. \n
+        :param worker: index of the worker.
+        :return: ticker names.
+        """
+        if worker is None:
+            return list(self.__owners.keys())
+        return sorted(self.__tickers[worker])
+
+    def owner(self, name: str) -> Optional[int]:
+        """
+        Returns the index of the worker that owns the ticker, None if it isn't in the pool.
+        """
+        return self.__owners.get(name)
+
+    def add(self, name: str, state: Optional[TickerState] = None) -> int:
+        """
+        Adds a ticker to the worker with the fewest. \n
+        :param name: name of the ticker.
+        :param state: initial state, a default state is created on its first analysis if None.
+        :return: index of the worker that owns it.
+        """
+        if name in self.__owners:
+            return self.__owners[name]
+        worker = min(range(self.__workers), key=lambda w: len(self.__tickers[w]))
+        self.__owners[name] = worker
+        self.__tickers[worker].add(name)
+        self.__busy[name] = 0.0
+        if state is not None:
+            self.__send(worker, ("adopt", name, state))
+        return worker
+
+    def remove(self, name: str):
+        """
+        Removes a ticker, dropping its state.
+        """
+        worker = self.__owners.pop(name, None)
+        if worker is None:
+            return
+        self.__tickers[worker].discard(name)
+        self.__busy.pop(name, None)
+        # a ticker being moved has already been released, its state is dropped when it is handed back.
+        if self.__moving.pop(name, None) is None:
+            self.__tasks[worker].put(("release", name, None))
+
+    def submit(self, name: str):
+        """
+        Queues an analysis of the ticker on the worker that owns it, adding the ticker if it isn't in the pool.
+        """
+        self.__send(self.add(name), ("analyse", name, None))
+
+    def rebalance(self) -> int:
+        """
+        Moves tickers from the workers that have spent the longest analysing to the ones that have spent the least,
+        while that evens them out.  A ticker's tasks are held back until its state has reached its new worker. \n
+        :return: number of tickers moved.
+        """
+        moved = 0
+        while True:
+            load = [sum(self.__busy.get(name, 0.0) for name in self.__tickers[w]) for w in range(self.__workers)]
+            busiest = max(range(self.__workers), key=lambda w: (load[w], len(self.__tickers[w])))
+            idlest = min(range(self.__workers), key=lambda w: (load[w], len(self.__tickers[w])))
+            candidates = [name for name in self.__tickers[busiest] if name not in self.__moving]
+            if busiest == idlest or len(candidates) == 0:
+                return moved
+            # the cheapest ticker that narrows the gap, fall back on counts before any analysis has been timed.
+            name = min(candidates, key=lambda n: self.__busy.get(n, 0.0))
+            cost = self.__busy.get(name, 0.0)
+            gap = load[busiest] - load[idlest]
+            if gap > 0 and not cost < gap:
+                return moved
+            if gap == 0 and len(self.__tickers[busiest]) - len(self.__tickers[idlest]) <= 1:
+                return moved
+            self.__tickers[busiest].discard(name)
+            self.__tickers[idlest].add(name)
+            self.__owners[name] = idlest
+            self.__moving[name] = (idlest, [])
+            self.__tasks[busiest].put(("release", name, None))
+            moved += 1
+
+    def results(self, timeout: Optional[float] = 0.0) -> List[TickerResult]:
+        """
+        Collects the finished analyses, completing any ticker moves whose state has been handed back. \n
+        :param timeout: seconds to wait for the first result, 0 returns straight away, None waits until there is one.
+        :return: results.
+        """
+        results: List[TickerResult] = []
+        block = timeout is None or timeout > 0
+        while True:
+            try:
+                kind, name, payload = self.__results.get(block, timeout) if block else self.__results.get_nowait()
+            except queue.Empty:
+                return results
+            if kind == "result":
+                if name in self.__busy:
+                    self.__busy[name] += payload.seconds
+                results.append(payload)
+                block = False
+            elif kind == "released":
+                self.__arrived(name, payload)
+
+    def close(self):
+        """
+        Stops the workers.
+        """
+        for tasks in self.__tasks:
+            tasks.put(None)
+        for process in self.__processes:
+            process.join(WORKER_JOIN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+
+    def __send(self, worker: int, task: tuple):
+        name = task[1]
+        if name in self.__moving:
+            self.__moving[name][1].append(task)
+        else:
+            self.__tasks[worker].put(task)
+
+    def __arrived(self, name: str, state: Optional[TickerState]):
+        move = self.__moving.pop(name, None)
+        if move is None:
+            return
+        worker, held = move
+        if state is not None:
+            self.__tasks[worker].put(("adopt", name, state))
+        for task in held:
+            self.__tasks[worker].put(task)
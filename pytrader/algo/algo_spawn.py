@@ -8,13 +8,21 @@ import time
 import websocket
 
 from algo_main import api
+from pytrader.algo.algo_ipc import Channel, MessageType, ProtocolError, decodeAllowanceResponse, \
+    encodeAllowanceRequest
 from pytrader.common.indicator import Indicator
 from pytrader.common.tradeIntent import TradeIntent
 from pytrader.config import ALPACA_PAPER_KEY, ALPACA_PAPER_SECRET
-from pytrader.marketData.marketData import analyse
+from pytrader.marketData.marketData import analyse_indicators
+from pytrader.marketData.sharedBars import attach_shared_bars
 
 logging.basicConfig(filename='algo.log', format='%(name)s - %(levelname)s - %(message)s')
 
+# seconds to wait for the parent to answer a request.
+REQUEST_TIMEOUT = 5
+# connection to the parent over stdin and stdout, opened by main.
+CHANNEL = None
+
 
 def getTickerName():
     """
@@ -29,6 +37,14 @@ def getTickerName():
         return default
 
 
+def getSharedBarsName():
+    """
+    Determines the shared bars the parent feeds the ticker's bars into. \n
+    :return: (string) name of the shared bars, None if the parent didn't pass one.
+    """
+    return sys.argv[2] if len(sys.argv) > 2 else None
+
+
 def getDebugMode():
     """
     Determines whether we are in debug mode based on arguments passed. \n
@@ -137,28 +153,26 @@ def request_selloff():
 
 def requestAllowance(stock, confidence):
     """
-    TODO - needs some bulletproofing... \n
-    -------- \n
-    Requests an allotted allowance in order to make a purchase.  Currently it prints for master to hear \n
-    :return: Nothing
+    Requests an allotted allowance from the parent in order to make a purchase. \n
+    :param stock: (string) name of stock.
+    :param confidence: (float) rating for how confident in our call.
+    :return: (float) allowance, None if the parent didn't grant one.
     """
     logging.warning(
         '{} : {} requesting allowance'.format(datetime.datetime.now().strftime("%x %X"), stock))
-    if sys.stdout.writable():
-        sys.stdout.write(f"ALLOWANCE~{stock}~{confidence}\n")
-    time.sleep(5)
     try:
-        s = sys.stdin.readline()
-        if type(s) is type(str) and len(s) > 0:
-            return float(s)
-    except Exception as e:
+        request_id = CHANNEL.request(MessageType.ALLOWANCE, encodeAllowanceRequest(stock, confidence))
+        response = CHANNEL.wait(request_id, REQUEST_TIMEOUT)
+        if response.type == MessageType.ERROR:
+            raise ValueError(response.payload.decode("UTF-8"))
+        allowance = decodeAllowanceResponse(response.payload)
         logging.warning(
-            '{} : {} decode error {}'.format(datetime.datetime.now().strftime("%x %X"), stock, e))
-        pass
-    finally:
+            '{} funding of {} received for {}'.format(datetime.datetime.now().strftime("%x %X"), allowance, stock))
+        return allowance
+    except (EOFError, OSError, ProtocolError, TimeoutError, ValueError) as e:
         logging.warning(
-            '{} funding of {} received for {}'.format(datetime.datetime.now().strftime("%x %X"), (s),
-                                                      stock))
+            '{} : {} allowance request failed {}'.format(datetime.datetime.now().strftime("%x %X"), stock, e))
+        return None
 
 
 def getInitialPosition(ticker_name: str):
@@ -268,10 +282,7 @@ def interpretMarket(stock_name: str, trade_intent: TradeIntent, indicator_list:
     """
     logging.warning(
         '{} : {} started successfully'.format(datetime.datetime.now().strftime("%x %X"), stock_name))
-    confidence = 0
-    for i in indicator_list:
-        i_conf = analyse(stock_name, trade_intent, i)
-        confidence = confidence + i_conf
+    confidence = sum(analyse_indicators(stock_name, trade_intent, indicator_list).values())
 
     return confidence
 
@@ -323,7 +334,16 @@ def main():
     """
     main method for the subprocess. \n
     """
+    global CHANNEL
     debug_mode = getDebugMode()
+    if not debug_mode:
+        CHANNEL = Channel.fromStdio()
+    shared_bars = getSharedBarsName()
+    if shared_bars is not None:
+        try:
+            attach_shared_bars(shared_bars)
+        except OSError as e:
+            print(f"unable to attach to the shared bars {shared_bars}, fetching bars directly. {e}")
     ticker_name = getTickerName()
     indicator_list = [Indicator.MACD, Indicator.RSI]
     trade_intent = getTradeIntent()
@@ -0,0 +1,4 @@
+from pytrader.backtest.backtest import Backtest, BacktestResult, determine_buy_or_sell, indicator_confidence, \
+    sharpe_ratio, simulate
+from pytrader.backtest.windowOptimiser import WindowOptimiser, WindowOptimiserResult, walk_forward_segments, \
+    window_columns
@@ -0,0 +1,199 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy
+import pandas
+
+from pytrader import common
+from pytrader.marketData.indicatorPlan import IndicatorPlan, Window
+from pytrader.marketData.windowRegistry import get_window_registry
+
+TRADING_DAYS_PER_YEAR: int = 252
+DEFAULT_INITIAL_CASH: float = 10000.0
+
+
+def determine_buy_or_sell(confidence: numpy.ndarray, buy_threshold: float, sell_threshold: float) -> numpy.ndarray:
+    """
+    Array version of tradingManager.determine_buy_or_sell. \n
+    :param confidence: confidence of every bar.
+    :param buy_threshold: the confidence level we determine that a good buy point is.
+    :param sell_threshold: the confidence level we determine that a good sale point is.
+    :return: 1 for a buy, -1 for a sell and 0 where nothing is a good idea.
+    """
+    confidence = numpy.asarray(confidence, dtype=numpy.float64)
+    return numpy.where(confidence >= buy_threshold, 1, numpy.where(confidence <= sell_threshold, -1, 0)).astype(
+        numpy.int8)
+
+
+def indicator_confidence(indicator: common.Indicator, window: Window, result, close: pandas.Series) -> numpy.ndarray:
+    """
+    Confidence [-1,1] that the asset will increase, for every bar, from the output of an indicator. \n
+    :param indicator: type of indicator.
+    :param window: window of the indicator.
+    :param result: output of the indicator from an IndicatorPlan.
+    :param close: close prices.
+    :return: confidence, 0 where the indicator is not yet defined.
+    """
+    if indicator in (common.Indicator.SMA, common.Indicator.EMA):
+        confidence = numpy.sign(close - result)
+    elif indicator == common.Indicator.RSI:
+        # high rsi means the asset is overbought, so the confidence is inverted.
+        confidence = (50.0 - result) / 50.0
+    elif indicator == common.Indicator.MACD:
+        confidence = numpy.sign(result.iloc[:, 1])
+    elif indicator == common.Indicator.BOLLINGER:
+        middle, upper = result.iloc[:, 0], result["upper_bb"]
+        confidence = ((middle - close) / (upper - middle)).clip(-1.0, 1.0)
+    elif indicator == common.Indicator.VOLUME:
+        confidence = numpy.sign(result - result.shift(window))
+    else:
+        raise ValueError(f"{indicator} is not a valid or supported Indicator type.")
+    return numpy.nan_to_num(numpy.asarray(confidence, dtype=numpy.float64), nan=0.0)
+
+
+def simulate(confidence: numpy.ndarray, prices: numpy.ndarray, buy_threshold: float, sell_threshold: float,
+             commission: Optional[float] = 0.0) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Applies the threshold rule to the confidence and holds the last buy/sell decision until the next one.  Decisions
+    are filled at the close of the following bar, so the first bar is never held. \n
+    :param confidence: confidence of every bar.
+    :param prices: close prices.
+    :param buy_threshold: the confidence level we determine that a good buy point is.
+    :param sell_threshold: the confidence level we determine that a good sale point is.
+    :param commission: fraction of the position value paid on every buy and sell.
+    :return: signal, position (1 when holding the asset) and strategy return of every bar.
+    """
+    signal = determine_buy_or_sell(confidence, buy_threshold, sell_threshold)
+    # index of the last buy/sell decision at every bar, -1 before the first one.
+    last_decision = numpy.maximum.accumulate(numpy.where(signal != 0, numpy.arange(len(signal)), -1))
+    holding = (last_decision >= 0) & (signal[numpy.maximum(last_decision, 0)] == 1)
+    position = numpy.zeros(len(signal))
+    position[1:] = holding[:-1]
+    returns = numpy.zeros(len(prices))
+    returns[1:] = prices[1:] / prices[:-1] - 1.0
+    changes = numpy.abs(numpy.diff(position, prepend=0.0))
+    return signal, position, position * returns - changes * commission
+
+
+def sharpe_ratio(returns: numpy.ndarray) -> float:
+    """
+    Annualised sharpe ratio of daily returns, 0 if they have no variance. \n
+    :param returns: daily returns.
+    :return: sharpe ratio.
+    """
+    volatility = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    return float(returns.mean() / volatility * numpy.sqrt(TRADING_DAYS_PER_YEAR)) if volatility > 0 else 0.0
+
+
+@dataclass
+class BacktestResult:
+    """
+    Output of a backtest, every series is aligned with the input bars.
+    """
+    confidence: pandas.Series
+    signal: pandas.Series
+    position: pandas.Series
+    equity: pandas.Series
+    trades: pandas.DataFrame
+    stats: Dict[str, float] = field(default_factory=dict)
+
+
+class Backtest:
+    """
+    Vectorised backtest of the threshold strategy: the configured indicators are computed over the whole history in
+    one IndicatorPlan, averaged into a confidence per bar, and the buy/sell threshold rule is applied as array
+    operations.  Orders are filled at the close of the bar after the signal, and the strategy is long only.
+    """
+
+    def __init__(self, indicators: Dict[common.Indicator, Window], buy_threshold: float, sell_threshold: float,
+                 initial_cash: Optional[float] = DEFAULT_INITIAL_CASH, commission: Optional[float] = 0.0):
+        self.__indicators: Dict[common.Indicator, Window] = dict(indicators)
+        self.__buy_threshold: float = buy_threshold
+        self.__sell_threshold: float = sell_threshold
+        self.__initial_cash: float = initial_cash
+        self.__commission: float = commission
+        self.__plan: IndicatorPlan = IndicatorPlan(self.__indicators.items())
+
+    @property
+    def indicators(self) -> Dict[common.Indicator, Window]:
+        return dict(self.__indicators)
+
+    @classmethod
+    def from_windows(cls, ticker: str, trade_intent: common.TradeIntent, indicators: List[common.Indicator],
+                     buy_threshold: float, sell_threshold: float, file: Union[str, Path], **kwargs) -> 'Backtest':
+        """
+        Creates a backtest using the windows of the ticker, as used by the live analysis. \n
+        :param ticker: name of ticker.
+        :param trade_intent: intended trade type.
+        :param indicators: indicators to use.
+        :param buy_threshold: the confidence level we determine that a good buy point is.
+        :param sell_threshold: the confidence level we determine that a good sale point is.
+        :param file: windows json file.
+        :return: backtest.
+        """
+        registry = get_window_registry(file)
+        windows = {indicator: registry.get(ticker, indicator, trade_intent) for indicator in indicators}
+        missing = [indicator for indicator, window in windows.items() if window is None]
+        if missing:
+            raise ValueError(f"Backtest: no {trade_intent} windows for {missing} on {ticker}.")
+        return cls(windows, buy_threshold, sell_threshold, **kwargs)
+
+    def run(self, data: pandas.DataFrame) -> BacktestResult:
+        """
+        Runs the backtest over the bars. \n
+        :param data: bars with an 'adjclose' or 'Adj Close' column, and 'volume'/'Volume' if VOLUME is configured.
+        :return: result.
+        """
+        results = self.__plan.execute(data)
+        close = data['adjclose'] if 'adjclose' in data.columns else data['Adj Close']
+        confidence = numpy.zeros(len(close))
+        for (indicator, window), result in results.items():
+            confidence += indicator_confidence(indicator, window, result, close)
+        confidence /= max(len(results), 1)
+
+        prices = close.to_numpy(dtype=numpy.float64)
+        signal, position, strategy_returns = simulate(confidence, prices, self.__buy_threshold, self.__sell_threshold,
+                                                      self.__commission)
+        equity = self.__initial_cash * numpy.cumprod(1.0 + strategy_returns)
+
+        index = close.index
+        trades = self.__trades(index, prices, position)
+        return BacktestResult(confidence=pandas.Series(confidence, index=index),
+                              signal=pandas.Series(signal, index=index),
+                              position=pandas.Series(position, index=index),
+                              equity=pandas.Series(equity, index=index),
+                              trades=trades,
+                              stats=self.__stats(equity, strategy_returns, position, trades))
+
+    def __trades(self, index: pandas.Index, prices: numpy.ndarray, position: numpy.ndarray) -> pandas.DataFrame:
+        """
+        Pairs every entry with its exit, an open position is closed at the last bar.
+        """
+        # a position held on a bar was bought/sold at the close of the bar before.
+        changes = numpy.diff(position, prepend=0.0)
+        entry_bars = numpy.flatnonzero(changes > 0) - 1
+        exit_bars = numpy.flatnonzero(changes < 0) - 1
+        if len(exit_bars) < len(entry_bars):
+            exit_bars = numpy.append(exit_bars, len(prices) - 1)
+        entry_prices, exit_prices = prices[entry_bars], prices[exit_bars]
+        return pandas.DataFrame({"entry": index[entry_bars], "exit": index[exit_bars], "entry_price": entry_prices,
+                                 "exit_price": exit_prices,
+                                 "return": exit_prices / entry_prices - 1.0 - 2 * self.__commission})
+
+    def __stats(self, equity: numpy.ndarray, returns: numpy.ndarray, position: numpy.ndarray,
+                trades: pandas.DataFrame) -> Dict[str, float]:
+        if len(equity) == 0:
+            return {}
+        years = len(equity) / TRADING_DAYS_PER_YEAR
+        total_return = equity[-1] / self.__initial_cash - 1.0
+        volatility = returns.std(ddof=1) * numpy.sqrt(TRADING_DAYS_PER_YEAR) if len(returns) > 1 else 0.0
+        drawdown = equity / numpy.maximum.accumulate(equity) - 1.0
+        return {"total_return": float(total_return),
+                "annualised_return": float((1.0 + total_return) ** (1.0 / years) - 1.0) if years > 0 else 0.0,
+                "annualised_volatility": float(volatility),
+                "sharpe": sharpe_ratio(returns),
+                "max_drawdown": float(drawdown.min()),
+                "trade_count": len(trades),
+                "win_rate": float((trades["return"] > 0).mean()) if len(trades) > 0 else 0.0,
+                "exposure": float(position.mean())}
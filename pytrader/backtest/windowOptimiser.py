@@ -0,0 +1,259 @@
+import functools
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy
+import pandas
+
+from pytrader import common
+from pytrader.backtest.backtest import indicator_confidence, sharpe_ratio, simulate, TRADING_DAYS_PER_YEAR
+from pytrader.marketData.indicatorPlan import IndicatorPlan, Window
+from pytrader.marketData.windowRegistry import window_column_names
+
+DEFAULT_TRAIN_BARS: int = 2 * TRADING_DAYS_PER_YEAR
+DEFAULT_TEST_BARS: int = TRADING_DAYS_PER_YEAR // 2
+DEFAULT_CHUNK_SIZE: int = 64
+
+DEFAULT_WINDOW_GRID: Dict[common.Indicator, List[Window]] = {
+    common.Indicator.SMA: [5, 10, 20, 50],
+    common.Indicator.EMA: [5, 10, 20, 50],
+    common.Indicator.RSI: [7, 14, 21],
+    common.Indicator.MACD: [(12, 26, 9), (8, 17, 9), (5, 35, 5)],
+    common.Indicator.BOLLINGER: [10, 20, 40],
+    common.Indicator.VOLUME: [7, 14, 21],
+}
+
+Segment = Tuple[int, int]
+
+# state of the process scoring grid points, the bars are views onto shared memory when running in a worker pool.
+_bars: Dict[str, numpy.ndarray] = {}
+_shared: List[shared_memory.SharedMemory] = []
+_confidences: Dict[Tuple[common.Indicator, Window], numpy.ndarray] = {}
+
+
+def walk_forward_segments(bar_count: int, train_bars: int, test_bars: int) -> List[Tuple[Segment, Segment]]:
+    """
+    Splits the history into consecutive (train, test) folds, each test segment directly following its train segment
+    and the test segments tiling the end of the history. \n
+    :param bar_count: number of bars in the history.
+    :param train_bars: number of bars in each train segment.
+    :param test_bars: number of bars in each test segment.
+    :return: list of ((train start, train end), (test start, test end)), ends are exclusive.
+    """
+    if bar_count < train_bars + test_bars:
+        raise ValueError(f"walk_forward_segments: {bar_count} bars is too short for {train_bars} train and "
+                         f"{test_bars} test bars.")
+    first_test = train_bars + (bar_count - train_bars) % test_bars
+    return [((test_start - train_bars, test_start), (test_start, test_start + test_bars))
+            for test_start in range(first_test, bar_count, test_bars)]
+
+
+def _attach(shared: Dict[str, Tuple[str, Tuple[int, ...], str]]):
+    """
+    Pool initialiser, maps the bars published by the parent as read-only arrays.
+    """
+    _bars.clear()
+    _confidences.clear()
+    for name, (shared_name, shape, dtype) in shared.items():
+        memory = shared_memory.SharedMemory(name=shared_name)
+        _shared.append(memory)
+        view = numpy.ndarray(shape, dtype=dtype, buffer=memory.buf)
+        view.flags.writeable = False
+        _bars[name] = view
+
+
+def _set_bars(bars: Dict[str, numpy.ndarray]):
+    _bars.clear()
+    _confidences.clear()
+    _bars.update(bars)
+
+
+def _confidence(indicator: common.Indicator, window: Window) -> numpy.ndarray:
+    """
+    Confidence of the indicator over the whole history, cached so it is computed once per process however many grid
+    points use it.  Indicators only look back, so slicing the full history is the same as computing each segment.
+    """
+    key = (indicator, window)
+    if key not in _confidences:
+        data = pandas.DataFrame({"adjclose": _bars["close"], "volume": _bars["volume"]})
+        result = IndicatorPlan([key]).execute(data)[key]
+        _confidences[key] = indicator_confidence(indicator, window, result, data["adjclose"])
+    return _confidences[key]
+
+
+def _score_points(points: List[Tuple[Tuple[common.Indicator, Window], ...]], segments: List[Segment],
+                  buy_threshold: float, sell_threshold: float, commission: float) -> numpy.ndarray:
+    """
+    Sharpe ratio of every grid point on every segment. \n
+    :return: (points x segments) scores.
+    """
+    prices = _bars["close"]
+    scores = numpy.zeros((len(points), len(segments)))
+    for i, point in enumerate(points):
+        confidence = sum(_confidence(indicator, window) for indicator, window in point) / len(point)
+        for j, (start, end) in enumerate(segments):
+            _, _, returns = simulate(confidence[start:end], prices[start:end], buy_threshold, sell_threshold,
+                                     commission)
+            scores[i, j] = sharpe_ratio(returns)
+    return scores
+
+
+@dataclass
+class WindowOptimiserResult:
+    """
+    Winning windows of a ticker and the walk-forward scores they were chosen with.
+    """
+    ticker: str
+    trade_intent: common.TradeIntent
+    windows: Dict[common.Indicator, Window]
+    walk_forward_score: float
+    fold_windows: List[Dict[common.Indicator, Window]] = field(default_factory=list)
+    fold_test_scores: List[float] = field(default_factory=list)
+    points_evaluated: int = 0
+
+
+class WindowOptimiser:
+    """
+    Walk-forward optimiser of the indicator windows.  Every combination of the window grid is backtested on each train
+    segment, the best one is scored on the test segment that follows it, and the windows that win on the most recent
+    train segment are the ones written back.  The grid is spread across a process pool that reads the bars from
+    shared memory, and each worker caches the indicator series it has computed so grid points sharing a window reuse
+    them.
+    """
+
+    def __init__(self, grid: Optional[Dict[common.Indicator, List[Window]]] = None, buy_threshold: float = 0.3,
+                 sell_threshold: float = -0.3, train_bars: Optional[int] = DEFAULT_TRAIN_BARS,
+                 test_bars: Optional[int] = DEFAULT_TEST_BARS, commission: Optional[float] = 0.0,
+                 max_workers: Optional[int] = None, chunk_size: Optional[int] = DEFAULT_CHUNK_SIZE):
+        self.__grid: Dict[common.Indicator, List[Window]] = dict(grid if grid is not None else DEFAULT_WINDOW_GRID)
+        self.__buy_threshold: float = buy_threshold
+        self.__sell_threshold: float = sell_threshold
+        self.__train_bars: int = train_bars
+        self.__test_bars: int = test_bars
+        self.__commission: float = commission
+        self.__max_workers: int = max_workers if max_workers is not None else os.cpu_count() or 1
+        self.__chunk_size: int = chunk_size
+
+    @property
+    def grid(self) -> Dict[common.Indicator, List[Window]]:
+        return dict(self.__grid)
+
+    def points(self) -> List[Tuple[Tuple[common.Indicator, Window], ...]]:
+        """
+        Returns every combination of windows in the grid.
+        """
+        indicators = list(self.__grid.keys())
+        return [tuple(zip(indicators, windows)) for windows in itertools.product(*self.__grid.values())]
+
+    def optimise(self, ticker: str, trade_intent: common.TradeIntent, data: pandas.DataFrame) -> WindowOptimiserResult:
+        """
+        Finds the best windows of the ticker over its history. \n
+        :param ticker: name of ticker.
+        :param trade_intent: intended trade type the windows are for.
+        :param data: bars with an 'adjclose' or 'Adj Close' column and a 'volume' or 'Volume' column.
+        :return: result.
+        """
+        close = data['adjclose'] if 'adjclose' in data.columns else data['Adj Close']
+        volume = data['volume'] if 'volume' in data.columns else data['Volume']
+        bars = {"close": close.to_numpy(dtype=numpy.float64), "volume": volume.to_numpy(dtype=numpy.float64)}
+
+        folds = walk_forward_segments(len(close), self.__train_bars, self.__test_bars)
+        # the final segment is the most recent train window, it picks the windows used from now on.
+        segments = [segment for fold in folds for segment in fold] + [(len(close) - self.__train_bars, len(close))]
+        points = self.points()
+        scores = self.__score(points, segments, bars)
+
+        fold_windows, fold_test_scores = [], []
+        for f in range(len(folds)):
+            best = int(numpy.argmax(scores[:, 2 * f]))
+            fold_windows.append(dict(points[best]))
+            fold_test_scores.append(float(scores[best, 2 * f + 1]))
+        winner = int(numpy.argmax(scores[:, -1]))
+        return WindowOptimiserResult(ticker=ticker, trade_intent=trade_intent, windows=dict(points[winner]),
+                                     walk_forward_score=float(numpy.mean(fold_test_scores)),
+                                     fold_windows=fold_windows, fold_test_scores=fold_test_scores,
+                                     points_evaluated=len(points))
+
+    def __score(self, points: List, segments: List[Segment], bars: Dict[str, numpy.ndarray]) -> numpy.ndarray:
+        score = functools.partial(_score_points, segments=segments, buy_threshold=self.__buy_threshold,
+                                  sell_threshold=self.__sell_threshold, commission=self.__commission)
+        if self.__max_workers <= 1 or len(points) <= self.__chunk_size:
+            _set_bars(bars)
+            return score(points)
+
+        shared, published = {}, []
+        try:
+            for name, values in bars.items():
+                memory = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                published.append(memory)
+                numpy.ndarray(values.shape, dtype=values.dtype, buffer=memory.buf)[:] = values
+                shared[name] = (memory.name, values.shape, values.dtype.str)
+            # chunks are sorted by grid order, so the points of a chunk share most of their windows.
+            chunks = [points[i:i + self.__chunk_size] for i in range(0, len(points), self.__chunk_size)]
+            with ProcessPoolExecutor(max_workers=self.__max_workers, initializer=_attach,
+                                     initargs=(shared,)) as executor:
+                results = list(executor.map(score, chunks))
+            return numpy.vstack(results)
+        finally:
+            for memory in published:
+                memory.close()
+                memory.unlink()
+
+    @staticmethod
+    def write_json(result: WindowOptimiserResult, file: Union[str, Path]):
+        """
+        Writes the winning windows into a windows json file, keeping the case of its existing column names. \n
+        :param result: optimiser result.
+        :param file: windows json file, e.g. algo/algo_windows.json.
+        """
+        file = Path(file)
+        rows = []
+        if file.exists():
+            with open(file) as json_file:
+                rows = json.load(json_file)
+        upper = len(rows) > 0 and "NAME" in rows[0]
+        name_key = "NAME" if upper else "name"
+        row = next((r for r in rows if r.get(name_key) == result.ticker), None)
+        if row is None:
+            row = {name_key: result.ticker}
+            rows.append(row)
+        for column, window in window_columns(result).items():
+            row[column.upper() if upper else column] = window
+        with open(file, "w") as json_file:
+            json.dump(rows, json_file, indent=1)
+
+    @staticmethod
+    def write_sql(result: WindowOptimiserResult, windows_db) -> bool:
+        """
+        Writes the winning windows into the windows table. \n
+        :param result: optimiser result.
+        :param windows_db: SQLDbWindows table.
+        :return: whether the update was successful.
+        """
+        from pytrader.sql.sqlDb.sqlDb import SQLQueryResponseType
+
+        response = windows_db.update_window(common.Asset(result.ticker, common.AssetType.PAPER_STOCK),
+                                            window_columns(result))
+        if response != SQLQueryResponseType.SUCCESSFUL:
+            return False
+        windows_db.update_local_stores()
+        return True
+
+
+def window_columns(result: WindowOptimiserResult) -> Dict[str, int]:
+    """
+    Returns the winning windows keyed by the windows file/table column names. \n
+    :param result: optimiser result.
+    :return: dict of column name to window.
+    """
+    columns = {}
+    for indicator, window in result.windows.items():
+        values = window if isinstance(window, tuple) else (window,)
+        columns.update(zip(window_column_names(indicator, result.trade_intent), (int(v) for v in values)))
+    return columns
@@ -0,0 +1,99 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy
+import psutil
+
+# algo_main and its children import each other as top level modules, as when run from the algo directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "algo"))
+
+from pytrader.algo.algo_forkserver import ForkServer, FORK_SERVER_SUPPORTED, PRELOAD_MODULES, preload
+
+CHILD_FLAG = "--child"
+
+
+def run_child():
+    """
+    Stands in for algo_spawn, imports what it imports then reports that it is ready to analyse, and waits for stdin to
+    close so its memory can be measured.
+    """
+    preload(PRELOAD_MODULES)
+    sys.stdout.write("READY\n")
+    sys.stdin.readline()
+
+
+def start_popen(_: ForkServer):
+    return subprocess.Popen([sys.executable, "-u", os.path.abspath(__file__), CHILD_FLAG],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+
+
+def start_forked(server: ForkServer):
+    return server.spawn(os.path.abspath(__file__), [CHILD_FLAG])
+
+
+def benchmark(start, server: ForkServer, children: int) -> dict:
+    """
+    Starts the children one after another and measures them. \n
+    :param start: starts a child.
+    :param server: fork server, started and preloaded beforehand.
+    :param children: number of children.
+    :return: seconds each child took to be ready, and its rss and uss in MB.
+    """
+    ready, rss, uss, processes = [], [], [], []
+    try:
+        for _ in range(children):
+            before = time.perf_counter()
+            process = start(server)
+            processes.append(process)
+            # skip anything the imports print, e.g. yahoo_fin's warnings.
+            line = process.stdout.readline()
+            while len(line) > 0 and line.strip() != b"READY":
+                line = process.stdout.readline()
+            if len(line) == 0:
+                raise RuntimeError(f"child {process.pid} failed to start.")
+            ready.append(time.perf_counter() - before)
+        for process in processes:
+            memory = psutil.Process(process.pid).memory_full_info()
+            rss.append(memory.rss / 2 ** 20)
+            uss.append(memory.uss / 2 ** 20)
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+    return {"ready": numpy.array(ready), "rss": numpy.array(rss), "uss": numpy.array(uss)}
+
+
+def print_results(mode: str, results: dict):
+    ready = results["ready"] * 1000
+    print(f"{mode:>10} | ready ms mean {ready.mean():8.1f} p50 {numpy.percentile(ready, 50):8.1f} "
+          f"max {ready.max():8.1f} | rss MB {results['rss'].mean():7.1f} | unique MB {results['uss'].mean():7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the time to first analysis and the memory of algo_main's "
+                                                 "subprocesses when started with Popen against the fork server.")
+    parser.add_argument("-n", "--children", type=int, default=8, help="number of children to start per mode.")
+    arguments = parser.parse_args()
+    if not FORK_SERVER_SUPPORTED:
+        sys.exit("The fork server isn't supported on this platform.")
+    print(f"preloading: {', '.join(PRELOAD_MODULES)}")
+    server = ForkServer()
+    try:
+        # the first child waits for the server to preload, which is paid once rather than per child.
+        before = time.perf_counter()
+        benchmark(start_forked, server, 1)
+        print(f"fork server ready in {(time.perf_counter() - before) * 1000:.1f} ms")
+        print_results("popen", benchmark(start_popen, server, arguments.children))
+        print_results("forkserver", benchmark(start_forked, server, arguments.children))
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == CHILD_FLAG:
+        run_child()
+    else:
+        main()
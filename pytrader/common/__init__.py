@@ -3,6 +3,7 @@ from pytrader.common.dispatch import Sender, Signal
 from pytrader.common.indicator import Indicator
 from pytrader.common.log import Log
 from pytrader.common.order import Order, OrderType, OrderStatus
+from pytrader.common.orderId import OrderIdGenerator
 from pytrader.common.requests import RequestType, ResponseType, ResponseStatus
 from pytrader.common.state import State
 from pytrader.common.tradeIntent import TradeIntent
@@ -5,10 +5,12 @@ class Signal(enum.Enum):
     TRADE_MANAGER = "TRADE_MANAGER"
     RISK_PARITY_MANAGER = "RISK_PARITY_MANAGER"
     EXCHANGE_MANAGER = "EXCHANGE_MANAGER"
+    SQL_MANAGER = "SQL_MANAGER"
 
 
 class Sender(enum.Enum):
     TRADE_MANAGER = "TRADE_MANAGER"
     RISK_PARITY_MANAGER = "RISK_PARITY_MANAGER"
     EXCHANGE_MANAGER = "EXCHANGE_MANAGER"
+    SQL_MANAGER = "SQL_MANAGER"
 
@@ -0,0 +1,90 @@
+import datetime
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+from pytrader.common.order import OrderType
+
+# ids are laid out in decimal as <prefix><12 digit milliseconds><2 digit node><3 digit sequence>, e.g.
+# 1 000167512345678 03 042, so they stay readable and fit in a signed 64-bit column.
+ORDER_ID_EPOCH: datetime.datetime = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+ORDER_ID_NODES: int = 100
+ORDER_ID_SEQUENCES: int = 1000
+ORDER_ID_MILLISECONDS: int = 10 ** 12
+ORDER_ID_PREFIX_SCALE: int = ORDER_ID_MILLISECONDS * ORDER_ID_NODES * ORDER_ID_SEQUENCES
+
+
+class OrderIdGenerator:
+    """
+    Generates unique order ids locally, without asking the db whether they are taken.  An id is the buy (1) or sell
+    (2) prefix followed by the milliseconds since ORDER_ID_EPOCH, the node that generated it and a sequence number
+    within the millisecond.  Ids only ever increase: if the clock goes backwards, or more than ORDER_ID_SEQUENCES are
+    generated in a millisecond, the time carries on from the last id.  After a restart, recover from the largest ids
+    persisted so new ids are always greater than them.
+    """
+
+    def __init__(self, node: Optional[int] = 0):
+        """
+        :param node: id of this process among those placing orders on the same tables, 0 to ORDER_ID_NODES - 1.
+        """
+        if not 0 <= node < ORDER_ID_NODES:
+            raise ValueError(f"order id node must be between 0 and {ORDER_ID_NODES - 1}, got {node}")
+        self.__node: int = node
+        self.__last: Tuple[int, int] = (-1, ORDER_ID_SEQUENCES - 1)
+        self.__lock: threading.Lock = threading.Lock()
+
+    @property
+    def node(self) -> int:
+        return self.__node
+
+    @staticmethod
+    def prefix(order_type: OrderType) -> int:
+        """
+        Returns the prefix of ids for the order type, 1 for buys and 2 for everything else.
+        """
+        return 1 if order_type == OrderType.BUY else 2
+
+    @staticmethod
+    def split(order_id: int) -> Tuple[int, int, int, int]:
+        """
+        Splits an id into its parts. \n
+        :param order_id: id of the order.
+        :return: prefix, milliseconds since ORDER_ID_EPOCH, node and sequence.
+        """
+        prefix, rest = divmod(order_id, ORDER_ID_PREFIX_SCALE)
+        milliseconds, rest = divmod(rest, ORDER_ID_NODES * ORDER_ID_SEQUENCES)
+        node, sequence = divmod(rest, ORDER_ID_SEQUENCES)
+        return prefix, milliseconds, node, sequence
+
+    def next_id(self, order_type: OrderType) -> int:
+        """
+        Generates a new id. \n
+        :param order_type: type of the order, used for the prefix.
+        :return: id.
+        """
+        now = int((time.time() - ORDER_ID_EPOCH.timestamp()) * 1000)
+        with self.__lock:
+            milliseconds, sequence = self.__last
+            if now > milliseconds:
+                milliseconds, sequence = now, 0
+            elif sequence + 1 < ORDER_ID_SEQUENCES:
+                sequence += 1
+            else:
+                milliseconds, sequence = milliseconds + 1, 0
+            self.__last = (milliseconds, sequence)
+        return ((self.prefix(order_type) * ORDER_ID_MILLISECONDS + milliseconds) * ORDER_ID_NODES + self.__node) \
+            * ORDER_ID_SEQUENCES + sequence
+
+    def recover(self, order_ids: Iterable[int]):
+        """
+        Moves the generator past the given ids, e.g. the largest persisted ids after a restart.  Ids from before this
+        scheme, or from other nodes, are safe to pass. \n
+        :param order_ids: ids that new ids must be greater than.
+        """
+        with self.__lock:
+            for order_id in order_ids:
+                if order_id is None:
+                    continue
+                # the next id starts on the following millisecond, so it beats every node's ids in this one.
+                _, milliseconds, _, _ = self.split(int(order_id))
+                self.__last = max(self.__last, (milliseconds, ORDER_ID_SEQUENCES - 1))
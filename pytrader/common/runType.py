@@ -5,3 +5,4 @@ class RunType(enum.Enum):
     DEBUG = "DEBUG"
     PRODUCTION = "PRODUCTION"
     TEST = "TEST"
+    REPLAY = "REPLAY"
@@ -1,3 +1,4 @@
+import functools
 import time
 
 
@@ -9,6 +10,7 @@ def timed(function):
     :return:
     """
 
+    @functools.wraps(function)
     def wrapper(*args, **kwargs):
         before = time.time()
         value = function(*args, **kwargs)
@@ -100,6 +100,16 @@ USER_PAPER_MODE: bool = True
 USER_USE_RISK_PARITY: bool = False
 USER_USE_TRADER: bool = True
 USER_OPEN_TRADE_TIME_DELTA: int = 3600
+USER_ORDER_RECONCILE_INTERVAL: int = 5
+# id of this process among those placing orders, so the order ids it generates can't collide with theirs.
+USER_ORDER_ID_NODE: int = 0
+USER_SQL_POOL_SIZE: int = 4
+# writes to the trade tables are batched until there are this many, or the oldest has waited this many seconds.
+USER_SQL_BATCH_SIZE: int = 100
+USER_SQL_BATCH_DELAY: float = 0.005
+# seconds cached buy/sell thresholds are used before checking for changes, and assets without any are given defaults.
+USER_THRESHOLD_CACHE_TTL: float = 300.0
+USER_THRESHOLD_CACHE_NEGATIVE_TTL: float = 60.0
 
 # --------------------
 # Developer set params
@@ -1,6 +1,10 @@
 from pytrader.exchange.exchange import Exchange, ExchangeName, ExchangeType, ExchangeRequestResponse
+from pytrader.exchange.exchangeClientPool import ExchangeClientPool
+from pytrader.exchange.exchangeSnapshot import ExchangeSnapshot, ExchangeSnapshotService
+from pytrader.exchange.orderEngine import OrderEngine
 from pytrader.exchange.exchangeCrypto import ExchangeCrypto
 from pytrader.exchange.exchangeCryptoPaper import ExchangeCryptoPaper
 from pytrader.exchange.exchangeManager import ExchangeManager
 from pytrader.exchange.exchangeStock import ExchangeStock
 from pytrader.exchange.exchangeStockPaper import ExchangeStockPaper
+from pytrader.exchange.exchangeSimulated import ExchangeSimulated
@@ -1,11 +1,13 @@
 import enum
 import json
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 from yarl import URL
 
 from pytrader import common
+from pytrader.exchange.exchangeClientPool import ExchangeClientPool, DEFAULT_POOL_SIZE, DEFAULT_HEALTH_CHECK_INTERVAL
+from pytrader.exchange.exchangeSnapshot import ExchangeSnapshot, ExchangeSnapshotService, DEFAULT_SNAPSHOT_TTL
 
 
 class ExchangeName(enum.Enum):
@@ -14,6 +16,7 @@ class ExchangeName(enum.Enum):
      """
     UNKNOWN = "UNKNOWN"
     ALPACA_PAPER = "ALPACA_PAPER"
+    SIMULATED = "SIMULATED"
 
 
 class ExchangeType(enum.Enum):
@@ -55,9 +58,18 @@ class Exchange(ABC):
     Class that holds the exchange type and name in order to classify what it can trade.
     """
 
-    def __init__(self, name: ExchangeName, exchange_type: ExchangeType):
+    def __init__(self, name: ExchangeName, exchange_type: ExchangeType,
+                 client_pool_size: Optional[int] = DEFAULT_POOL_SIZE,
+                 health_check_interval: Optional[float] = DEFAULT_HEALTH_CHECK_INTERVAL,
+                 snapshot_ttl: Optional[float] = DEFAULT_SNAPSHOT_TTL):
         self.__name: ExchangeName = name
         self.__type: ExchangeType = exchange_type
+        # exchanges that don't talk to an api, and so don't override create_client, have no clients to pool.
+        self.__client_pool: Optional[ExchangeClientPool] = None
+        if type(self).create_client is not Exchange.create_client:
+            self.__client_pool = ExchangeClientPool(self.create_client, client_pool_size, self.check_client,
+                                                    health_check_interval)
+        self.__snapshots: ExchangeSnapshotService = ExchangeSnapshotService(self, snapshot_ttl)
         self.__url: URL = self.get_url()
         self.__key: str = self.get_key()
         self.__secret: str = self.get_secret()
@@ -94,6 +106,83 @@ class Exchange(ABC):
     def websocket(self) -> str:
         return self.__websocket
 
+    @property
+    def client_pool(self) -> Optional[ExchangeClientPool]:
+        """
+        pool of the exchange's clients, None if the exchange doesn't have a client.
+        """
+        return self.__client_pool
+
+    def client(self):
+        """
+        Borrows a client of the exchange from its pool, for use in a with block. \n
+        :return: context manager giving the client.
+        """
+        if self.__client_pool is None:
+            raise NotImplementedError(f"{self.__class__.__name__} does not have a client.")
+        return self.__client_pool.client()
+
+    def create_client(self) -> Any:
+        """
+        Creates a new client for the exchange's pool.  Exchanges that talk to an api override this. \n
+        :return: client.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not have a client.")
+
+    def check_client(self, client: Any) -> bool:
+        """
+        Returns whether a pooled client that has been idle can still be used. \n
+        :param client: client being checked.
+        :return: whether the client is healthy.
+        """
+        return True
+
+    def snapshot(self, symbols: Optional[List[str]] = None) -> ExchangeSnapshot:
+        """
+        Returns a recent snapshot of the account and the latest prices, shared between callers for a short time. \n
+        :param symbols: symbols that need a price, on top of the positions held.
+        :return: snapshot.
+        """
+        return self.__snapshots.snapshot(symbols)
+
+    def invalidate_snapshot(self):
+        """
+        Drops the cached snapshot so the next one is taken from the exchange.
+        """
+        self.__snapshots.invalidate()
+
+    def get_snapshot(self, symbols: List[str]) -> ExchangeSnapshot:
+        """
+        Takes a snapshot of the account and the latest prices of the symbols and positions.  Exchanges that can fetch
+        these in a few requests override this, by default it is built from the single asset methods. \n
+        :param symbols: symbols to price.
+        :return: snapshot.
+        """
+        holdings = self.get_holdings()
+        positions = {asset.name: float(asset.qty) for asset in holdings}
+        asset_type = common.AssetType[self.__type.name]
+        names = set(symbols) | positions.keys()
+        prices = {name: self.determine_value(common.Asset(name, asset_type)) for name in names}
+        cash = self.get_cash()
+        return ExchangeSnapshot(cash=cash, equity=cash + sum(qty * prices[name] for name, qty in positions.items()),
+                                positions=positions, prices=prices)
+
+    def get_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Returns the latest prices of the symbols, used to add them to a snapshot that hasn't expired.  Exchanges that
+        can price symbols without the account and positions override this, by default a snapshot is taken. \n
+        :param symbols: symbols to price.
+        :return: price by symbol.
+        """
+        return self.get_snapshot(symbols).prices
+
+    def close(self):
+        """
+        Closes the pooled clients of the exchange.
+        """
+        if self.__client_pool is not None:
+            self.__client_pool.close()
+
     @abstractmethod
     def get_url(self) -> URL:
         """
@@ -212,6 +301,15 @@ class Exchange(ABC):
         @return: order status
         """
 
+    def update_order_statuses(self, orders: List[common.Order]) -> List[common.Order]:
+        """
+        updates the status of many orders at once.  Exchanges that can list their orders in one request override this,
+        by default each order is updated on its own.
+        @param orders: the orders being inspected
+        @return: updated orders
+        """
+        return [self.update_order_status(order) for order in orders]
+
     @abstractmethod
     def determine_value(self, asset: common.Asset) -> float:
         """
@@ -0,0 +1,170 @@
+import collections
+import contextlib
+import threading
+import time
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple
+
+import numpy
+
+DEFAULT_POOL_SIZE: int = 4
+DEFAULT_HEALTH_CHECK_INTERVAL: float = 60.0
+LATENCY_SAMPLES: int = 1024
+
+
+class ExchangeClientPool:
+    """
+    Pool of reusable exchange clients.  A client keeps its http session, and so its keep-alive connection, between
+    borrows.  Clients are created on demand up to the pool size, borrowing blocks once they are all in use, and a client
+    that has been idle for longer than the health check interval is checked before it is handed out.  A client that
+    raises a connection error (OSError, which requests' errors derive from) is closed rather than returned to the pool.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: Optional[int] = DEFAULT_POOL_SIZE,
+                 health_check: Optional[Callable[[Any], bool]] = None,
+                 health_check_interval: Optional[float] = DEFAULT_HEALTH_CHECK_INTERVAL):
+        """
+        :param factory: creates a new client.
+        :param size: maximum number of clients.
+        :param health_check: returns whether a client is still usable, clients are always usable if None.
+        :param health_check_interval: seconds a client can be idle before it is checked again.
+        """
+        if size < 1:
+            raise ValueError(f"ExchangeClientPool: size must be at least 1, not {size}.")
+        self.__factory: Callable[[], Any] = factory
+        self.__size: int = size
+        self.__health_check: Optional[Callable[[Any], bool]] = health_check
+        self.__health_check_interval: float = health_check_interval
+        # idle clients and the time they were returned, most recently used last.
+        self.__idle: List[Tuple[Any, float]] = []
+        self.__open: int = 0
+        self.__closed: bool = False
+        self.__condition: threading.Condition = threading.Condition()
+        self.__borrows: int = 0
+        self.__created: int = 0
+        self.__discarded: int = 0
+        self.__health_checks: int = 0
+        self.__health_check_failures: int = 0
+        self.__latencies: Deque[float] = collections.deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def open(self) -> int:
+        """
+        number of clients currently open, idle or borrowed.
+        """
+        return self.__open
+
+    @property
+    def reuse_rate(self) -> float:
+        """
+        fraction of borrows that were given an existing client rather than a new one.
+        """
+        return 1.0 - self.__created / self.__borrows if self.__borrows > 0 else 0.0
+
+    @contextlib.contextmanager
+    def client(self) -> Iterator[Any]:
+        """
+        Borrows a client for the duration of the with block. \n
+        :return: client.
+        """
+        client = self.__acquire()
+        before = time.perf_counter()
+        discard = False
+        try:
+            yield client
+        except OSError:
+            discard = True
+            raise
+        finally:
+            self.__release(client, time.perf_counter() - before, discard)
+
+    def stats(self) -> dict:
+        """
+        Returns the usage of the pool, latencies are the seconds a client was borrowed for over the latest calls.
+        """
+        latencies = numpy.array(self.__latencies)
+        return {"size": self.__size, "open": self.__open, "idle": len(self.__idle), "borrows": self.__borrows,
+                "created": self.__created, "reuse_rate": self.reuse_rate, "discarded": self.__discarded,
+                "health_checks": self.__health_checks, "health_check_failures": self.__health_check_failures,
+                "latency_mean": float(latencies.mean()) if len(latencies) > 0 else 0.0,
+                "latency_p50": float(numpy.percentile(latencies, 50)) if len(latencies) > 0 else 0.0,
+                "latency_p99": float(numpy.percentile(latencies, 99)) if len(latencies) > 0 else 0.0}
+
+    def close(self):
+        """
+        Closes every idle client, borrowed clients are closed when they are returned.
+        """
+        with self.__condition:
+            idle, self.__idle = self.__idle, []
+            self.__open -= len(idle)
+            self.__closed = True
+            self.__condition.notify_all()
+        for client, _ in idle:
+            self.__close(client)
+
+    def __acquire(self) -> Any:
+        while True:
+            with self.__condition:
+                while not self.__closed and not self.__idle and self.__open >= self.__size:
+                    self.__condition.wait()
+                if self.__closed:
+                    raise RuntimeError("ExchangeClientPool: the pool is closed.")
+                self.__borrows += 1
+                if self.__idle:
+                    client, returned = self.__idle.pop()
+                else:
+                    self.__open += 1
+                    self.__created += 1
+                    client, returned = None, None
+            if client is None:
+                try:
+                    return self.__factory()
+                except BaseException:
+                    with self.__condition:
+                        self.__open -= 1
+                        self.__condition.notify()
+                    raise
+            if self.__is_healthy(client, returned):
+                return client
+            # a replacement is created on the next pass, count it as a new client rather than a reuse.
+            with self.__condition:
+                self.__borrows -= 1
+            self.__release(client, None, discard=True)
+
+    def __is_healthy(self, client: Any, returned: float) -> bool:
+        if self.__health_check is None or time.monotonic() - returned < self.__health_check_interval:
+            return True
+        self.__health_checks += 1
+        try:
+            healthy = bool(self.__health_check(client))
+        except Exception:
+            healthy = False
+        if not healthy:
+            self.__health_check_failures += 1
+        return healthy
+
+    def __release(self, client: Any, latency: Optional[float], discard: Optional[bool] = False):
+        with self.__condition:
+            if latency is not None:
+                self.__latencies.append(latency)
+            discard = discard or self.__closed
+            if discard:
+                self.__open -= 1
+                self.__discarded += 1
+            else:
+                self.__idle.append((client, time.monotonic()))
+            self.__condition.notify()
+        if discard:
+            self.__close(client)
+
+    @staticmethod
+    def __close(client: Any):
+        close = getattr(client, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass
@@ -15,21 +15,43 @@ class ExchangeManager:
     Handles the exchanges and different types of requests etc. This should be interacted with by the different managers.
     """
 
-    def __init__(self, run_type: Optional[common.RunType] = common.RunType.PRODUCTION):
+    def __init__(self, run_type: Optional[common.RunType] = common.RunType.PRODUCTION,
+                 paper_stock_exchange: Optional[exchange.Exchange] = None, sql_manager=None,
+                 reconcile_interval: Optional[float] = config.USER_ORDER_RECONCILE_INTERVAL):
+        """
+        :param run_type: run type, REPLAY neither blocks nor loads the open trades.
+        :param paper_stock_exchange: paper stock exchange, defaults to the Alpaca paper exchange.
+        :param sql_manager: sql manager, or any object with the same tables, defaults to the MySQL manager.
+        :param reconcile_interval: minimum seconds between reconciling the open orders with the exchanges.
+        """
         self.__status = common.State.UNKNOWN
         self.__sender: common.Sender = common.Sender.EXCHANGE_MANAGER
         self.__signal: common.Signal = common.Signal.EXCHANGE_MANAGER
-        self.__order_queue: List[common.Order] = []
-        self.__sql_manager: sql.SQLManager = sql.SQLManager()
-        self.__paper_stock_exchange = exchange.ExchangeStockPaper()
+        self.__orders: exchange.OrderEngine = exchange.OrderEngine(config.USER_OPEN_TRADE_TIME_DELTA)
+        self.__order_ids: common.OrderIdGenerator = common.OrderIdGenerator(config.USER_ORDER_ID_NODE)
+        self.__sql_manager: sql.SQLManager = sql_manager if sql_manager is not None else sql.SQLManager()
+        self.__paper_stock_exchange = paper_stock_exchange if paper_stock_exchange is not None \
+            else exchange.ExchangeStockPaper()
         self.__run_type: common.RunType = run_type
         self.__trading_manager_status: common.State = common.State.UNKNOWN
+        self.__reconcile_interval: float = reconcile_interval
+        self.__last_reconciled: float = float("-inf")
         self.initialise()
 
     @property
     def paper_stock_exchange(self):
         return self.__paper_stock_exchange
 
+    @property
+    def order_queue(self) -> List[common.Order]:
+        return self.__orders.orders()
+
+    def find_order(self, order_id: int) -> Optional[common.Order]:
+        """
+        Returns the open order with the order id, None if there isn't one.
+        """
+        return self.__orders.find(order_id)
+
     @property
     def stock_exchange(self):
         return self.stock_exchange
@@ -46,20 +68,26 @@ class ExchangeManager:
         Adds the order to the order queue.
         :param order: order to be added.
         """
-        self.__order_queue.append(order)
+        self.__orders.add(order)
 
     def __generate_new_trade_id(self, order: common.Order) -> common.Order:
         """
-        Generates a unique id based on existing ids within the open and trades dbs. \n
+        Generates a unique id locally, greater than every id within the open and trades dbs. \n
         :param order: the order we are generating an ID for.
         :return: order with updated ID.
         """
         if order.asset.id == 0:
-            order.asset.id = self.__sql_manager.open_trades_db.generate_new_asset_id(order)
-            while not self.__sql_manager.trades_db.is_order_id_unique(order.asset.id):
-                order.asset.id = self.__sql_manager.open_trades_db.generate_new_asset_id(order)
+            order.asset.id = self.__order_ids.next_id(order.type)
         return order
 
+    def __recover_order_ids(self):
+        """
+        Moves the order id generator past the largest ids within the open and trades dbs, so ids aren't reused after a
+        restart.
+        """
+        self.__order_ids.recover(self.__sql_manager.open_trades_db.get_max_order_ids() +
+                                 self.__sql_manager.trades_db.get_max_order_ids())
+
     def __fulfill_order(self, order: common.Order) -> common.GenericStatus:
         """
         Fulfills the order to the correct exchange.
@@ -74,22 +102,19 @@ class ExchangeManager:
         order.status = common.OrderStatus.PROCESSING
         order.asset.last_updated = datetime.datetime.now()
 
-        # update sql tables
-        response: sqlDb.SQLQueryResponseType = self.__sql_manager.open_trades_db.commit_trade(order)
-        Log.i(f'Order to {order.type.name} {order.asset.qty} {order.asset.name} was {response.name}.')
+        # update sql tables, the write is batched with the others.
+        self.__sql_manager.trade_writer.open_trade(order)
+        Log.i(f'Order to {order.type.name} {order.asset.qty} {order.asset.name} was placed.')
 
         return common.GenericStatus.SUCCESSFUL
 
     def __remove_order(self, order: common.Order):
         """
-        removes the order from the order queue and the open trades db and then adds it to the trade db. \n
+        removes the order from the order queue and moves it from the open trades db to the trade db. \n
         :param order: order being removed/added to trade db
         """
-        response: sqlDb.SQLQueryResponseType = self.__sql_manager.trades_db.commit_trade(order)
-        if response == sqlDb.SQLQueryResponseType.SUCCESSFUL:
-            response = self.__sql_manager.open_trades_db.delete_trade(order)
-            if response == sqlDb.SQLQueryResponseType.SUCCESSFUL:
-                self.__order_queue.remove(order)
+        self.__sql_manager.trade_writer.close_trade(order)
+        self.__orders.remove(order)
 
     def __reorder(self, order: common.Order):
         """
@@ -110,7 +135,8 @@ class ExchangeManager:
             pass
 
         order.asset.last_updated = datetime.datetime.now()
-        self.__sql_manager.open_trades_db.update_trade(order)
+        self.__sql_manager.trade_writer.update_trade(order)
+        self.__orders.update(order)
 
     @staticmethod
     def __order_failed_or_timed_out_check(order: common.Order) -> bool:
@@ -119,7 +145,7 @@ class ExchangeManager:
         :param order: the order to be checked.
         :return: the success of the transaction on the exchange.
         """
-        if (datetime.datetime.now() - order.asset.last_updated).seconds >= config.USER_OPEN_TRADE_TIME_DELTA \
+        if (datetime.datetime.now() - order.asset.last_updated).total_seconds() >= config.USER_OPEN_TRADE_TIME_DELTA \
                 and order.status == common.OrderStatus.PROCESSING:
             return True
         elif order.status == common.OrderStatus.CANCELLED:
@@ -138,6 +164,8 @@ class ExchangeManager:
 
     def initialise(self):
         self.__init()
+        self.__recover_order_ids()
+        self.__sql_manager.threshold_cache.warm()
         self.__get_existing_open_trades()
         self.request_trading_manager_status()
         self.__status = common.State.READY
@@ -148,15 +176,49 @@ class ExchangeManager:
                 self.request_trading_manager_status()
             self.__status = common.State.RUNNING
             while self.is_running():
-                time.sleep(1)
-                # TODO - this should be reactive or something
-                for order in self.__order_queue:
-                    if order.status == common.OrderStatus.QUEUED:
-                        self.__fulfill_order(order)
-                    elif order.status == common.OrderStatus.FILLED:
-                        self.__remove_order(order)
-                    elif self.__order_failed_or_timed_out_check(order):
-                        self.__reorder(order)
+                # wakes as soon as an order needs something doing, or to reconcile the open orders.
+                self.process_orders(timeout=self.__until_reconcile())
+        elif self.__run_type == common.RunType.REPLAY:
+            # the replay drives process_orders itself, once per bar.
+            self.__status = common.State.RUNNING
+
+    def process_orders(self, timeout: float = 0.0):
+        """
+        Handles the orders that have had an event: queued orders are sent to the exchange, filled orders are moved to
+        the trades db and failed or timed out orders are re-ordered.  The open orders are reconciled with their
+        exchange first when the reconcile interval has passed. \n
+        :param timeout: most seconds to wait for an event, 0 only handles the events that have already happened.
+        """
+        events = self.__orders.next_events(min(timeout, max(self.__until_reconcile(), 0.0)))
+        if self.__until_reconcile() <= 0:
+            self.reconcile_orders()
+            events += self.__orders.next_events(0.0)
+        for order in {id(order): order for order in events}.values():
+            if order not in self.__orders:
+                continue
+            if order.status == common.OrderStatus.QUEUED:
+                self.__fulfill_order(order)
+                self.__orders.update(order)
+            elif order.status == common.OrderStatus.FILLED:
+                self.__remove_order(order)
+            elif self.__order_failed_or_timed_out_check(order):
+                self.__reorder(order)
+
+    def __until_reconcile(self) -> float:
+        return self.__last_reconciled + self.__reconcile_interval - time.monotonic()
+
+    def stop(self):
+        """
+        Stops the manager and disconnects it from the Trading Manager.
+        """
+        self.__status = common.State.STOPPED
+        self.__orders.stop()
+        trade_writer = self.__sql_manager.trade_writer
+        if not trade_writer.flush():
+            Log.e(f"ExchangeManager.stop - failed to write every trade to the db, {trade_writer.pending} still queued "
+                  f"and {len(trade_writer.dropped)} dropped.")
+        dispatcher.disconnect(self.__dispatcher_receive, signal=common.Signal.TRADE_MANAGER.value,
+                              sender=common.Signal.TRADE_MANAGER.value)
 
     def is_running(self) -> bool:
         """
@@ -200,11 +262,7 @@ class ExchangeManager:
         :param new_order: the order we are checking already exists.
         :return: whether the order is unique and should be added.
         """
-        for order in self.__order_queue:
-            if order.asset.name == new_order.asset.name:
-                if order.status == common.OrderStatus.PROCESSING or order.status == common.OrderStatus.QUEUED:
-                    return False
-        return True
+        return not self.__orders.has_open_order(new_order.asset.name)
 
     def __get_assets_from_exchanges(self, asset_type: Optional[common.AssetType] = None) -> List[common.Asset]:
         """
@@ -227,6 +285,31 @@ class ExchangeManager:
             pass
         return assets
 
+    def reconcile_orders(self, orders: Optional[List[common.Order]] = None) -> List[common.Order]:
+        """
+        Updates the status of every open order with one request per exchange, rather than one per order.  Open orders
+        are those processing, or queued with an id (loaded from the open trades db, so possibly already sent). \n
+        :param orders: orders to reconcile, defaults to the open orders in the queue.
+        :return: reconciled orders.
+        """
+        if orders is None:
+            orders = self.__orders.orders(common.OrderStatus.PROCESSING) + \
+                     [order for order in self.__orders.orders(common.OrderStatus.QUEUED) if order.asset.id != 0]
+        by_asset_type = {}
+        for order in orders:
+            by_asset_type.setdefault(order.asset.type, []).append(order)
+        for asset_type, asset_orders in by_asset_type.items():
+            if asset_type == common.AssetType.PAPER_STOCK:
+                self.__paper_stock_exchange.update_order_statuses(asset_orders)
+            else:
+                for order in asset_orders:
+                    self.__update_order_status_from_exchange(order)
+        # orders whose status changed raise an event.
+        for order in orders:
+            self.__orders.update(order)
+        self.__last_reconciled = time.monotonic()
+        return orders
+
     def __update_order_status_from_exchange(self, order: common.Order) -> common.Order:
         """
         updates the order status based on whether the exchange has filled the order, received it or not. \n
@@ -281,17 +364,20 @@ class ExchangeManager:
         Finds all open trades within the exchanges and appends them to the queue. \n
         :return: none
         """
-        if self.__run_type == common.RunType.TEST:
+        if self.__run_type == common.RunType.TEST or self.__run_type == common.RunType.REPLAY:
             return
         open_trades: [sqlDb.daos.SQLDbOpenTradesDao] = self.__sql_manager.open_trades_db.get_all_trades()
-        for open_trade in open_trades:
-            new_order: common.Order = self.__open_trade_dao_to_order(open_trade)
-            self.__update_order_status_from_exchange(new_order)
+        # prices every open trade with one snapshot, rather than a request per trade.
+        self.__paper_stock_exchange.snapshot([open_trade.name for open_trade in open_trades if
+                                              common.AssetType(open_trade.asset_type) == common.AssetType.PAPER_STOCK])
+        new_orders: List[common.Order] = self.reconcile_orders([self.__open_trade_dao_to_order(open_trade)
+                                                                for open_trade in open_trades])
+        for new_order in new_orders:
             if self.__is_new_order_unique(new_order):
-                self.__order_queue.append(new_order)
+                self.__orders.add(new_order)
             else:
                 Log.w(f"__get_stale_requests has found order duplicate for order {new_order}")
-        Log.i(f"found {len(self.__order_queue)} existing orders. They have been added to the order queue successfully.")
+        Log.i(f"found {len(self.__orders)} existing orders. They have been added to the order queue successfully.")
 
     def __dispatcher_receive_order_request(self, order: common.Order):
         """
@@ -354,7 +440,7 @@ class ExchangeManager:
         Handles the buy and sell threshold requests from the Trading Manager.
         :return:
         """
-        buy_threshold, sell_threshold = self.__sql_manager.buy_sell_threshold_db.get_threshold(asset)
+        buy_threshold, sell_threshold = self.__sql_manager.threshold_cache.get_threshold(asset)
         dispatcher.send(status=common.ResponseStatus.SUCCESSFUL, response_type=common.ResponseType.BUY_SELL_THRESHOLDS,
                         buy_threshold=buy_threshold, sell_threshold=sell_threshold, asset=asset,
                         signal=self.__signal.value, sender=self.__sender.value)
@@ -0,0 +1,189 @@
+import math
+import threading
+from typing import Dict, List, Optional
+
+from yarl import URL
+
+from pytrader import common, exchange
+
+Log = common.Log(__file__)
+
+
+class SimulatedOrder:
+    """
+    Order held by the simulated exchange until the next price update fills or rejects it.
+    """
+
+    def __init__(self, client_order_id: str, name: str, side: common.OrderType, qty: float):
+        self.client_order_id: str = client_order_id
+        self.name: str = name
+        self.side: common.OrderType = side
+        self.qty: float = qty
+        self.status: common.OrderStatus = common.OrderStatus.ACCEPTED
+        self.filled_qty: float = 0.0
+        self.filled_price: float = 0.0
+        self.filled_at: Optional[int] = None
+
+
+class ExchangeSimulated(exchange.Exchange):
+    """
+    Extends the Exchange Class with an in-memory paper exchange that stands in for Alpaca when replaying recorded bars.
+    Prices are pushed in with set_price, and market orders are filled at the first price after they are submitted.
+    """
+
+    def __init__(self, cash: Optional[float] = 10000.0, commission: Optional[float] = 0.0):
+        self.__sim_cash: float = cash
+        self.__commission: float = commission
+        self.__positions: Dict[str, float] = {}
+        self.__prices: Dict[str, float] = {}
+        self.__orders: Dict[str, SimulatedOrder] = {}
+        self.__pending: List[SimulatedOrder] = []
+        self.__lock: threading.Lock = threading.Lock()
+        # prices move every bar, so snapshots are never reused.
+        super().__init__(exchange.ExchangeName.SIMULATED, exchange.ExchangeType.PAPER_STOCK, snapshot_ttl=0.0)
+
+    @property
+    def positions(self) -> Dict[str, float]:
+        return dict(self.__positions)
+
+    @property
+    def orders(self) -> Dict[str, SimulatedOrder]:
+        return dict(self.__orders)
+
+    def equity(self) -> float:
+        """
+        Returns the cash plus the value of every position at the last price.
+        """
+        return self.__sim_cash + sum(qty * self.__prices.get(name, 0.0) for name, qty in self.__positions.items())
+
+    def has_pending_order(self, name: str) -> bool:
+        return any(order.name == name for order in self.__pending)
+
+    def set_price(self, name: str, price: float, timestamp: Optional[int] = None):
+        """
+        Updates the price of the asset and fills its pending orders at that price. \n
+        :param name: name of asset.
+        :param price: new price.
+        :param timestamp: time of the price, recorded on the fills.
+        """
+        with self.__lock:
+            self.__prices[name] = price
+            for order in [o for o in self.__pending if o.name == name]:
+                self.__pending.remove(order)
+                self.__fill(order, price, timestamp)
+
+    def __fill(self, order: SimulatedOrder, price: float, timestamp: Optional[int]):
+        """
+        Fills the order at the price.  A buy sized on an earlier price is filled for as many whole units as the cash
+        covers, and only rejected if it cannot buy any.
+        """
+        held = self.__positions.get(order.name, 0.0)
+        if order.side == common.OrderType.BUY:
+            qty = min(order.qty, math.floor(self.__sim_cash / (price * (1.0 + self.__commission))))
+            if qty <= 0:
+                order.status = common.OrderStatus.REJECTED
+                return
+            self.__sim_cash -= qty * price * (1.0 + self.__commission)
+            self.__positions[order.name] = held + qty
+        else:
+            qty = order.qty
+            if qty <= 0 or qty > held:
+                order.status = common.OrderStatus.REJECTED
+                return
+            self.__sim_cash += qty * price * (1.0 - self.__commission)
+            self.__positions[order.name] = held - qty
+            if self.__positions[order.name] == 0:
+                del self.__positions[order.name]
+        order.status = common.OrderStatus.FILLED
+        order.filled_qty = qty
+        order.filled_price = price
+        order.filled_at = timestamp
+
+    def get_url(self) -> URL:
+        return URL("sim://localhost")
+
+    def get_key(self) -> str:
+        return ""
+
+    def get_secret(self) -> str:
+        return ""
+
+    def get_cash(self) -> float:
+        return self.__sim_cash
+
+    def get_holdings(self) -> List[common.Asset]:
+        holdings: List[common.Asset] = []
+        for name, qty in self.__positions.items():
+            a: common.Asset = common.Asset(name, common.AssetType.PAPER_STOCK)
+            a.qty = qty
+            a.value = qty * self.__prices.get(name, 0.0)
+            a.trade_intent = self.get_trade_intent(a)
+            holdings.append(a)
+        return holdings
+
+    def get_websocket(self) -> str:
+        return ""
+
+    def determine_allowance(self) -> float:
+        return 1.0
+
+    def fulfill(self, order: common.Order) -> exchange.ExchangeRequestResponse:
+        if order.type == common.OrderType.BUY:
+            return self.buy(order)
+        elif order.type == common.OrderType.SELL:
+            return self.sell(order)
+
+    def __submit(self, order: common.Order) -> exchange.ExchangeRequestResponse:
+        client_order_id = str(order.asset.id)
+        with self.__lock:
+            if client_order_id in self.__orders:
+                return exchange.ExchangeRequestResponse(common.ResponseStatus.EXISTS)
+            submitted = SimulatedOrder(client_order_id, order.asset.name, order.type, float(order.asset.qty))
+            self.__orders[client_order_id] = submitted
+            self.__pending.append(submitted)
+        return exchange.ExchangeRequestResponse(common.ResponseStatus.SUCCESSFUL, request_params=None,
+                                                listen_required=False)
+
+    def buy(self, order: common.Order) -> exchange.ExchangeRequestResponse:
+        return self.__submit(order)
+
+    def buy_type(self) -> str:
+        return "market"
+
+    def sell(self, order: common.Order) -> exchange.ExchangeRequestResponse:
+        return self.__submit(order)
+
+    def sell_type(self) -> str:
+        return "market"
+
+    def request_allowance(self) -> float:
+        return self.__sim_cash
+
+    def request_quantity(self, asset: common.Asset) -> float:
+        """
+        sells the whole position if the asset is held, otherwise buys as many whole units as the cash allows.
+        """
+        if asset.name in self.__positions:
+            return self.__positions[asset.name]
+        price = self.__prices.get(asset.name)
+        if price is None or price <= 0:
+            return 0.0
+        return float(math.floor(self.__sim_cash / (price * (1.0 + self.__commission))))
+
+    def get_trade_intent(self, asset: common.Asset) -> common.TradeIntent:
+        return common.TradeIntent.SHORT_TRADE
+
+    def update_order_status(self, order: common.Order) -> common.Order:
+        submitted = self.__orders.get(str(order.asset.id))
+        if submitted is None:
+            return order
+        if submitted.status == common.OrderStatus.FILLED:
+            order.status = common.OrderStatus.FILLED
+        elif submitted.status == common.OrderStatus.ACCEPTED:
+            order.status = common.OrderStatus.PROCESSING
+        elif submitted.status == common.OrderStatus.REJECTED:
+            order.status = common.OrderStatus.REJECTED
+        return order
+
+    def determine_value(self, asset: common.Asset) -> float:
+        return self.__prices.get(asset.name, 0.0)
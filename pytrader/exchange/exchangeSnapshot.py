@@ -0,0 +1,116 @@
+import dataclasses
+import datetime
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set
+
+DEFAULT_SNAPSHOT_TTL: float = 2.0
+
+
+@dataclass
+class ExchangeSnapshot:
+    """
+    Account state and latest prices of an exchange, all taken at the same time so the portfolio is valued consistently.
+    """
+    cash: float
+    equity: float
+    last_equity: Optional[float] = None
+    daytrade_count: int = 0
+    positions: Dict[str, float] = field(default_factory=dict)
+    prices: Dict[str, float] = field(default_factory=dict)
+    taken_at: datetime.datetime = field(default_factory=datetime.datetime.now)
+
+    def price(self, name: str) -> float:
+        """
+        Returns the latest price of the asset, 0 if it is not in the snapshot. \n
+        :param name: name of asset.
+        :return: price.
+        """
+        return self.prices.get(name, 0.0)
+
+    def holdings_value(self) -> float:
+        """
+        Returns the value of every position at the snapshot's prices.
+        """
+        return sum(qty * self.price(name) for name, qty in self.positions.items())
+
+    def daily_change_in_equity(self) -> Optional[float]:
+        """
+        Returns the change in equity since the last close as a fraction, None if the exchange doesn't report it.
+        """
+        if not self.last_equity:
+            return None
+        return (self.equity - self.last_equity) / self.last_equity
+
+
+class ExchangeSnapshotService:
+    """
+    Caches the snapshot of an exchange for a short time to live.  Every symbol asked for is remembered and included in
+    later snapshots, so one request prices the whole portfolio, and concurrent callers share a single request when the
+    snapshot has expired.  Symbols missing from a snapshot that hasn't expired are priced on their own and merged into
+    it, rather than retaking the account and positions with them.
+    """
+
+    def __init__(self, exchange, ttl: Optional[float] = DEFAULT_SNAPSHOT_TTL):
+        """
+        :param exchange: exchange the snapshots are taken from, see Exchange.get_snapshot and Exchange.get_prices.
+        :param ttl: seconds a snapshot is reused for.
+        """
+        self.__exchange = exchange
+        self.__ttl: float = ttl
+        self.__symbols: Set[str] = set()
+        self.__snapshot: Optional[ExchangeSnapshot] = None
+        self.__taken: float = float("-inf")
+        self.__lock: threading.Lock = threading.Lock()
+        self.__requests: int = 0
+        self.__price_requests: int = 0
+        self.__hits: int = 0
+
+    @property
+    def requests(self) -> int:
+        return self.__requests
+
+    @property
+    def price_requests(self) -> int:
+        """
+        number of times symbols missing from the snapshot were priced on their own.
+        """
+        return self.__price_requests
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    def snapshot(self, symbols: Optional[Iterable[str]] = None) -> ExchangeSnapshot:
+        """
+        Returns the cached snapshot, or takes a new one if it has expired.  Symbols it is missing are priced and merged
+        into it. \n
+        :param symbols: symbols that need a price, on top of the positions held.
+        :return: snapshot.
+        """
+        symbols = set(symbols) if symbols is not None else set()
+        with self.__lock:
+            if self.__snapshot is not None and time.monotonic() - self.__taken < self.__ttl:
+                missing = symbols - self.__symbols - self.__snapshot.positions.keys()
+                if len(missing) == 0:
+                    self.__hits += 1
+                    return self.__snapshot
+                self.__symbols |= missing
+                prices = self.__exchange.get_prices(sorted(missing))
+                self.__snapshot = dataclasses.replace(self.__snapshot, prices={**self.__snapshot.prices, **prices})
+                self.__price_requests += 1
+                return self.__snapshot
+            self.__symbols |= symbols
+            self.__snapshot = self.__exchange.get_snapshot(sorted(self.__symbols))
+            self.__symbols |= self.__snapshot.positions.keys()
+            self.__taken = time.monotonic()
+            self.__requests += 1
+            return self.__snapshot
+
+    def invalidate(self):
+        """
+        Drops the cached snapshot, e.g. after an order has filled.
+        """
+        with self.__lock:
+            self.__snapshot = None
@@ -1,22 +1,27 @@
 import json
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import alpaca_trade_api
+from alpaca_trade_api.rest import APIError
 from yarl import URL
 
 from pytrader import common, exchange
 from pytrader.cfg import config as cfg
+from pytrader.exchange.exchangeClientPool import DEFAULT_POOL_SIZE
 
 Log = common.Log(__file__)
 
+# most orders alpaca lists in one request.
+LIST_ORDERS_LIMIT: int = 500
+
 
 class ExchangeStockPaper(exchange.Exchange):
     """
     Extends the Exchange Class, returning correct data for the Paper Stock Exchange. We are using Alpaca.
     """
 
-    def __init__(self):
-        super().__init__(exchange.ExchangeName.ALPACA_PAPER, exchange.ExchangeType.PAPER_STOCK)
+    def __init__(self, client_pool_size: Optional[int] = DEFAULT_POOL_SIZE):
+        super().__init__(exchange.ExchangeName.ALPACA_PAPER, exchange.ExchangeType.PAPER_STOCK, client_pool_size)
 
     def get_url(self) -> URL:
         return cfg.ALPACA_PAPER_ADDRESS
@@ -27,16 +32,21 @@ class ExchangeStockPaper(exchange.Exchange):
     def get_secret(self) -> str:
         return cfg.ALPACA_PAPER_SECRET
 
+    def create_client(self) -> alpaca_trade_api.REST:
+        return alpaca_trade_api.REST(self.get_key(), self.get_secret(), self.get_url())
+
+    def check_client(self, client: alpaca_trade_api.REST) -> bool:
+        # the clock is the cheapest authenticated request.
+        client.get_clock()
+        return True
+
     def get_cash(self) -> float:
-        api = alpaca_trade_api.REST(self.get_key(), self.get_secret(), self.get_url())
-        cash = float(api.get_account().cash)
-        api.close()
-        return cash
+        with self.client() as api:
+            return float(api.get_account().cash)
 
     def get_holdings(self) -> List[common.Asset]:
-        api = alpaca_trade_api.REST(self.get_key(), self.get_secret(), self.get_url())
-        assets = api.list_positions()
-        api.close()
+        with self.client() as api:
+            assets = api.list_positions()
         holdings: List[common.Asset] = []
         if assets is not None:
             for asset in assets:
@@ -47,6 +57,28 @@ class ExchangeStockPaper(exchange.Exchange):
                 holdings.append(a)
         return holdings
 
+    def get_snapshot(self, symbols: List[str]) -> exchange.ExchangeSnapshot:
+        """
+        Takes the snapshot with one account, one positions and one multi-symbol latest bars request.
+        """
+        with self.client() as api:
+            account = api.get_account()
+            positions = {position.symbol: float(position.qty) for position in api.list_positions()}
+            names = sorted(set(symbols) | positions.keys())
+            bars = api.get_latest_bars(names) if len(names) > 0 else {}
+        return exchange.ExchangeSnapshot(cash=float(account.cash), equity=float(account.equity),
+                                         last_equity=float(account.last_equity),
+                                         daytrade_count=int(account.daytrade_count), positions=positions,
+                                         prices={name: float(bar.c) for name, bar in bars.items()})
+
+    def get_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Prices the symbols with a single multi-symbol latest bars request.
+        """
+        with self.client() as api:
+            bars = api.get_latest_bars(symbols)
+        return {name: float(bar.c) for name, bar in bars.items()}
+
     def get_websocket(self) -> str:
         return cfg.ALPACA_PAPER_WEBSOCKET
 
@@ -61,11 +93,10 @@ class ExchangeStockPaper(exchange.Exchange):
             return self.sell(order)
 
     def buy(self, order: common.Order) -> exchange.ExchangeRequestResponse:
-        api = alpaca_trade_api.REST(self.get_key(), self.get_secret(), self.get_url())
         qty = self.determine_allowance()
-        api.submit_order(symbol=order.asset.name, qty=qty, side="buy", type=self.buy_type(),
-                         client_order_id=str(order.asset.id))
-        api.close()
+        with self.client() as api:
+            api.submit_order(symbol=order.asset.name, qty=qty, side="buy", type=self.buy_type(),
+                             client_order_id=str(order.asset.id))
         Log.i(f"Successfully bought {qty} {order.asset.name}")
         return exchange.ExchangeRequestResponse(common.ResponseStatus.SUCCESSFUL, request_params=None,
                                                 listen_required=False)
@@ -75,11 +106,10 @@ class ExchangeStockPaper(exchange.Exchange):
         return "market"
 
     def sell(self, order: common.Order) -> exchange.ExchangeRequestResponse:
-        api = alpaca_trade_api.REST(self.get_key(), self.get_secret(), self.get_url())
-        qty = api.get_position(symbol=order.asset.name).qty
-        api.submit_order(symbol=order.asset.name, qty=qty, side="sell", type=self.sell_type(),
-                         client_order_id=str(order.asset.id))
-        api.close()
+        with self.client() as api:
+            qty = api.get_position(symbol=order.asset.name).qty
+            api.submit_order(symbol=order.asset.name, qty=qty, side="sell", type=self.sell_type(),
+                             client_order_id=str(order.asset.id))
         Log.i(f"Successfully sold {qty} {order.asset.name}")
         return exchange.ExchangeRequestResponse(common.ResponseStatus.SUCCESSFUL, request_params=None,
                                                 listen_required=False)
@@ -100,27 +130,53 @@ class ExchangeStockPaper(exchange.Exchange):
         return common.TradeIntent.SHORT_TRADE
 
     def update_order_status(self, order: common.Order) -> common.Order:
-        api = alpaca_trade_api.REST(self.get_key(), self.get_secret(), self.get_url())
-        list_orders = api.list_orders()
-        api.close()
-        for list_order in list_orders:
-            if list_order.client_order_id != order.asset.id.__str__():
+        return self.update_order_statuses([order])[0]
+
+    def update_order_statuses(self, orders: List[common.Order]) -> List[common.Order]:
+        """
+        updates the status of every order from a single listing of the recent orders of their symbols.  If the listing
+        was cut off at LIST_ORDERS_LIMIT, orders older than it are looked up by their client order id one by one.
+        @param orders: the orders being inspected
+        @return: updated orders
+        """
+        if len(orders) == 0:
+            return orders
+        symbols = sorted({order.asset.name for order in orders})
+        with self.client() as api:
+            list_orders = api.list_orders(status="all", limit=LIST_ORDERS_LIMIT, direction="desc", symbols=symbols)
+            # newest first, so the first order listed for a client order id is kept.
+            by_client_order_id = {}
+            for list_order in list_orders:
+                by_client_order_id.setdefault(list_order.client_order_id, list_order)
+            if len(list_orders) >= LIST_ORDERS_LIMIT:
+                for order in orders:
+                    client_order_id = order.asset.id.__str__()
+                    if client_order_id in by_client_order_id:
+                        continue
+                    try:
+                        by_client_order_id[client_order_id] = api.get_order_by_client_order_id(client_order_id)
+                    except APIError as e:
+                        Log.d(f"update_order_statuses - couldn't get order {client_order_id} of {order.asset.name}: "
+                              f"{e}")
+        for order in orders:
+            list_order = by_client_order_id.get(order.asset.id.__str__())
+            if list_order is None:
+                Log.w(f"update_order_statuses - order {order.asset.id} of {order.asset.name} isn't on the exchange.")
                 continue
             if list_order.status == common.OrderStatus.FILLED.value:
+                if order.status != common.OrderStatus.FILLED:
+                    # the cash and positions of the cached snapshot are out of date.
+                    self.invalidate_snapshot()
                 order.status = common.OrderStatus.FILLED
             elif list_order.status == common.OrderStatus.ACCEPTED.value:
                 order.asset.qty = order.asset.qty - float(list_order.filled_qty)
                 order.status = common.OrderStatus.PROCESSING
             elif list_order.status == common.OrderStatus.REJECTED.value:
                 order.status = common.OrderStatus.REJECTED
-
-        return order
+        return orders
 
     def determine_value(self, asset: common.Asset) -> float:
-        api = alpaca_trade_api.REST(self.get_key(), self.get_secret(), self.get_url())
-        value: float = float(api.get_latest_bar(asset.name).c)
-        api.close()
-        return value
+        return self.snapshot([asset.name]).price(asset.name)
 
     def get_stale_requests(self):
         pass
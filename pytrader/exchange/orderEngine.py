@@ -0,0 +1,195 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pytrader import common
+
+# statuses an order can't leave without being re-ordered.
+FAILED_ORDER_STATUSES = (common.OrderStatus.CANCELLED, common.OrderStatus.FAILED, common.OrderStatus.REJECTED)
+# statuses of an order that is waiting on the exchange, an asset can only have one of these at a time.
+OPEN_ORDER_STATUSES = (common.OrderStatus.QUEUED, common.OrderStatus.PROCESSING)
+
+
+class OrderEngine:
+    """
+    Event driven store of the open orders.  Orders are filed in a queue per status and moved between them on status
+    transitions, and every transition (a new order, a fill found by reconciliation, a rejection) raises an event for
+    the order.  Processing and failed orders also get a timer at last_updated + timeout, held in a heap, that raises an
+    event when it is due.  next_events blocks until there is an event or a timer is due, so the owner only looks at the
+    orders that need something doing rather than scanning all of them on a fixed tick.
+    Orders are also indexed by order id, and counted by asset name and status, so lookups and duplicate checks don't
+    scan the orders.  The indexes are kept up to date by update, which must be called whenever an order changes.
+    """
+
+    def __init__(self, timeout: float):
+        """
+        :param timeout: seconds after its last update that a processing or failed order raises an event.
+        """
+        self.__timeout: float = timeout
+        self.__queues: Dict[common.OrderStatus, Dict[int, common.Order]] = {status: {} for status in common.OrderStatus}
+        # status each order is filed under, keyed by id() as orders aren't hashable.
+        self.__filed: Dict[int, common.OrderStatus] = {}
+        self.__order_ids: Dict[int, int] = {}
+        self.__by_order_id: Dict[int, common.Order] = {}
+        self.__counts: Dict[Tuple[str, common.OrderStatus], int] = {}
+        self.__events: Dict[int, common.Order] = {}
+        # (due time, sequence, order, whether it was scheduled), timeouts that are no longer current are skipped.
+        self.__timers: List[Tuple[float, int, common.Order, bool]] = []
+        self.__deadlines: Dict[int, float] = {}
+        self.__sequence = itertools.count()
+        self.__condition: threading.Condition = threading.Condition()
+        self.__stopped: bool = False
+
+    def __len__(self) -> int:
+        return len(self.__filed)
+
+    def __contains__(self, order: common.Order) -> bool:
+        return id(order) in self.__filed
+
+    def orders(self, *statuses: common.OrderStatus) -> List[common.Order]:
+        """
+        Returns the orders with the given statuses, or every order. \n
+        :param statuses: statuses of the orders.
+        :return: orders, oldest filed first within each status.
+        """
+        with self.__condition:
+            statuses = statuses if len(statuses) > 0 else tuple(self.__queues.keys())
+            return [order for status in statuses for order in self.__queues[status].values()]
+
+    def find(self, order_id: int) -> Optional[common.Order]:
+        """
+        Returns the order with the order id. \n
+        :param order_id: id of the order.
+        :return: order, None if there isn't one.
+        """
+        with self.__condition:
+            return self.__by_order_id.get(order_id)
+
+    def count(self, name: str, *statuses: common.OrderStatus) -> int:
+        """
+        Returns the number of orders for the asset with the given statuses. \n
+        :param name: name of asset.
+        :param statuses: statuses of the orders.
+        :return: number of orders.
+        """
+        with self.__condition:
+            return sum(self.__counts.get((name, status), 0) for status in statuses)
+
+    def has_open_order(self, name: str) -> bool:
+        """
+        Returns whether the asset has an order that is queued or processing.
+        """
+        return self.count(name, *OPEN_ORDER_STATUSES) > 0
+
+    def add(self, order: common.Order):
+        """
+        Adds an order and raises an event for it. \n
+        :param order: order to add.
+        """
+        with self.__condition:
+            self.__file(order)
+            self.__events[id(order)] = order
+            self.__condition.notify_all()
+
+    def update(self, order: common.Order):
+        """
+        Re-files an order after its status or last update has changed, raising an event if its status has changed. \n
+        :param order: order that has changed.
+        """
+        with self.__condition:
+            if id(order) not in self.__filed:
+                return
+            if self.__filed[id(order)] != order.status:
+                self.__events[id(order)] = order
+            self.__file(order)
+            self.__condition.notify_all()
+
+    def remove(self, order: common.Order):
+        """
+        Removes an order, its timers are dropped when they come due. \n
+        :param order: order to remove.
+        """
+        with self.__condition:
+            if id(order) not in self.__filed:
+                return
+            self.__unfile(order)
+            self.__events.pop(id(order), None)
+            self.__deadlines.pop(id(order), None)
+
+    def schedule(self, order: common.Order, delay: float):
+        """
+        Raises an event for the order after a delay, e.g. to retry an action that failed. \n
+        :param order: order.
+        :param delay: seconds from now.
+        """
+        with self.__condition:
+            heapq.heappush(self.__timers, (time.time() + delay, next(self.__sequence), order, True))
+            self.__condition.notify_all()
+
+    def next_events(self, timeout: Optional[float] = None) -> List[common.Order]:
+        """
+        Waits until there is an event or a timer is due, and returns the orders with events. \n
+        :param timeout: most seconds to wait, 0 returns straight away, None waits until an event or stop.
+        :return: orders, empty if the wait timed out or the engine was stopped.
+        """
+        end = time.monotonic() + timeout if timeout is not None else None
+        with self.__condition:
+            while True:
+                self.__fire_timers()
+                if self.__events or self.__stopped:
+                    break
+                wait = self.__timers[0][0] - time.time() if self.__timers else None
+                if end is not None:
+                    remaining = end - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    wait = remaining if wait is None else min(wait, remaining)
+                self.__condition.wait(wait)
+            events, self.__events = list(self.__events.values()), {}
+            return events
+
+    def stop(self):
+        """
+        Wakes any waiting next_events.
+        """
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+
+    def __file(self, order: common.Order):
+        if id(order) in self.__filed:
+            self.__unfile(order)
+        self.__queues[order.status][id(order)] = order
+        self.__filed[id(order)] = order.status
+        if order.asset.id != 0:
+            self.__order_ids[id(order)] = order.asset.id
+            self.__by_order_id[order.asset.id] = order
+        key = (order.asset.name, order.status)
+        self.__counts[key] = self.__counts.get(key, 0) + 1
+        if order.status == common.OrderStatus.PROCESSING or order.status in FAILED_ORDER_STATUSES:
+            deadline = order.asset.last_updated.timestamp() + self.__timeout
+            if self.__deadlines.get(id(order)) != deadline:
+                self.__deadlines[id(order)] = deadline
+                heapq.heappush(self.__timers, (deadline, next(self.__sequence), order, False))
+        else:
+            self.__deadlines.pop(id(order), None)
+
+    def __unfile(self, order: common.Order):
+        status = self.__filed.pop(id(order))
+        del self.__queues[status][id(order)]
+        order_id = self.__order_ids.pop(id(order), None)
+        if order_id is not None and self.__by_order_id.get(order_id) is order:
+            del self.__by_order_id[order_id]
+        key = (order.asset.name, status)
+        self.__counts[key] -= 1
+        if self.__counts[key] == 0:
+            del self.__counts[key]
+
+    def __fire_timers(self):
+        now = time.time()
+        while self.__timers and self.__timers[0][0] <= now:
+            deadline, _, order, scheduled = heapq.heappop(self.__timers)
+            if id(order) in self.__filed and (scheduled or self.__deadlines.get(id(order)) == deadline):
+                self.__events[id(order)] = order
@@ -1 +1,12 @@
-from pytrader.marketData.marketData import get_window, get_EMA, get_RSI, get_SMA, get_MACD, append_bollinger
+from pytrader.marketData.barCache import BarCache
+from pytrader.marketData.barStore import BarStore, load_csv
+from pytrader.marketData.barSync import BarSync
+from pytrader.marketData.batchIndicators import BatchIndicators, batch_sma, batch_ema, batch_rsi, batch_macd, \
+    batch_bollinger, batch_obv, batch_rolling_std, batch_signal, bars_to_matrix, compute_batch_indicators
+from pytrader.marketData.streamingIndicators import StreamingIndicator, StreamingSMA, StreamingEMA, StreamingRSI, \
+    StreamingMACD, StreamingBollinger, StreamingOBV, StreamingIndicatorSet, create_streaming_indicator
+from pytrader.marketData.indicatorPlan import IndicatorPlan, sma_seeded_ema
+from pytrader.marketData.windowRegistry import WindowRegistry, get_window_registry
+from pytrader.marketData.sharedBars import SharedBars, SharedBarsFeeder, attach_shared_bars, attached_shared_bars
+from pytrader.marketData.marketData import get_window, get_EMA, get_RSI, get_SMA, get_MACD, append_bollinger, \
+    get_bars, sync_bars, analyse_indicators, BAR_CACHE, BAR_STORE, BAR_SYNC
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+import pandas
+
+DEFAULT_BAR_CACHE_TTL: float = 300.0
+DEFAULT_BAR_CACHE_SIZE: int = 128
+
+
+class BarCache:
+    """
+    LRU cache of OHLCV bars keyed by (ticker, interval, range).  Entries expire after the time-to-live so a single
+    download can feed every indicator within an analysis pass, without serving stale data to the next one.
+    """
+
+    def __init__(self, ttl: Optional[float] = DEFAULT_BAR_CACHE_TTL,
+                 max_size: Optional[int] = DEFAULT_BAR_CACHE_SIZE):
+        self.__ttl: float = ttl
+        self.__max_size: int = max_size
+        self.__entries: OrderedDict = OrderedDict()
+        self.__lock: threading.Lock = threading.Lock()
+        self.__hits: int = 0
+        self.__misses: int = 0
+        self.__evictions: int = 0
+        self.__expirations: int = 0
+        self.__bars_saved: int = 0
+
+    @property
+    def ttl(self) -> float:
+        return self.__ttl
+
+    @property
+    def max_size(self) -> int:
+        return self.__max_size
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def evictions(self) -> int:
+        return self.__evictions
+
+    @property
+    def expirations(self) -> int:
+        return self.__expirations
+
+    @property
+    def bars_saved(self) -> int:
+        """
+        number of bars served from the cache rather than downloaded.
+        """
+        return self.__bars_saved
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.__hits + self.__misses
+        return self.__hits / total if total > 0 else 0.0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @staticmethod
+    def make_key(ticker: str, interval: str, bar_range: Tuple[Hashable, Hashable]) -> Tuple:
+        """
+        Builds the cache key for the bar request. \n
+        :param ticker: name of ticker.
+        :param interval: bar interval (1d, 1wk, 1mo...).
+        :param bar_range: (start, end) of the request, None meaning open-ended.
+        :return: key.
+        """
+        return str(ticker).upper(), interval, tuple(str(r) if r is not None else None for r in bar_range)
+
+    def get(self, ticker: str, fetch: Callable[[], pandas.DataFrame], interval: Optional[str] = "1d",
+            bar_range: Optional[Tuple[Hashable, Hashable]] = (None, None)) -> pandas.DataFrame:
+        """
+        Returns the cached bars for the request, calling fetch to download them on a miss or expiry. The returned
+        frame is shared between callers, so it must be copied before being modified. \n
+        :param ticker: name of ticker.
+        :param fetch: callable that downloads the bars.
+        :param interval: bar interval.
+        :param bar_range: (start, end) of the request.
+        :return: bars.
+        """
+        key = self.make_key(ticker, interval, bar_range)
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                stored_at, data = entry
+                if now - stored_at < self.__ttl:
+                    self.__entries.move_to_end(key)
+                    self.__hits += 1
+                    self.__bars_saved += len(data)
+                    return data
+                del self.__entries[key]
+                self.__expirations += 1
+            self.__misses += 1
+
+        data = fetch()
+        self.put(ticker, data, interval, bar_range)
+        return data
+
+    def put(self, ticker: str, data: pandas.DataFrame, interval: Optional[str] = "1d",
+            bar_range: Optional[Tuple[Hashable, Hashable]] = (None, None)):
+        """
+        Stores bars in the cache, evicting the least recently used entries if it is full. \n
+        :param ticker: name of ticker.
+        :param data: bars.
+        :param interval: bar interval.
+        :param bar_range: (start, end) of the request.
+        """
+        if data is None:
+            return
+        key = self.make_key(ticker, interval, bar_range)
+        with self.__lock:
+            self.__entries[key] = (time.monotonic(), data)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def invalidate(self, ticker: Optional[str] = None):
+        """
+        Removes the cached bars of a ticker, or every entry if no ticker is given. \n
+        :param ticker: name of ticker.
+        """
+        with self.__lock:
+            if ticker is None:
+                self.__entries.clear()
+                return
+            for key in [k for k in self.__entries if k[0] == str(ticker).upper()]:
+                del self.__entries[key]
+
+    def reset_stats(self):
+        """
+        Resets the hit/miss counters.
+        """
+        with self.__lock:
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+            self.__expirations = 0
+            self.__bars_saved = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters, useful for logging how much download volume the cache saves. \n
+        :return: dict of counters.
+        """
+        return {"size": len(self.__entries), "hits": self.__hits, "misses": self.__misses,
+                "hit_ratio": self.hit_ratio, "evictions": self.__evictions, "expirations": self.__expirations,
+                "bars_saved": self.__bars_saved}
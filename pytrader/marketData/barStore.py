@@ -0,0 +1,280 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy
+import pandas
+
+DEFAULT_BAR_STORE_DIR: Path = Path(__file__).parent / 'data/bars'
+
+# fixed-width columns of every ticker, ts (seconds since epoch, UTC) is written last when appending.
+BAR_COLUMNS: Dict[str, numpy.dtype] = {"open": numpy.dtype("<f8"), "high": numpy.dtype("<f8"),
+                                       "low": numpy.dtype("<f8"), "close": numpy.dtype("<f8"),
+                                       "adjclose": numpy.dtype("<f8"), "volume": numpy.dtype("<f8"),
+                                       "ts": numpy.dtype("<i8")}
+
+CSV_COLUMN_NAMES: Dict[str, str] = {"close/last": "close", "adj close": "adjclose", "adj_close": "adjclose",
+                                    "date": "date", "timestamp": "date", "time": "date"}
+
+
+def to_timestamps(index) -> numpy.ndarray:
+    """
+    Converts dates to int64 seconds since epoch, timezone aware dates are converted to UTC first. \n
+    :param index: dates, in any format accepted by pandas.
+    :return: timestamps.
+    """
+    dates = pandas.DatetimeIndex(pandas.to_datetime(index))
+    if dates.tz is not None:
+        dates = dates.tz_convert("UTC").tz_localize(None)
+    return dates.values.astype("datetime64[s]").astype(numpy.int64)
+
+
+def to_timestamp(date) -> Optional[int]:
+    """
+    Converts a single date to int64 seconds since epoch, ints are assumed to already be timestamps. \n
+    :param date: date.
+    :return: timestamp, or None if the date is None.
+    """
+    if date is None:
+        return None
+    if isinstance(date, (int, numpy.integer)):
+        return int(date)
+    return int(to_timestamps([date])[0])
+
+
+def to_columns(data: pandas.DataFrame) -> Dict[str, numpy.ndarray]:
+    """
+    Converts bars to the fixed-width columns of BAR_COLUMNS, sorted by date with duplicate dates dropped. \n
+    :param data: bars indexed by date, or with a date column.
+    :return: dict of column name to array.
+    """
+    data = data.rename(columns=lambda c: CSV_COLUMN_NAMES.get(str(c).strip().lower(), str(c).strip().lower()))
+    dates = data["date"] if "date" in data.columns else data.index
+    columns = {"ts": to_timestamps(dates)}
+    for column in BAR_COLUMNS:
+        if column == "ts":
+            continue
+        source = column if column in data.columns else "close" if column == "adjclose" else None
+        if source is None:
+            raise ValueError(f"BarStore: bars are missing the {column} column.")
+        columns[column] = data[source].to_numpy(dtype=numpy.float64)
+    order = numpy.argsort(columns["ts"], kind="stable")
+    columns = {column: values[order] for column, values in columns.items()}
+    unique = numpy.ones(len(order), dtype=bool)
+    unique[:-1] = columns["ts"][1:] != columns["ts"][:-1]
+    return {column: values[unique] for column, values in columns.items()}
+
+
+def to_frame(columns: Dict[str, numpy.ndarray], ticker: str) -> pandas.DataFrame:
+    """
+    Converts columns of BAR_COLUMNS to bars in the same format as yahoo_fin's get_data, copying them. \n
+    :param columns: dict of column name to array.
+    :param ticker: name of ticker.
+    :return: bars indexed by date.
+    """
+    data = pandas.DataFrame({column: numpy.array(values) for column, values in columns.items() if column != "ts"},
+                            index=pandas.to_datetime(numpy.array(columns["ts"]), unit="s"))
+    data["ticker"] = str(ticker).upper()
+    return data
+
+
+def load_csv(file: Union[str, Path]) -> pandas.DataFrame:
+    """
+    Loads historical bars from a csv file.  Handles the yahoo export (Date, Open, ..., Adj Close, Volume), and the
+    nasdaq export (Date, Close/Last, ...) with '$' prefixed prices and mm/dd/yyyy dates, newest first. \n
+    :param file: csv file.
+    :return: bars indexed by date, oldest first, with open, high, low, close, adjclose and volume columns.
+    """
+    data = pandas.read_csv(file)
+    data = data.rename(columns=lambda c: CSV_COLUMN_NAMES.get(str(c).strip().lower(), str(c).strip().lower()))
+    data = data.loc[:, [c for c in data.columns if c == "date" or c in BAR_COLUMNS]]
+    for column in data.columns:
+        if column != "date" and not pandas.api.types.is_numeric_dtype(data[column]):
+            data[column] = pandas.to_numeric(data[column].astype(str).str.replace(r"[$,\s]", "", regex=True))
+    if "adjclose" not in data.columns:
+        data["adjclose"] = data["close"]
+    data.index = pandas.to_datetime(data.pop("date"))
+    data.index.name = None
+    data = data[~data.index.duplicated(keep="last")].sort_index()
+    return data.loc[:, [c for c in BAR_COLUMNS if c != "ts" and c in data.columns]]
+
+
+class BarStore:
+    """
+    Local on-disk store of historical bars, one directory per ticker holding one fixed-width binary file per column.
+    Bars are only ever appended, and reads memory-map the columns so a range lookup by timestamp costs a binary
+    search rather than a download or a csv parse.
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = DEFAULT_BAR_STORE_DIR):
+        self.__root: Path = Path(root)
+        self.__lock: threading.Lock = threading.Lock()
+
+    @property
+    def root(self) -> Path:
+        return self.__root
+
+    def tickers(self) -> List[str]:
+        """
+        Returns every ticker with bars in the store.
+        """
+        if not self.__root.exists():
+            return []
+        return sorted(p.name for p in self.__root.iterdir()
+                      if p.is_dir() and "." not in p.name and self.length(p.name) > 0)
+
+    def path(self, ticker: str) -> Path:
+        return self.__root / str(ticker).upper()
+
+    def length(self, ticker: str) -> int:
+        """
+        Returns the number of bars stored for the ticker.  A bar only counts once every column, including ts, has been
+        written, so an append interrupted part way through is ignored. \n
+        :param ticker: name of ticker.
+        :return: number of bars.
+        """
+        lengths = []
+        for column, dtype in BAR_COLUMNS.items():
+            file = self.path(ticker) / f"{column}.bin"
+            lengths.append(os.path.getsize(file) // dtype.itemsize if file.exists() else 0)
+        return min(lengths)
+
+    def first_timestamp(self, ticker: str) -> Optional[int]:
+        ts = self.__column(ticker, "ts")
+        return int(ts[0]) if ts is not None else None
+
+    def last_timestamp(self, ticker: str) -> Optional[int]:
+        ts = self.__column(ticker, "ts")
+        return int(ts[-1]) if ts is not None else None
+
+    def append(self, ticker: str, data: pandas.DataFrame) -> int:
+        """
+        Appends bars to the ticker.  Bars at or before the last stored timestamp are skipped, so overlapping
+        downloads can be appended as they are. \n
+        :param ticker: name of ticker.
+        :param data: bars indexed by date (or with a date column) with open, high, low, close and volume columns, and
+        optionally adjclose.
+        :return: number of bars appended.
+        """
+        columns = to_columns(data)
+        with self.__lock:
+            self.__truncate_to_committed(ticker)
+            last = self.last_timestamp(ticker)
+            keep = columns["ts"] > last if last is not None else numpy.ones(len(columns["ts"]), dtype=bool)
+            return self.__write(ticker, {column: values[keep] for column, values in columns.items()}, "ab")
+
+    def merge(self, ticker: str, data: pandas.DataFrame) -> int:
+        """
+        Merges bars into the ticker.  Bars with a stored timestamp overwrite it in place, bars after the last stored
+        timestamp are appended, and the columns are only rewritten when bars have to be inserted into the history
+        (e.g. when backfilling a hole). \n
+        :param ticker: name of ticker.
+        :param data: bars, as for append.
+        :return: number of new bars.
+        """
+        columns = to_columns(data)
+        with self.__lock:
+            self.__truncate_to_committed(ticker)
+            length = self.length(ticker)
+            if length == 0:
+                return self.__write(ticker, columns, "ab")
+            ts = self.__column(ticker, "ts", length)
+            positions = numpy.searchsorted(ts, columns["ts"])
+            existing = positions < length
+            existing[existing] = ts[positions[existing]] == columns["ts"][existing]
+            if existing.any():
+                for column in BAR_COLUMNS:
+                    stored = numpy.memmap(self.path(ticker) / f"{column}.bin", dtype=BAR_COLUMNS[column], mode="r+",
+                                          shape=(length,))
+                    stored[positions[existing]] = columns[column][existing]
+                    stored.flush()
+                    del stored
+            new = {column: values[~existing] for column, values in columns.items()}
+            if len(new["ts"]) == 0:
+                return 0
+            if new["ts"][0] > ts[-1]:
+                return self.__write(ticker, new, "ab")
+            stored = {column: numpy.array(self.__column(ticker, column, length)) for column in BAR_COLUMNS}
+            merged = {column: numpy.concatenate([stored[column], new[column]]) for column in BAR_COLUMNS}
+            order = numpy.argsort(merged["ts"], kind="stable")
+            del ts
+            self.__write(ticker, {column: values[order] for column, values in merged.items()}, "wb")
+            return len(new["ts"])
+
+    def ingest_csv(self, ticker: str, file: Union[str, Path]) -> int:
+        """
+        Appends the bars of a csv file to the ticker, see load_csv for the supported formats. \n
+        :param ticker: name of ticker.
+        :param file: csv file.
+        :return: number of bars appended.
+        """
+        return self.append(ticker, load_csv(file))
+
+    def read(self, ticker: str, start=None, end=None) -> Dict[str, numpy.ndarray]:
+        """
+        Reads the bars of the ticker between start and end (inclusive) as read-only memory-mapped columns. \n
+        :param ticker: name of ticker.
+        :param start: optional first date or timestamp.
+        :param end: optional last date or timestamp.
+        :return: dict of column name to array, empty arrays if there are no bars.
+        """
+        ts = self.__column(ticker, "ts")
+        if ts is None:
+            return {column: numpy.empty(0, dtype=dtype) for column, dtype in BAR_COLUMNS.items()}
+        first = 0 if start is None else int(numpy.searchsorted(ts, to_timestamp(start), side="left"))
+        last = len(ts) if end is None else int(numpy.searchsorted(ts, to_timestamp(end), side="right"))
+        return {column: self.__column(ticker, column, len(ts))[first:last] for column in BAR_COLUMNS}
+
+    def read_frame(self, ticker: str, start=None, end=None) -> pandas.DataFrame:
+        """
+        Reads the bars of the ticker between start and end (inclusive) in the same format as yahoo_fin's get_data. \n
+        :param ticker: name of ticker.
+        :param start: optional first date or timestamp.
+        :param end: optional last date or timestamp.
+        :return: bars indexed by date.
+        """
+        return to_frame(self.read(ticker, start, end), ticker)
+
+    def __column(self, ticker: str, column: str, length: Optional[int] = None) -> Optional[numpy.ndarray]:
+        length = self.length(ticker) if length is None else length
+        if length == 0:
+            return None
+        return numpy.memmap(self.path(ticker) / f"{column}.bin", dtype=BAR_COLUMNS[column], mode="r",
+                            shape=(length,))
+
+    def __write(self, ticker: str, columns: Dict[str, numpy.ndarray], mode: str) -> int:
+        """
+        Appends ("ab") or rewrites ("wb") every column, ts last.  Rewrites are written to a sibling directory that is
+        swapped with the ticker's once it is complete, so readers never see a mix of old and new columns.
+        """
+        count = len(columns["ts"])
+        if count == 0:
+            return 0
+        path = self.path(ticker)
+        target = path.with_name(path.name + ".tmp") if mode == "wb" else path
+        target.mkdir(parents=True, exist_ok=True)
+        for column, dtype in BAR_COLUMNS.items():
+            with open(target / f"{column}.bin", mode) as out:
+                out.write(numpy.ascontiguousarray(columns[column], dtype=dtype).tobytes())
+        if mode == "wb":
+            old = path.with_name(path.name + ".old")
+            os.replace(path, old)
+            os.replace(target, path)
+            shutil.rmtree(old)
+        return count
+
+    def __truncate_to_committed(self, ticker: str):
+        """
+        Drops any partially appended bars so every column has the same length, and completes a rewrite that was
+        interrupted between swapping the directories.
+        """
+        path = self.path(ticker)
+        if not path.exists() and path.with_name(path.name + ".tmp").exists():
+            os.replace(path.with_name(path.name + ".tmp"), path)
+        length = self.length(ticker)
+        for column, dtype in BAR_COLUMNS.items():
+            file = self.path(ticker) / f"{column}.bin"
+            if file.exists() and os.path.getsize(file) != length * dtype.itemsize:
+                os.truncate(file, length * dtype.itemsize)
@@ -0,0 +1,136 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy
+import pandas
+
+from pytrader import common
+from pytrader.marketData.barStore import BarStore
+
+Log = common.Log(__file__)
+
+SECONDS_PER_DAY: int = 86400
+DEFAULT_MAX_MISSING_DAYS: int = 1
+
+# fetch(ticker, start_date, end_date, interval) -> bars in yahoo_fin's get_data format, None dates are open-ended.
+BarFetch = Callable[[str, Optional[datetime], Optional[datetime], str], pandas.DataFrame]
+
+
+def _to_datetime(timestamp: int) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None)
+
+
+class BarSync:
+    """
+    Keeps the local bar store up to date by only requesting bars newer than the last stored bar of each ticker, and
+    backfilling holes left by outages.  The last stored bar is always re-requested so a bar that was still forming
+    when it was stored is corrected.
+    """
+
+    def __init__(self, store: BarStore, fetch: BarFetch, interval: Optional[str] = "1d",
+                 max_missing_days: Optional[int] = DEFAULT_MAX_MISSING_DAYS):
+        self.__store: BarStore = store
+        self.__fetch: BarFetch = fetch
+        self.__interval: str = interval
+        self.__max_missing_days: int = max_missing_days
+        self.__checked_gaps: Dict[str, Set[Tuple[int, int]]] = {}
+        # number of bars of each ticker when its every hole was last checked, it is only searched again once it grows.
+        self.__checked_lengths: Dict[str, int] = {}
+        self.__lock: threading.Lock = threading.Lock()
+        self.__requests: int = 0
+        self.__bars_fetched: int = 0
+        self.__bars_added: int = 0
+
+    @property
+    def store(self) -> BarStore:
+        return self.__store
+
+    @property
+    def requests(self) -> int:
+        return self.__requests
+
+    @property
+    def bars_fetched(self) -> int:
+        """
+        number of bars downloaded, the network volume of the syncs.
+        """
+        return self.__bars_fetched
+
+    @property
+    def bars_added(self) -> int:
+        return self.__bars_added
+
+    def sync(self, ticker: str) -> int:
+        """
+        Fetches the bars from the last stored bar onwards, or the full history if the ticker has no bars yet. \n
+        :param ticker: name of ticker.
+        :return: number of new bars stored.
+        """
+        last = self.__store.last_timestamp(ticker)
+        start = _to_datetime(last) if last is not None else None
+        return self.__fetch_and_merge(ticker, start, None) or 0
+
+    def find_gaps(self, ticker: str) -> List[Tuple[int, int]]:
+        """
+        Finds holes in the stored history, pairs of consecutive bars with more than max_missing_days business days
+        between them.  A single missing business day is allowed for market holidays. \n
+        :param ticker: name of ticker.
+        :return: list of (timestamp before, timestamp after) the hole.
+        """
+        ts = self.__store.read(ticker)["ts"]
+        if len(ts) < 2:
+            return []
+        days = (numpy.asarray(ts) // SECONDS_PER_DAY).astype("datetime64[D]")
+        missing = numpy.busday_count(days[:-1] + 1, days[1:])
+        holes = numpy.flatnonzero(missing > self.__max_missing_days)
+        return [(int(ts[i]), int(ts[i + 1])) for i in holes]
+
+    def backfill(self, ticker: str) -> int:
+        """
+        Requests the bars of every hole in the stored history.  Holes that are still empty after a request (trading
+        halts, exchange closures) are remembered and not requested again, and the history is only searched for holes
+        again once bars have been added to it, so it is cheap to call after every sync. \n
+        :param ticker: name of ticker.
+        :return: number of new bars stored.
+        """
+        key = str(ticker).upper()
+        if self.__checked_lengths.get(key) == self.__store.length(ticker):
+            return 0
+        added = 0
+        failed = False
+        checked = self.__checked_gaps.setdefault(key, set())
+        for gap in self.find_gaps(ticker):
+            if gap in checked:
+                continue
+            gap_added = self.__fetch_and_merge(ticker, _to_datetime(gap[0]), _to_datetime(gap[1]) + timedelta(days=1))
+            if gap_added is not None:
+                checked.add(gap)
+                added += gap_added
+            else:
+                failed = True
+        if not failed:
+            self.__checked_lengths[key] = self.__store.length(ticker)
+        return added
+
+    def stats(self) -> dict:
+        return {"requests": self.__requests, "bars_fetched": self.__bars_fetched, "bars_added": self.__bars_added}
+
+    def __fetch_and_merge(self, ticker: str, start: Optional[datetime], end: Optional[datetime]) -> Optional[int]:
+        """
+        Fetches the bars between start and end and merges them into the store, returns None if the fetch failed.
+        """
+        try:
+            data = self.__fetch(str(ticker), start, end, self.__interval)
+        except Exception as e:
+            Log.w(f"BarSync - failed to fetch {ticker} bars from {start} to {end}: {e}")
+            return None
+        with self.__lock:
+            self.__requests += 1
+        if data is None or len(data) == 0:
+            return 0
+        added = self.__store.merge(ticker, data)
+        with self.__lock:
+            self.__bars_fetched += len(data)
+            self.__bars_added += added
+        return added
@@ -0,0 +1,262 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy
+import pandas
+
+BOLLINGER_STD_SCALAR: float = 2.0
+
+
+def _as_matrix(values) -> numpy.ndarray:
+    """
+    Returns the values as a float (time x tickers) matrix, promoting a single series to one column.
+    """
+    matrix = numpy.asarray(values, dtype=numpy.float64)
+    if matrix.ndim == 1:
+        matrix = matrix[:, numpy.newaxis]
+    return matrix
+
+
+def _first_values(matrix: numpy.ndarray) -> numpy.ndarray:
+    """
+    Returns the first value of each column that isn't NaN, 0 for a column of NaNs.  Columns are shifted by it to keep
+    running sums over them small.
+    """
+    present = ~numpy.isnan(matrix)
+    first = matrix[numpy.argmax(present, axis=0), numpy.arange(matrix.shape[1])]
+    return numpy.where(present.any(axis=0), first, 0.0)
+
+
+def _window_sums(matrix: numpy.ndarray, window: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Sums each column over every window of rows, from the window ending at row window - 1.  A NaN is summed as 0 and
+    counted separately, so it only spoils the windows that hold it rather than every later row. \n
+    :param matrix: (time x tickers) values.
+    :param window: interval window.
+    :return: (time - window + 1 x tickers) sums, and whether each window holds a NaN.
+    """
+    missing = numpy.isnan(matrix)
+    sums = numpy.cumsum(numpy.where(missing, 0.0, matrix), axis=0)
+    counts = numpy.cumsum(missing, axis=0)
+    window_sums = sums[window - 1:].copy()
+    window_sums[1:] -= sums[:-window]
+    window_counts = counts[window - 1:].copy()
+    window_counts[1:] -= counts[:-window]
+    return window_sums, window_counts > 0
+
+
+def batch_sma(closes: numpy.ndarray, window: int) -> numpy.ndarray:
+    """
+    Simple Moving Average of every column at once.  The first window - 1 rows, and every window holding a NaN, are NaN
+    as with pandas' rolling mean. \n
+    :param closes: (time x tickers) close prices.
+    :param window: interval window.
+    :return: (time x tickers) SMA.
+    """
+    closes = _as_matrix(closes)
+    out = numpy.full(closes.shape, numpy.nan)
+    if window > closes.shape[0]:
+        return out
+    first = _first_values(closes)
+    sums, missing = _window_sums(closes - first, window)
+    out[window - 1:] = numpy.where(missing, numpy.nan, sums / window + first)
+    return out
+
+
+def batch_rolling_std(closes: numpy.ndarray, window: int) -> numpy.ndarray:
+    """
+    Rolling sample standard deviation of every column at once, as with pandas' rolling std. \n
+    :param closes: (time x tickers) close prices.
+    :param window: interval window.
+    :return: (time x tickers) standard deviation.
+    """
+    closes = _as_matrix(closes)
+    out = numpy.full(closes.shape, numpy.nan)
+    if window > closes.shape[0] or window < 2:
+        return out
+    shifted = closes - _first_values(closes)
+    sums, missing = _window_sums(shifted, window)
+    squares, _ = _window_sums(shifted * shifted, window)
+    variance = (squares - sums * sums / window) / (window - 1)
+    out[window - 1:] = numpy.where(missing, numpy.nan, numpy.sqrt(numpy.maximum(variance, 0.0)))
+    return out
+
+
+def batch_ema(closes: numpy.ndarray, window: int) -> numpy.ndarray:
+    """
+    Exponential Moving Average of every column at once, seeded with the SMA of the first window like pandas-ta.  The
+    recursion steps through time once with every ticker updated in the same array operation.  Each column is seeded
+    from its own first window without a NaN, so a ticker whose history starts later is NaN until then, and a NaN close
+    after that keeps the previous value, as with pandas' ewm(adjust=False, ignore_na=True). \n
+    :param closes: (time x tickers) close prices.
+    :param window: interval window.
+    :return: (time x tickers) EMA.
+    """
+    closes = _as_matrix(closes)
+    out = numpy.full(closes.shape, numpy.nan)
+    if window > closes.shape[0]:
+        return out
+    alpha = 2.0 / (window + 1)
+    missing = numpy.isnan(closes)
+    first = _first_values(closes)
+    sums, spoiled = _window_sums(closes - first, window)
+    # row ending each column's first window without a NaN, columns without one are never seeded.
+    seeded = ~spoiled.all(axis=0)
+    starts = numpy.argmax(~spoiled, axis=0)
+    seed_rows = numpy.where(seeded, starts + window - 1, -1)
+    seeds = sums[starts, numpy.arange(closes.shape[1])] / window + first
+    previous = numpy.full(closes.shape[1], numpy.nan)
+    for i in range(window - 1, closes.shape[0]):
+        current = numpy.where(missing[i], previous, alpha * closes[i] + (1.0 - alpha) * previous)
+        previous = out[i] = numpy.where(seed_rows == i, seeds, current)
+    return out
+
+
+def batch_rsi(closes: numpy.ndarray, window: int) -> numpy.ndarray:
+    """
+    Relative Strength Index of every column at once, using Wilder smoothing like ta's RSIIndicator. \n
+    :param closes: (time x tickers) close prices.
+    :param window: interval window.
+    :return: (time x tickers) RSI.
+    """
+    closes = _as_matrix(closes)
+    out = numpy.full(closes.shape, numpy.nan)
+    if window > closes.shape[0]:
+        return out
+    changes = numpy.zeros(closes.shape)
+    changes[1:] = numpy.diff(closes, axis=0)
+    gains = numpy.where(changes > 0, changes, 0.0)
+    losses = numpy.where(changes < 0, -changes, 0.0)
+    alpha = 1.0 / window
+    average_gains = numpy.empty(closes.shape)
+    average_losses = numpy.empty(closes.shape)
+    average_gains[0], average_losses[0] = gains[0], losses[0]
+    for i in range(1, closes.shape[0]):
+        average_gains[i] = average_gains[i - 1] + alpha * (gains[i] - average_gains[i - 1])
+        average_losses[i] = average_losses[i - 1] + alpha * (losses[i] - average_losses[i - 1])
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        rsi = numpy.where(average_losses == 0, 100.0, 100.0 - 100.0 / (1.0 + average_gains / average_losses))
+    out[window - 1:] = rsi[window - 1:]
+    return out
+
+
+def batch_macd(closes: numpy.ndarray, window_fast: int, window_slow: int,
+               window_sig: int) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """
+    Moving Average Convergence Divergence of every column at once, matching pandas-ta. \n
+    :param closes: (time x tickers) close prices.
+    :param window_fast: fast moving window
+    :param window_slow: slow moving window
+    :param window_sig: signal window
+    :return: (time x tickers) macd, histogram and signal.
+    """
+    closes = _as_matrix(closes)
+    macd = batch_ema(closes, window_fast) - batch_ema(closes, window_slow)
+    # the EMA seeds each column from its first window of macd values, after the column's own leading NaNs.
+    signal = batch_ema(macd, window_sig)
+    return macd, macd - signal, signal
+
+
+def batch_bollinger(closes: numpy.ndarray, window: int,
+                    std_scalar: Optional[float] = BOLLINGER_STD_SCALAR) -> Tuple[numpy.ndarray, numpy.ndarray,
+                                                                                  numpy.ndarray]:
+    """
+    Bollinger bands of every column at once. \n
+    :param closes: (time x tickers) close prices.
+    :param window: interval window.
+    :param std_scalar: number of standard deviations between the sma and the bands.
+    :return: (time x tickers) sma, upper band and lower band.
+    """
+    sma = batch_sma(closes, window)
+    std = batch_rolling_std(closes, window)
+    return sma, sma + std * std_scalar, sma - std * std_scalar
+
+
+def batch_obv(closes: numpy.ndarray, volumes: numpy.ndarray) -> numpy.ndarray:
+    """
+    On Balance Volume of every column at once, matching ta's on_balance_volume. \n
+    :param closes: (time x tickers) close prices.
+    :param volumes: (time x tickers) volumes.
+    :return: (time x tickers) OBV.
+    """
+    closes = _as_matrix(closes)
+    volumes = _as_matrix(volumes)
+    falling = numpy.zeros(closes.shape, dtype=bool)
+    falling[1:] = closes[1:] < closes[:-1]
+    return numpy.cumsum(numpy.where(falling, -volumes, volumes), axis=0)
+
+
+def batch_signal(fast: numpy.ndarray, slow: numpy.ndarray) -> numpy.ndarray:
+    """
+    Signal vector for the latest bar: 1 for each ticker where the fast average is above the slow one, else 0. \n
+    :param fast: (time x tickers) fast moving average.
+    :param slow: (time x tickers) slow moving average.
+    :return: (tickers,) signal.
+    """
+    return (_as_matrix(fast)[-1] > _as_matrix(slow)[-1]).astype(numpy.int8)
+
+
+@dataclass
+class BatchIndicators:
+    """
+    Indicators for a set of tickers, each a (time x tickers) array aligned with the input bars.
+    """
+    tickers: List[str]
+    sma: numpy.ndarray
+    ema: numpy.ndarray
+    rsi: numpy.ndarray
+    macd: numpy.ndarray
+    macd_histogram: numpy.ndarray
+    macd_signal: numpy.ndarray
+    bollinger_upper: numpy.ndarray
+    bollinger_lower: numpy.ndarray
+    obv: Optional[numpy.ndarray] = None
+
+    @property
+    def signal(self) -> numpy.ndarray:
+        """
+        1 for each ticker whose EMA is above its SMA on the latest bar, else 0.
+        """
+        return batch_signal(self.ema, self.sma)
+
+
+def compute_batch_indicators(tickers: List[str], closes: numpy.ndarray, volumes: Optional[numpy.ndarray] = None,
+                             sma_window: Optional[int] = 20, ema_window: Optional[int] = 20,
+                             rsi_window: Optional[int] = 14, macd_windows: Optional[Tuple[int, int, int]] = (12, 26, 9),
+                             bollinger_window: Optional[int] = 20) -> BatchIndicators:
+    """
+    Computes every indicator for every ticker in one pass over the bar matrix. \n
+    :param tickers: names of the tickers, one per column.
+    :param closes: (time x tickers) close prices.
+    :param volumes: optional (time x tickers) volumes, OBV is only computed if they are provided.
+    :param sma_window: SMA window.
+    :param ema_window: EMA window.
+    :param rsi_window: RSI window.
+    :param macd_windows: (fast, slow, signal) MACD windows.
+    :param bollinger_window: Bollinger window.
+    :return: indicators.
+    """
+    closes = _as_matrix(closes)
+    if closes.shape[1] != len(tickers):
+        raise ValueError(f"compute_batch_indicators: {len(tickers)} tickers for {closes.shape[1]} columns of bars.")
+    macd, macd_histogram, macd_signal = batch_macd(closes, *macd_windows)
+    _, bollinger_upper, bollinger_lower = batch_bollinger(closes, bollinger_window)
+    return BatchIndicators(tickers=list(tickers),
+                           sma=batch_sma(closes, sma_window),
+                           ema=batch_ema(closes, ema_window),
+                           rsi=batch_rsi(closes, rsi_window),
+                           macd=macd, macd_histogram=macd_histogram, macd_signal=macd_signal,
+                           bollinger_upper=bollinger_upper, bollinger_lower=bollinger_lower,
+                           obv=batch_obv(closes, volumes) if volumes is not None else None)
+
+
+def bars_to_matrix(data: pandas.DataFrame, symbols: List[str], field: Optional[str] = "close") -> numpy.ndarray:
+    """
+    Extracts a (time x tickers) matrix from a multi-symbol bar frame with (symbol, field) columns, as returned by the
+    alpaca barset. \n
+    :param data: bars.
+    :param symbols: symbols, in column order of the result.
+    :param field: bar field to extract.
+    :return: matrix.
+    """
+    return data.loc[:, [(symbol, field) for symbol in symbols]].to_numpy(dtype=numpy.float64)
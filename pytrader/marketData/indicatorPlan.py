@@ -0,0 +1,167 @@
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+import numpy
+import pandas
+
+from pytrader import common
+
+BOLLINGER_STD_SCALAR: float = 2.0
+
+Window = Union[int, Tuple[int, int, int], None]
+Node = Tuple[Hashable, ...]
+
+
+def sma_seeded_ema(series: pandas.Series, window: int) -> pandas.Series:
+    """
+    EMA seeded with the SMA of the first window of valid values, as calculated by pandas-ta. \n
+    :param series: input series, optionally starting with NaNs.
+    :param window: interval window.
+    :return: EMA series.
+    """
+    start = series.index.get_loc(series.first_valid_index()) if series.first_valid_index() is not None else len(series)
+    values = series.copy()
+    if start + window > len(values):
+        return pandas.Series(numpy.nan, index=series.index)
+    values.iloc[start + window - 1] = values.iloc[start:start + window].mean()
+    values.iloc[start:start + window - 1] = numpy.nan
+    return values.ewm(span=window, adjust=False).mean()
+
+
+class IndicatorPlan:
+    """
+    Dependency graph of the indicators requested for a ticker.  Each indicator is broken down into its intermediate
+    series (rolling mean, rolling std, EMA of length n, gains/losses...), and each distinct intermediate is computed
+    exactly once per set of bars and shared by every indicator that depends on it.
+    """
+
+    def __init__(self, requests: Optional[Iterable[Tuple[common.Indicator, Window]]] = None):
+        self.__requests: List[Tuple[common.Indicator, Window]] = []
+        self.__computed_nodes: List[Node] = []
+        for indicator, window in requests or []:
+            self.add(indicator, window)
+
+    @property
+    def requests(self) -> List[Tuple[common.Indicator, Window]]:
+        return list(self.__requests)
+
+    @property
+    def computed_nodes(self) -> List[Node]:
+        """
+        intermediate series computed by the last execute, in the order they were computed.
+        """
+        return list(self.__computed_nodes)
+
+    def add(self, indicator: common.Indicator, window: Window) -> 'IndicatorPlan':
+        """
+        Adds an indicator to the plan, duplicates are ignored. \n
+        :param indicator: type of indicator.
+        :param window: window of the indicator, (fast, slow, signal) for MACD.
+        :return: the plan.
+        """
+        request = (indicator, tuple(window) if isinstance(window, (list, tuple)) else window)
+        if request not in self.__requests:
+            self.__requests.append(request)
+        return self
+
+    def nodes(self) -> List[Node]:
+        """
+        Returns every distinct intermediate needed by the plan, dependencies first.
+        """
+        ordered: List[Node] = []
+
+        def visit(node: Node):
+            if node in ordered:
+                return
+            for dependency in self.__definition(node)[0]:
+                visit(dependency)
+            ordered.append(node)
+
+        for indicator, window in self.__requests:
+            visit(self.__output_node(indicator, window))
+        return ordered
+
+    def execute(self, data: pandas.DataFrame) -> Dict[Tuple[common.Indicator, Window], object]:
+        """
+        Computes every requested indicator on the bars.  The bars are not modified. \n
+        :param data: stock data with an 'adjclose' or 'Adj Close' column, and 'volume'/'Volume' for OBV.
+        :return: dict of (indicator, window) to its series (or frame for MACD and Bollinger).
+        """
+        results: Dict[Node, object] = {}
+        self.__computed_nodes = []
+
+        def resolve(node: Node):
+            if node not in results:
+                dependencies, compute = self.__definition(node)
+                results[node] = compute(data, *[resolve(dependency) for dependency in dependencies])
+                self.__computed_nodes.append(node)
+            return results[node]
+
+        return {(indicator, window): resolve(self.__output_node(indicator, window))
+                for indicator, window in self.__requests}
+
+    @staticmethod
+    def __output_node(indicator: common.Indicator, window: Window) -> Node:
+        if indicator == common.Indicator.SMA:
+            return "rolling_mean", window
+        elif indicator == common.Indicator.EMA:
+            return "ema", window
+        elif indicator == common.Indicator.RSI:
+            return "rsi", window
+        elif indicator == common.Indicator.MACD:
+            return ("macd",) + tuple(window)
+        elif indicator == common.Indicator.BOLLINGER:
+            return "bollinger", window
+        elif indicator == common.Indicator.VOLUME:
+            return "obv",
+        raise ValueError(f"{indicator} is not a valid or supported Indicator type.")
+
+    @staticmethod
+    def __definition(node: Node) -> Tuple[List[Node], Callable]:
+        """
+        Returns the dependencies of the node and the function computing it from the bars and those dependencies.
+        """
+        kind = node[0]
+        if kind == "close":
+            return [], lambda data: data['adjclose'] if 'adjclose' in data.columns else data['Adj Close']
+        elif kind == "volume":
+            return [], lambda data: data['volume'] if 'volume' in data.columns else data['Volume']
+        elif kind == "rolling_mean":
+            return [("close",)], lambda data, close: close.rolling(window=node[1]).mean()
+        elif kind == "rolling_std":
+            return [("close",)], lambda data, close: close.rolling(window=node[1]).std()
+        elif kind == "ema":
+            return [("close",)], lambda data, close: sma_seeded_ema(close, node[1])
+        elif kind == "gains_losses":
+            def gains_losses(data, close):
+                change = close.diff(1)
+                return change.where(change > 0, 0.0), -change.where(change < 0, 0.0)
+            return [("close",)], gains_losses
+        elif kind == "rsi":
+            def rsi(data, gains_and_losses):
+                gains, losses = gains_and_losses
+                average_gain = gains.ewm(alpha=1 / node[1], min_periods=node[1], adjust=False).mean()
+                average_loss = losses.ewm(alpha=1 / node[1], min_periods=node[1], adjust=False).mean()
+                values = numpy.where(average_loss == 0, 100, 100 - (100 / (1 + average_gain / average_loss)))
+                return pandas.Series(values, index=gains.index).where(average_loss.notna())
+            return [("gains_losses",)], rsi
+        elif kind == "macd_line":
+            return [("ema", node[1]), ("ema", node[2])], lambda data, fast, slow: fast - slow
+        elif kind == "macd":
+            _, fast, slow, sig = node
+
+            def macd(data, line):
+                signal = sma_seeded_ema(line, sig)
+                suffix = f"_{fast}_{slow}_{sig}"
+                return pandas.DataFrame({"MACD" + suffix: line, "MACDh" + suffix: line - signal,
+                                         "MACDs" + suffix: signal})
+            return [("macd_line", fast, slow)], macd
+        elif kind == "bollinger":
+            def bollinger(data, sma, std):
+                return pandas.DataFrame({"sma_" + str(node[1]): sma, "upper_bb": sma + std * BOLLINGER_STD_SCALAR,
+                                         "lower_bb": sma - std * BOLLINGER_STD_SCALAR})
+            return [("rolling_mean", node[1]), ("rolling_std", node[1])], bollinger
+        elif kind == "obv":
+            def obv(data, close, volume):
+                return pandas.Series(numpy.where(close < close.shift(1), -volume, volume), index=close.index).cumsum()
+            return [("close",), ("volume",)], obv
+        raise ValueError(f"IndicatorPlan has no definition for {node}.")
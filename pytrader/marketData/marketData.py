@@ -1,9 +1,9 @@
 import datetime
-import json
 from datetime import timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
+import numpy
 import pandas
 import pandas_ta as pta
 import yahoo_fin.stock_info as si
@@ -14,6 +14,13 @@ from ta.volume import on_balance_volume
 from pytrader import common
 # TODO - REMOVE THIS SHIT
 from pytrader.algo.algo_main import api
+from pytrader.marketData.barCache import BarCache
+from pytrader.marketData.barStore import BarStore
+from pytrader.marketData.barSync import BarSync
+from pytrader.marketData.batchIndicators import batch_signal, batch_sma, bars_to_matrix
+from pytrader.marketData.indicatorPlan import IndicatorPlan
+from pytrader.marketData.sharedBars import attached_shared_bars
+from pytrader.marketData.windowRegistry import get_window_registry
 
 tz = timezone('EST')
 
@@ -21,6 +28,12 @@ tz = timezone('EST')
 RSI_GRADIENT_SCALAR = 1
 RSI_INSTANTANEOUS_SCALAR = 1
 
+# Shared between every indicator so one download feeds the whole analysis pass.
+BAR_CACHE: BarCache = BarCache()
+BAR_STORE: BarStore = BarStore()
+BAR_SYNC: BarSync = BarSync(BAR_STORE, lambda ticker, start_date, end_date, interval: si.get_data(
+    ticker, start_date=start_date, end_date=end_date, interval=interval))
+
 
 def get_window(indicator: common.Indicator, trade_intent: common.TradeIntent, ticker: str,
                file: Optional[str] = Path(__file__).parent.parent / "sql/sqlDb/data/test_algo_windows.json"):
@@ -33,44 +46,46 @@ def get_window(indicator: common.Indicator, trade_intent: common.TradeIntent, ti
     :return: (int) window value
     """
     # TODO - add default type
-    # TODO - bullet proof MACD option
-    json_file = open(file)
-    json_data = json.load(json_file)
-    json_file.close()
-    for item in json_data:
-        if item["name"] == ticker:
-            if indicator == common.Indicator.MACD:
-                macd_indicators = ["fast", "slow", "sig"]
-                macd_fast = indicator.to_short_string() + "_" + macd_indicators[0] + "_" + trade_intent.value.lower()
-                macd_slow = indicator.to_short_string() + "_" + macd_indicators[1] + "_" + trade_intent.value.lower()
-                macd_sig = indicator.to_short_string() + "_" + macd_indicators[2] + "_" + trade_intent.value.lower()
-                return item[macd_fast], item[macd_slow], item[macd_sig]
-            else:
-                sql_column_name = indicator.to_short_string() + "_" + trade_intent.value.lower()
-                return item[sql_column_name]
+    window = get_window_registry(file).get(ticker, indicator, trade_intent)
+    if window is not None:
+        return window
 
     print(f"getWindow could not determine the Trade Intent {trade_intent} for the indicator {indicator}")
     return 0
 
 
 def get_data_bars(symbols, rate, slow, fast):
+    """
+    Gets the latest bars for every symbol and appends the fast and slow moving averages, computed for all symbols in a
+    single pass over the (time x symbols) close matrix. \n
+    :param symbols: list of symbols.
+    :param rate: bar timeframe.
+    :param slow: slow moving window.
+    :param fast: fast moving window.
+    :return: bars with (symbol, 'fast_ema') and (symbol, 'slow_ema') columns.
+    """
+    symbols = list(dict.fromkeys(symbols))
     data = api.get_barset(symbols, rate, limit=20).df
-    for x in symbols:
-        data.loc[:, (x, 'fast_ema')] = data[x]['close'].rolling(window=fast).mean()
-        data.loc[:, (x, 'slow_ema')] = data[x]['close'].rolling(window=slow).mean()
-    return data
+    closes = bars_to_matrix(data, symbols)
+    averages = pandas.DataFrame(numpy.hstack([batch_sma(closes, fast), batch_sma(closes, slow)]), index=data.index,
+                                columns=pandas.MultiIndex.from_tuples([(x, 'fast_ema') for x in symbols] +
+                                                                      [(x, 'slow_ema') for x in symbols]))
+    return pandas.concat([data, averages], axis=1)
 
 
 def get_signal_bars(symbol_list, rate, ema_slow, ema_fast):
-    data = get_data_bars(symbol_list, rate, ema_slow, ema_fast)
-    signals = {}
-    for x in symbol_list:
-        if data[x].iloc[-1]['fast_ema'] > data[x].iloc[-1]['slow_ema']:
-            signal = 1
-        else:
-            signal = 0
-        signals[x] = signal
-    return signals
+    """
+    Determines the buy signal of every symbol, 1 where the fast moving average is above the slow one. \n
+    :param symbol_list: list of symbols.
+    :param rate: bar timeframe.
+    :param ema_slow: slow moving window.
+    :param ema_fast: fast moving window.
+    :return: dict of symbol to signal.
+    """
+    symbols = list(dict.fromkeys(symbol_list))
+    data = get_data_bars(symbols, rate, ema_slow, ema_fast)
+    signals = batch_signal(bars_to_matrix(data, symbols, 'fast_ema'), bars_to_matrix(data, symbols, 'slow_ema'))
+    return dict(zip(symbols, signals.tolist()))
 
 
 def time_to_open(current_time: datetime) -> float:
@@ -278,6 +293,45 @@ def analyse_SMA(trade_intent: common.TradeIntent, data: pandas.DataFrame, ticker
     return 1.0
 
 
+def get_bars(stock_name: str, interval: Optional[str] = "1d", start_date=None, end_date=None) -> pandas.DataFrame:
+    """
+    Historical bars for the asset, served from the bar cache when they have already been downloaded.  Daily bars are
+    kept in the local bar store, so only the bars since the last sync are downloaded.  In a worker attached to shared
+    bars, the latest daily bars of the tickers they hold are read from them instead. \n
+    :param stock_name: name of asset.
+    :param interval: bar interval (1d, 1wk, 1mo).
+    :param start_date: optional start of the history.
+    :param end_date: optional end of the history.
+    :return: copy of the bars, safe to modify.
+    """
+    def fetch() -> pandas.DataFrame:
+        if interval == "1d":
+            return sync_bars(str(stock_name), start_date, end_date)
+        return si.get_data(str(stock_name), start_date=start_date, end_date=end_date, interval=interval)
+
+    shared_bars = attached_shared_bars()
+    if shared_bars is not None and interval == "1d" and start_date is None and end_date is None:
+        data = shared_bars.read_frame(str(stock_name))
+        if data is not None:
+            return data
+    data = BAR_CACHE.get(str(stock_name), fetch, interval=interval, bar_range=(start_date, end_date))
+    return data.copy()
+
+
+def sync_bars(stock_name: str, start_date=None, end_date=None) -> pandas.DataFrame:
+    """
+    Brings the local daily bars of the asset up to date, backfilling any holes in them, and reads them from the bar
+    store. \n
+    :param stock_name: name of asset.
+    :param start_date: optional start of the history.
+    :param end_date: optional end of the history.
+    :return: bars.
+    """
+    BAR_SYNC.sync(stock_name)
+    BAR_SYNC.backfill(stock_name)
+    return BAR_STORE.read_frame(stock_name, start_date, end_date)
+
+
 def analyse(stock_name: str, trade_intent: common.TradeIntent, indicator: common.Indicator) -> float:
     """
     TODO - feed output into ml algorithm. \n
@@ -288,7 +342,7 @@ def analyse(stock_name: str, trade_intent: common.TradeIntent, indicator: common
     :param indicator: indicator name.
     :return: confidence of the provided indicator analysis [-1,1] for whether it will increase.
     """
-    data = si.get_data(str(stock_name))
+    data = get_bars(stock_name)
 
     if indicator == common.Indicator.RSI:
         return analyse_RSI(trade_intent, data, stock_name)
@@ -306,3 +360,32 @@ def analyse(stock_name: str, trade_intent: common.TradeIntent, indicator: common
     else:
         print(f"{indicator} is not a valid  or supported Indicator type.")
         return 0.0
+
+
+def analyse_indicators(stock_name: str, trade_intent: common.TradeIntent,
+                       indicators: List[common.Indicator]) -> Dict[common.Indicator, float]:
+    """
+    Analyses several indicators of the asset in one pass, computing intermediates shared between them (the SMA of the
+    bollinger bands, the EMAs of the MACD...) once through a single IndicatorPlan. \n
+    :param stock_name: name of asset.
+    :param trade_intent: determines whether we are short/long/hold analysing.
+    :param indicators: indicators to analyse.
+    :return: confidence of each indicator analysis [-1,1] for whether it will increase.
+    """
+    data = get_bars(stock_name)
+    plan = IndicatorPlan()
+    windows = {}
+    for indicator in indicators:
+        window = get_window(indicator, trade_intent, stock_name)
+        if indicator == common.Indicator.UNKNOWN or not window:
+            print(f"analyse_indicators - no window for {indicator} on {stock_name}")
+            continue
+        windows[indicator] = tuple(window) if isinstance(window, (list, tuple)) else window
+        plan.add(indicator, windows[indicator])
+
+    results = plan.execute(data)
+    confidences = {}
+    for indicator in indicators:
+        result = results.get((indicator, windows.get(indicator)))
+        confidences[indicator] = 1.0 if result is not None else 0.0
+    return confidences
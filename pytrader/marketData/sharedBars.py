@@ -0,0 +1,332 @@
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, TypeVar, Union
+
+import numpy
+import pandas
+
+from pytrader import common
+from pytrader.marketData.barStore import BAR_COLUMNS, to_columns, to_frame
+
+Log = common.Log(__file__)
+
+DEFAULT_SHARED_BARS_TICKERS: int = 64
+DEFAULT_SHARED_BARS_LENGTH: int = 4096
+DEFAULT_FEED_INTERVAL: float = 60.0
+SHARED_BARS_READ_RETRIES: int = 100
+# seconds close waits for the feeder to finish publishing before terminating it.
+FEEDER_JOIN_TIMEOUT: float = 5.0
+TICKER_NAME_SIZE: int = 16
+
+# the segment is the header, a slot per ticker, then the bars of every slot as (tickers, 2 buffers, columns, length).
+_HEADER = numpy.dtype([("tickers", "<i8"), ("length", "<i8")])
+# sequence is odd while a buffer is written, the published buffer is (sequence // 2) % 2.  The name is written once
+# the ticker's first bars are published, so readers can't find it before then.
+_SLOT = numpy.dtype([("name", f"S{TICKER_NAME_SIZE}"), ("sequence", "<u8"), ("lengths", "<i8", (2,)),
+                     ("updated", "<f8")])
+
+T = TypeVar("T")
+
+# bars attached by this process, see attach_shared_bars.
+_attached: Optional["SharedBars"] = None
+
+
+class SharedBars:
+    """
+    Latest bars of a set of tickers in a shared memory segment, written by a single feeder process and read zero-copy
+    by any number of workers through numpy views.  Each ticker has two buffers: the writer fills the one readers aren't
+    using and then flips the ticker's sequence to publish it.  Like a seqlock, a reader notes the sequence before
+    reading and checks it afterwards, retrying if the writer has since started on the buffer it read, so a read never
+    mixes two updates however long it takes.
+    """
+
+    def __init__(self, name: Optional[str] = None, create: Optional[bool] = False,
+                 tickers: Optional[int] = DEFAULT_SHARED_BARS_TICKERS,
+                 length: Optional[int] = DEFAULT_SHARED_BARS_LENGTH):
+        """
+        :param name: name of the segment to attach to, a new segment is named by the system if None.
+        :param create: whether to create the segment rather than attach to it.
+        :param tickers: number of tickers the segment holds, when creating it.
+        :param length: most bars kept per ticker, the latest are kept, when creating it.
+        """
+        if create:
+            size = _HEADER.itemsize + _SLOT.itemsize * tickers + 8 * tickers * 2 * len(BAR_COLUMNS) * length
+            self.__memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+            header = numpy.ndarray((), dtype=_HEADER, buffer=self.__memory.buf)
+            header["tickers"], header["length"] = tickers, length
+            del header
+        else:
+            self.__memory = shared_memory.SharedMemory(name=name)
+            header = numpy.ndarray((), dtype=_HEADER, buffer=self.__memory.buf)
+            tickers, length = int(header["tickers"]), int(header["length"])
+            del header
+        self.__owner: bool = create
+        self.__tickers: int = tickers
+        self.__length: int = length
+        self.__slots: numpy.ndarray = numpy.ndarray((tickers,), dtype=_SLOT, buffer=self.__memory.buf,
+                                                    offset=_HEADER.itemsize)
+        shape = (tickers, 2, len(BAR_COLUMNS), length)
+        offset = _HEADER.itemsize + _SLOT.itemsize * tickers
+        # the same bars as floats and as ints, each column is read through the view of its dtype.
+        self.__bars: Dict[numpy.dtype, numpy.ndarray] = {
+            dtype: numpy.ndarray(shape, dtype=dtype, buffer=self.__memory.buf, offset=offset)
+            for dtype in set(BAR_COLUMNS.values())}
+        self.__index: Dict[str, int] = {}
+        self.__retries: int = 0
+
+    def __contains__(self, ticker: str) -> bool:
+        return self.__find(ticker) is not None
+
+    @property
+    def name(self) -> str:
+        return self.__memory.name
+
+    @property
+    def length(self) -> int:
+        return self.__length
+
+    @property
+    def retries(self) -> int:
+        """
+        number of reads retried because the writer updated the bars they were reading.
+        """
+        return self.__retries
+
+    def tickers(self) -> List[str]:
+        """
+        Returns the tickers that have been published.
+        """
+        return [name.decode("UTF-8") for name in self.__slots["name"] if len(name) > 0]
+
+    def updated(self, ticker: str) -> Optional[float]:
+        """
+        Returns when the bars of the ticker were last published, as seconds since epoch, None if they never have.
+        """
+        slot = self.__find(ticker)
+        return None if slot is None else float(self.__slots["updated"][slot])
+
+    def publish(self, ticker: str, data: Union[pandas.DataFrame, Dict[str, numpy.ndarray]]) -> int:
+        """
+        Publishes the latest bars of the ticker, only the feeder process may publish. \n
+        :param ticker: name of ticker.
+        :param data: bars, or columns of BAR_COLUMNS.
+        :return: number of bars published.
+        """
+        columns = to_columns(data) if isinstance(data, pandas.DataFrame) else data
+        slot = self.__find(ticker)
+        new = slot is None
+        if new:
+            free = numpy.flatnonzero(self.__slots["name"] == b"")
+            if len(free) == 0:
+                raise ValueError(f"SharedBars: no room for {ticker}, the segment holds {self.__tickers} tickers.")
+            slot = int(free[0])
+        count = min(len(columns["ts"]), self.__length)
+        # numpy stores in program order, which x86 keeps visible to the readers in that order.
+        published = int(self.__slots["sequence"][slot])
+        target = (published // 2 + 1) % 2
+        self.__slots["sequence"][slot] = published + 1
+        for i, (column, dtype) in enumerate(BAR_COLUMNS.items()):
+            self.__bars[dtype][slot, target, i, :count] = columns[column][len(columns[column]) - count:]
+        self.__slots["lengths"][slot, target] = count
+        self.__slots["updated"][slot] = time.time()
+        self.__slots["sequence"][slot] = published + 2
+        if new:
+            self.__slots["name"][slot] = self.__key(ticker)
+            self.__index[self.__key(ticker).decode("UTF-8")] = slot
+        return count
+
+    def apply(self, ticker: str, function: Callable[[Dict[str, numpy.ndarray]], T]) -> Optional[T]:
+        """
+        Calls the function on read-only views of the ticker's bars, without copying them, retrying if they were
+        updated while it ran.  The views are only valid during the call, so the function must copy anything it keeps
+        and shouldn't have side effects. \n
+        :param ticker: name of ticker.
+        :param function: called with a dict of column name to array.
+        :return: what the function returns, None if the ticker hasn't been published.
+        """
+        slot = self.__find(ticker)
+        if slot is None:
+            return None
+        for _ in range(SHARED_BARS_READ_RETRIES):
+            sequence = int(self.__slots["sequence"][slot])
+            published = sequence - sequence % 2
+            buffer = (published // 2) % 2
+            count = int(self.__slots["lengths"][slot, buffer])
+            columns = {}
+            for i, (column, dtype) in enumerate(BAR_COLUMNS.items()):
+                columns[column] = self.__bars[dtype][slot, buffer, i, :count]
+                columns[column].flags.writeable = False
+            result = function(columns)
+            # the writer only touches this buffer again once it starts the update after next.
+            if int(self.__slots["sequence"][slot]) <= published + 2:
+                return result
+            self.__retries += 1
+        raise RuntimeError(f"SharedBars: the bars of {ticker} were updated during {SHARED_BARS_READ_RETRIES} reads.")
+
+    def read(self, ticker: str) -> Optional[Dict[str, numpy.ndarray]]:
+        """
+        Returns a copy of the ticker's bars as columns of BAR_COLUMNS, None if it hasn't been published.
+        """
+        return self.apply(ticker, lambda columns: {column: values.copy() for column, values in columns.items()})
+
+    def read_frame(self, ticker: str) -> Optional[pandas.DataFrame]:
+        """
+        Returns a copy of the ticker's bars in the same format as yahoo_fin's get_data, None if it hasn't been
+        published.
+        """
+        return self.apply(ticker, lambda columns: to_frame(columns, ticker))
+
+    def close(self):
+        """
+        Detaches from the segment, the views must be released first.
+        """
+        self.__slots = None
+        self.__bars = {}
+        self.__memory.close()
+
+    def unlink(self):
+        """
+        Destroys the segment once every process has detached, called by the process that created it.
+        """
+        if self.__owner:
+            self.__memory.unlink()
+
+    def __find(self, ticker: str) -> Optional[int]:
+        key = self.__key(ticker)
+        slot = self.__index.get(key.decode("UTF-8"))
+        if slot is None:
+            found = numpy.flatnonzero(self.__slots["name"] == key)
+            if len(found) == 0:
+                return None
+            slot = self.__index[key.decode("UTF-8")] = int(found[0])
+        return slot
+
+    @staticmethod
+    def __key(ticker: str) -> bytes:
+        key = str(ticker).upper().encode("UTF-8")
+        if len(key) > TICKER_NAME_SIZE:
+            raise ValueError(f"SharedBars: ticker {ticker} is longer than {TICKER_NAME_SIZE} bytes.")
+        return key
+
+
+def attach_shared_bars(name: str) -> SharedBars:
+    """
+    Attaches this process to the shared bars, which get_bars then serves the tickers they hold from. \n
+    :param name: name of the segment.
+    :return: shared bars.
+    """
+    global _attached
+    if _attached is None or _attached.name != name:
+        _attached = SharedBars(name)
+    return _attached
+
+
+def attached_shared_bars() -> Optional[SharedBars]:
+    """
+    Returns the shared bars this process is attached to, None if it isn't.
+    """
+    return _attached
+
+
+def fetch_bars(ticker: str) -> pandas.DataFrame:
+    """
+    Default fetch of the feeder, the daily bars of the ticker.
+    """
+    from pytrader.marketData.marketData import get_bars
+    return get_bars(ticker)
+
+
+def _feed(name: str, commands: multiprocessing.Queue, interval: float, fetch: Callable[[str], pandas.DataFrame]):
+    """
+    Feeder loop, publishes the bars of its tickers every interval until it is sent None.
+    """
+    bars = SharedBars(name)
+    tickers: Dict[str, None] = {}
+    feed_at = time.monotonic()
+    try:
+        while True:
+            try:
+                command = commands.get(timeout=max(feed_at - time.monotonic(), 0))
+            except queue.Empty:
+                command = ()
+            if command is None:
+                return
+            due = list(tickers) if time.monotonic() >= feed_at else []
+            if len(command) > 0:
+                action, ticker = command
+                if action == "add":
+                    tickers[ticker] = None
+                    due.append(ticker)
+                else:
+                    tickers.pop(ticker, None)
+            if time.monotonic() >= feed_at:
+                feed_at = time.monotonic() + interval
+            for ticker in dict.fromkeys(due):
+                try:
+                    bars.publish(ticker, fetch(ticker))
+                except Exception as e:
+                    Log.w(f"shared bars feeder unable to publish {ticker}: {e}")
+    finally:
+        bars.close()
+
+
+class SharedBarsFeeder:
+    """
+    Creates the shared bars and runs the single process that writes them, fetching the bars of each ticker it is given
+    as soon as it is added and then every interval.
+    """
+
+    def __init__(self, tickers: Optional[int] = DEFAULT_SHARED_BARS_TICKERS,
+                 length: Optional[int] = DEFAULT_SHARED_BARS_LENGTH,
+                 interval: Optional[float] = DEFAULT_FEED_INTERVAL,
+                 fetch: Optional[Callable[[str], pandas.DataFrame]] = None):
+        """
+        :param tickers: number of tickers the segment holds.
+        :param length: most bars kept per ticker.
+        :param interval: seconds between fetches of a ticker's bars.
+        :param fetch: fetches the bars of a ticker, must be picklable, defaults to fetch_bars.
+        """
+        self.__bars: SharedBars = SharedBars(create=True, tickers=tickers, length=length)
+        self.__commands: multiprocessing.Queue = multiprocessing.Queue()
+        self.__tickers: Dict[str, None] = {}
+        self.__process: multiprocessing.Process = multiprocessing.Process(
+            target=_feed, name="SharedBarsFeeder", daemon=True,
+            args=(self.__bars.name, self.__commands, interval, fetch if fetch is not None else fetch_bars))
+        self.__process.start()
+
+    @property
+    def name(self) -> str:
+        return self.__bars.name
+
+    @property
+    def bars(self) -> SharedBars:
+        return self.__bars
+
+    def add(self, ticker: str):
+        """
+        Starts feeding the ticker's bars.
+        """
+        if ticker not in self.__tickers:
+            self.__tickers[ticker] = None
+            self.__commands.put(("add", ticker))
+
+    def remove(self, ticker: str):
+        """
+        Stops updating the ticker's bars, the last bars published stay readable.
+        """
+        if ticker in self.__tickers:
+            del self.__tickers[ticker]
+            self.__commands.put(("remove", ticker))
+
+    def close(self):
+        """
+        Stops the feeder and destroys the shared bars.
+        """
+        self.__commands.put(None)
+        self.__process.join(FEEDER_JOIN_TIMEOUT)
+        if self.__process.is_alive():
+            self.__process.terminate()
+        self.__bars.close()
+        self.__bars.unlink()
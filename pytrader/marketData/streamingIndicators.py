@@ -0,0 +1,424 @@
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from pytrader import common
+
+BOLLINGER_STD_SCALAR: float = 2.0
+
+
+class StreamingIndicator(ABC):
+    """
+    Indicator that consumes one bar at a time in constant time, rather than recomputing the whole history when a new bar
+    arrives.  Values match the batch implementations used in marketData (pandas-ta/ta) to within floating point error.
+    """
+
+    def __init__(self, indicator: common.Indicator):
+        self.__indicator: common.Indicator = indicator
+        self._count: int = 0
+
+    @property
+    def indicator(self) -> common.Indicator:
+        return self.__indicator
+
+    @property
+    def count(self) -> int:
+        """
+        number of bars consumed.
+        """
+        return self._count
+
+    @property
+    @abstractmethod
+    def value(self):
+        """
+        Returns the current value of the indicator, None until enough bars have been consumed. \n
+        :return: value.
+        """
+
+    @abstractmethod
+    def update(self, close: float, volume: Optional[float] = None):
+        """
+        Consumes a single bar. \n
+        :param close: (adjusted) close price of the bar.
+        :param volume: volume of the bar.
+        :return: the value of the indicator after the bar.
+        """
+
+    @abstractmethod
+    def _state(self) -> dict:
+        """
+        Returns the internal state of the indicator as plain python types.
+        """
+
+    @abstractmethod
+    def _load_state(self, state: dict):
+        """
+        Loads the internal state from a snapshot.
+        """
+
+    def snapshot(self) -> dict:
+        """
+        Snapshots the indicator so that it can be persisted, or handed to another process. \n
+        :return: state as a dict of plain python types.
+        """
+        return {"type": type(self).__name__, "count": self._count, "state": self._state()}
+
+    def restore(self, snapshot: dict):
+        """
+        Restores the indicator from a snapshot taken from an indicator of the same type. \n
+        :param snapshot: snapshot from snapshot().
+        """
+        if snapshot["type"] != type(self).__name__:
+            raise ValueError(f"cannot restore a {snapshot['type']} snapshot into a {type(self).__name__}.")
+        self._count = snapshot["count"]
+        self._load_state(snapshot["state"])
+
+
+class StreamingSMA(StreamingIndicator):
+    """
+    Simple Moving Average, kept as a running sum over a fixed window.
+    """
+
+    def __init__(self, window: int):
+        super().__init__(common.Indicator.SMA)
+        self.__window: int = window
+        self.__values: deque = deque(maxlen=window)
+        self.__sum: float = 0.0
+
+    @property
+    def window(self) -> int:
+        return self.__window
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self.__values) < self.__window:
+            return None
+        return self.__sum / self.__window
+
+    def update(self, close: float, volume: Optional[float] = None) -> Optional[float]:
+        if len(self.__values) == self.__window:
+            self.__sum -= self.__values[0]
+        self.__values.append(close)
+        self.__sum += close
+        self._count += 1
+        return self.value
+
+    def _state(self) -> dict:
+        return {"window": self.__window, "values": list(self.__values), "sum": self.__sum}
+
+    def _load_state(self, state: dict):
+        self.__window = state["window"]
+        self.__values = deque(state["values"], maxlen=self.__window)
+        self.__sum = state["sum"]
+
+
+class StreamingEMA(StreamingIndicator):
+    """
+    Exponential Moving Average, seeded with the SMA of the first window like pandas-ta.
+    """
+
+    def __init__(self, window: int):
+        super().__init__(common.Indicator.EMA)
+        self.__window: int = window
+        self.__alpha: float = 2.0 / (window + 1)
+        self.__seed_sum: float = 0.0
+        self.__value: Optional[float] = None
+
+    @property
+    def window(self) -> int:
+        return self.__window
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.__value
+
+    def update(self, close: float, volume: Optional[float] = None) -> Optional[float]:
+        self._count += 1
+        if self.__value is not None:
+            self.__value = self.__alpha * close + (1.0 - self.__alpha) * self.__value
+        else:
+            self.__seed_sum += close
+            if self._count == self.__window:
+                self.__value = self.__seed_sum / self.__window
+        return self.__value
+
+    def _state(self) -> dict:
+        return {"window": self.__window, "seed_sum": self.__seed_sum, "value": self.__value}
+
+    def _load_state(self, state: dict):
+        self.__window = state["window"]
+        self.__alpha = 2.0 / (self.__window + 1)
+        self.__seed_sum = state["seed_sum"]
+        self.__value = state["value"]
+
+
+class StreamingRSI(StreamingIndicator):
+    """
+    Relative Strength Index using Wilder smoothing of the gains and losses, matching ta's RSIIndicator.
+    """
+
+    def __init__(self, window: int):
+        super().__init__(common.Indicator.RSI)
+        self.__window: int = window
+        self.__alpha: float = 1.0 / window
+        self.__previous_close: Optional[float] = None
+        self.__average_gain: float = 0.0
+        self.__average_loss: float = 0.0
+
+    @property
+    def window(self) -> int:
+        return self.__window
+
+    @property
+    def value(self) -> Optional[float]:
+        if self._count < self.__window:
+            return None
+        if self.__average_loss == 0:
+            return 100.0
+        return 100.0 - (100.0 / (1.0 + self.__average_gain / self.__average_loss))
+
+    def update(self, close: float, volume: Optional[float] = None) -> Optional[float]:
+        change = 0.0 if self.__previous_close is None else close - self.__previous_close
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        if self._count == 0:
+            self.__average_gain, self.__average_loss = gain, loss
+        else:
+            self.__average_gain += self.__alpha * (gain - self.__average_gain)
+            self.__average_loss += self.__alpha * (loss - self.__average_loss)
+        self.__previous_close = close
+        self._count += 1
+        return self.value
+
+    def _state(self) -> dict:
+        return {"window": self.__window, "previous_close": self.__previous_close,
+                "average_gain": self.__average_gain, "average_loss": self.__average_loss}
+
+    def _load_state(self, state: dict):
+        self.__window = state["window"]
+        self.__alpha = 1.0 / self.__window
+        self.__previous_close = state["previous_close"]
+        self.__average_gain = state["average_gain"]
+        self.__average_loss = state["average_loss"]
+
+
+class StreamingMACD(StreamingIndicator):
+    """
+    Moving Average Convergence Divergence. The value is (macd, histogram, signal) like the MACD, MACDh and MACDs columns
+    of pandas-ta, with the histogram and signal being None until the signal window has filled.
+    """
+
+    def __init__(self, window_fast: int, window_slow: int, window_sig: int):
+        super().__init__(common.Indicator.MACD)
+        self.__fast: StreamingEMA = StreamingEMA(window_fast)
+        self.__slow: StreamingEMA = StreamingEMA(window_slow)
+        self.__signal: StreamingEMA = StreamingEMA(window_sig)
+        self.__macd: Optional[float] = None
+
+    @property
+    def windows(self) -> Tuple[int, int, int]:
+        return self.__fast.window, self.__slow.window, self.__signal.window
+
+    @property
+    def value(self) -> Optional[Tuple[float, Optional[float], Optional[float]]]:
+        if self.__macd is None:
+            return None
+        signal = self.__signal.value
+        histogram = self.__macd - signal if signal is not None else None
+        return self.__macd, histogram, signal
+
+    def update(self, close: float, volume: Optional[float] = None):
+        fast = self.__fast.update(close)
+        slow = self.__slow.update(close)
+        self._count += 1
+        if fast is not None and slow is not None:
+            self.__macd = fast - slow
+            self.__signal.update(self.__macd)
+        return self.value
+
+    def _state(self) -> dict:
+        return {"fast": self.__fast.snapshot(), "slow": self.__slow.snapshot(), "signal": self.__signal.snapshot(),
+                "macd": self.__macd}
+
+    def _load_state(self, state: dict):
+        self.__fast.restore(state["fast"])
+        self.__slow.restore(state["slow"])
+        self.__signal.restore(state["signal"])
+        self.__macd = state["macd"]
+
+
+class StreamingBollinger(StreamingIndicator):
+    """
+    Bollinger bands over a sliding window.  The mean and variance are kept with Welford's update (and its inverse for
+    the bar leaving the window), so each bar costs the same regardless of window size.  The value is
+    (sma, upper band, lower band), using the sample standard deviation like pandas' rolling std.
+    """
+
+    def __init__(self, window: int, std_scalar: Optional[float] = BOLLINGER_STD_SCALAR):
+        super().__init__(common.Indicator.BOLLINGER)
+        self.__window: int = window
+        self.__std_scalar: float = std_scalar
+        self.__values: deque = deque(maxlen=window)
+        self.__mean: float = 0.0
+        self.__m2: float = 0.0
+
+    @property
+    def window(self) -> int:
+        return self.__window
+
+    @property
+    def std(self) -> Optional[float]:
+        if len(self.__values) < self.__window or self.__window < 2:
+            return None
+        return math.sqrt(max(self.__m2, 0.0) / (self.__window - 1))
+
+    @property
+    def value(self) -> Optional[Tuple[float, float, float]]:
+        std = self.std
+        if std is None:
+            return None
+        return self.__mean, self.__mean + std * self.__std_scalar, self.__mean - std * self.__std_scalar
+
+    def update(self, close: float, volume: Optional[float] = None) -> Optional[Tuple[float, float, float]]:
+        if len(self.__values) < self.__window:
+            # grow the window
+            self.__values.append(close)
+            delta = close - self.__mean
+            self.__mean += delta / len(self.__values)
+            self.__m2 += delta * (close - self.__mean)
+        else:
+            # slide the window, replacing the oldest value
+            oldest = self.__values[0]
+            self.__values.append(close)
+            previous_mean = self.__mean
+            self.__mean += (close - oldest) / self.__window
+            self.__m2 += (close - oldest) * (close - self.__mean + oldest - previous_mean)
+        self._count += 1
+        return self.value
+
+    def _state(self) -> dict:
+        return {"window": self.__window, "std_scalar": self.__std_scalar, "values": list(self.__values),
+                "mean": self.__mean, "m2": self.__m2}
+
+    def _load_state(self, state: dict):
+        self.__window = state["window"]
+        self.__std_scalar = state["std_scalar"]
+        self.__values = deque(state["values"], maxlen=self.__window)
+        self.__mean = state["mean"]
+        self.__m2 = state["m2"]
+
+
+class StreamingOBV(StreamingIndicator):
+    """
+    On Balance Volume, matching ta's on_balance_volume.
+    """
+
+    def __init__(self):
+        super().__init__(common.Indicator.VOLUME)
+        self.__previous_close: Optional[float] = None
+        self.__value: Optional[float] = None
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.__value
+
+    def update(self, close: float, volume: Optional[float] = None) -> float:
+        if volume is None:
+            raise ValueError("StreamingOBV requires the volume of each bar.")
+        signed_volume = -volume if self.__previous_close is not None and close < self.__previous_close else volume
+        self.__value = signed_volume if self.__value is None else self.__value + signed_volume
+        self.__previous_close = close
+        self._count += 1
+        return self.__value
+
+    def _state(self) -> dict:
+        return {"previous_close": self.__previous_close, "value": self.__value}
+
+    def _load_state(self, state: dict):
+        self.__previous_close = state["previous_close"]
+        self.__value = state["value"]
+
+
+def create_streaming_indicator(indicator: common.Indicator,
+                               window: Union[int, Tuple[int, int, int], None] = None) -> StreamingIndicator:
+    """
+    Creates the streaming indicator for the indicator type. \n
+    :param indicator: type of indicator.
+    :param window: window of the indicator, (fast, slow, signal) for MACD.  Ignored for volume.
+    :return: streaming indicator.
+    """
+    if indicator == common.Indicator.SMA:
+        return StreamingSMA(window)
+    elif indicator == common.Indicator.EMA:
+        return StreamingEMA(window)
+    elif indicator == common.Indicator.RSI:
+        return StreamingRSI(window)
+    elif indicator == common.Indicator.MACD:
+        return StreamingMACD(*window)
+    elif indicator == common.Indicator.BOLLINGER:
+        return StreamingBollinger(window)
+    elif indicator == common.Indicator.VOLUME:
+        return StreamingOBV()
+    raise ValueError(f"{indicator} is not a valid or supported Indicator type.")
+
+
+class StreamingIndicatorSet:
+    """
+    The streaming indicators of a single ticker and trade intent, updated together as each bar arrives.
+    """
+
+    def __init__(self, ticker: str, trade_intent: common.TradeIntent, indicators: List[common.Indicator],
+                 window_lookup: Callable[[common.Indicator, common.TradeIntent, str], Union[int, Tuple]]):
+        """
+        :param ticker: name of ticker.
+        :param trade_intent: determines whether we are short/long/hold analysing.
+        :param indicators: indicators to keep up to date.
+        :param window_lookup: returns the window for (indicator, trade intent, ticker), i.e. marketData.get_window.
+        """
+        self.__ticker: str = ticker
+        self.__trade_intent: common.TradeIntent = trade_intent
+        self.__indicators: Dict[common.Indicator, StreamingIndicator] = {
+            indicator: create_streaming_indicator(indicator, window_lookup(indicator, trade_intent, ticker))
+            for indicator in indicators}
+
+    @property
+    def ticker(self) -> str:
+        return self.__ticker
+
+    @property
+    def trade_intent(self) -> common.TradeIntent:
+        return self.__trade_intent
+
+    @property
+    def indicators(self) -> Dict[common.Indicator, StreamingIndicator]:
+        return self.__indicators
+
+    @property
+    def values(self) -> Dict[common.Indicator, object]:
+        return {indicator: streaming.value for indicator, streaming in self.__indicators.items()}
+
+    def update(self, close: float, volume: Optional[float] = None) -> Dict[common.Indicator, object]:
+        """
+        Consumes a single bar in every indicator. \n
+        :param close: (adjusted) close price of the bar.
+        :param volume: volume of the bar.
+        :return: the value of each indicator after the bar.
+        """
+        return {indicator: streaming.update(close, volume) for indicator, streaming in self.__indicators.items()}
+
+    def snapshot(self) -> dict:
+        """
+        Snapshots every indicator in the set. \n
+        :return: state as a dict of plain python types.
+        """
+        return {indicator.value: streaming.snapshot() for indicator, streaming in self.__indicators.items()}
+
+    def restore(self, snapshot: dict):
+        """
+        Restores every indicator in the set from a snapshot. \n
+        :param snapshot: snapshot from snapshot().
+        """
+        for indicator, streaming in self.__indicators.items():
+            streaming.restore(snapshot[indicator.value])
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from pydispatch import dispatcher
+
+from pytrader import common
+
+MTIME_CHECK_INTERVAL: float = 1.0
+MACD_WINDOW_NAMES: List[str] = ["fast", "slow", "sig"]
+
+Window = Union[int, Tuple[int, int, int]]
+
+
+def window_column_names(indicator: common.Indicator, trade_intent: common.TradeIntent) -> List[str]:
+    """
+    Column names used by the windows file/table for the indicator and trade intent. MACD has three columns (fast, slow,
+    signal), every other indicator has one. \n
+    :param indicator: type of indicator.
+    :param trade_intent: intended trade type.
+    :return: list of column names.
+    """
+    intent = trade_intent.value.lower()
+    if indicator == common.Indicator.MACD:
+        return [f"{indicator.to_short_string()}_{name}_{intent}" for name in MACD_WINDOW_NAMES]
+    return [f"{indicator.to_short_string()}_{intent}"]
+
+
+def _indexable_pairs() -> List[Tuple[common.Indicator, common.TradeIntent]]:
+    return [(indicator, trade_intent) for indicator in common.Indicator if indicator != common.Indicator.UNKNOWN
+            for trade_intent in common.TradeIntent if trade_intent != common.TradeIntent.UNKNOWN]
+
+
+class WindowRegistry:
+    """
+    In-memory index of the analysis windows, keyed by ticker and (indicator, trade intent).  The windows file is parsed
+    once and only re-read when its modification time changes or the sql local stores are updated.
+    """
+
+    def __init__(self, file: Optional[Union[str, Path]] = None,
+                 mtime_check_interval: Optional[float] = MTIME_CHECK_INTERVAL):
+        self.__file: Optional[Path] = Path(file) if file is not None else None
+        self.__mtime_check_interval: float = mtime_check_interval
+        self.__windows: Dict[str, Dict[Tuple[common.Indicator, common.TradeIntent], Window]] = {}
+        self.__mtime_ns: Optional[int] = None
+        self.__last_checked: float = 0.0
+        self.__stale: bool = self.__file is not None
+        self.__load_count: int = 0
+        self.__lock: threading.Lock = threading.Lock()
+        dispatcher.connect(self.__dispatcher_receive, signal=common.Signal.SQL_MANAGER.value)
+
+    @property
+    def file(self) -> Optional[Path]:
+        return self.__file
+
+    @property
+    def load_count(self) -> int:
+        return self.__load_count
+
+    @property
+    def tickers(self) -> List[str]:
+        self.__refresh_if_changed()
+        return list(self.__windows.keys())
+
+    def get(self, ticker: str, indicator: common.Indicator, trade_intent: common.TradeIntent) -> Optional[Window]:
+        """
+        Looks up the window for the ticker. \n
+        :param ticker: name of ticker.
+        :param indicator: type of indicator.
+        :param trade_intent: intended trade type.
+        :return: window, a (fast, slow, signal) tuple for MACD, or None if it doesn't exist.
+        """
+        self.__refresh_if_changed()
+        ticker_windows = self.__windows.get(ticker)
+        if ticker_windows is None:
+            return None
+        return ticker_windows.get((indicator, trade_intent))
+
+    def invalidate(self):
+        """
+        Forces the windows to be reloaded on the next lookup.
+        """
+        self.__stale = True
+
+    def load_rows(self, rows: Iterable[dict]):
+        """
+        Replaces the index with the provided rows.  Column names are case-insensitive so both the local store and the
+        sql table formats can be loaded. \n
+        :param rows: window rows, one per ticker.
+        """
+        windows: Dict[str, Dict[Tuple[common.Indicator, common.TradeIntent], Window]] = {}
+        for row in rows:
+            row = {str(k).lower(): v for k, v in row.items()}
+            ticker_windows = {}
+            for indicator, trade_intent in _indexable_pairs():
+                columns = window_column_names(indicator, trade_intent)
+                if not all(column in row for column in columns):
+                    continue
+                values = tuple(row[column] for column in columns)
+                ticker_windows[(indicator, trade_intent)] = values if len(values) > 1 else values[0]
+            windows[row["name"]] = ticker_windows
+        with self.__lock:
+            self.__windows = windows
+            self.__load_count += 1
+
+    def load_daos(self, daos: Iterable):
+        """
+        Replaces the index with rows from the windows table. \n
+        :param daos: SQLDbWindowsDao objects, as returned by SQLDbWindows.get_windows().
+        """
+        columns = ["name"] + [column for indicator, trade_intent in _indexable_pairs()
+                              for column in window_column_names(indicator, trade_intent)]
+        self.load_rows({column: getattr(dao, column) for column in columns if hasattr(dao, column)} for dao in daos)
+
+    def __refresh_if_changed(self):
+        """
+        Reloads the file if it has been invalidated or its modification time has changed.  The modification time is
+        checked at most once per check interval.
+        """
+        if self.__file is None:
+            return
+        now = time.monotonic()
+        if not self.__stale and now - self.__last_checked < self.__mtime_check_interval:
+            return
+        self.__last_checked = now
+        mtime_ns = os.stat(self.__file).st_mtime_ns
+        if not self.__stale and mtime_ns == self.__mtime_ns:
+            return
+        with open(self.__file) as json_file:
+            rows = json.load(json_file)
+        self.load_rows(rows)
+        self.__mtime_ns = mtime_ns
+        self.__stale = False
+
+    def __dispatcher_receive(self, **kwargs):
+        """
+        handle dispatcher messages from the sql dbs, reloading when the window local store has been updated.
+        """
+        if kwargs.get("response_type") == common.ResponseType.UPDATE:
+            self.invalidate()
+
+
+_REGISTRIES: Dict[str, WindowRegistry] = {}
+_REGISTRIES_LOCK: threading.Lock = threading.Lock()
+
+
+def get_window_registry(file: Union[str, Path]) -> WindowRegistry:
+    """
+    Returns the shared registry for the windows file, creating it on first use. \n
+    :param file: windows json file.
+    :return: registry.
+    """
+    key = str(file)
+    registry = _REGISTRIES.get(key)
+    if registry is not None:
+        return registry
+    with _REGISTRIES_LOCK:
+        if key not in _REGISTRIES:
+            _REGISTRIES[key] = WindowRegistry(file)
+        return _REGISTRIES[key]
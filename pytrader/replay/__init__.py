@@ -0,0 +1,2 @@
+from pytrader.replay.marketReplay import MarketReplay, ReplayResult
+from pytrader.replay.replaySQLManager import ReplaySQLManager
@@ -0,0 +1,204 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+import pandas
+from pydispatch import dispatcher
+
+from pytrader import common
+from pytrader.backtest.backtest import Backtest, DEFAULT_INITIAL_CASH
+from pytrader.exchange.exchangeManager import ExchangeManager
+from pytrader.exchange.exchangeSimulated import ExchangeSimulated
+from pytrader.marketData.barStore import BarStore, to_timestamps
+from pytrader.marketData.indicatorPlan import Window
+from pytrader.replay.replaySQLManager import ReplaySQLManager
+from pytrader.trade.tradingManager import TradingManager
+
+
+@dataclass
+class ReplayResult:
+    """
+    Output of a replay, latencies are wall clock seconds.
+    """
+    bars: int
+    inspections: int
+    orders: int
+    fills: int
+    decision_latency: numpy.ndarray
+    order_latency: numpy.ndarray
+    wall_time: float
+    final_equity: float
+    trades: pandas.DataFrame
+    stats: Dict[str, float] = field(default_factory=dict)
+
+
+class MarketReplay:
+    """
+    Replays recorded bars through the Trading Manager and Exchange Manager, with a simulated exchange in place of
+    Alpaca and in-memory tables in place of MySQL.  Every bar goes through the real dispatcher flow: the price is
+    pushed to the exchange (filling the orders of the bar before) and the Exchange Manager picks up the fills, every
+    ticker with a bar is inspected (thresholds request, analysis, allowance request, order request), and the Exchange
+    Manager then sends the new orders to the exchange.  The confidence of each bar is the same one the backtest
+    computes, so a replay and a backtest of the same bars can be compared.
+    """
+
+    def __init__(self, data: Dict[str, pandas.DataFrame], indicators: Dict[common.Indicator, Window],
+                 buy_threshold: float, sell_threshold: float, speed: Optional[float] = None,
+                 initial_cash: Optional[float] = DEFAULT_INITIAL_CASH, commission: Optional[float] = 0.0,
+                 trade_intent: Optional[common.TradeIntent] = common.TradeIntent.SHORT_TRADE):
+        """
+        :param data: bars of every ticker, indexed by date with an 'adjclose' or 'Adj Close' column, and
+        'volume'/'Volume' if VOLUME is configured.
+        :param indicators: indicators and their windows.
+        :param buy_threshold: the confidence level we determine that a good buy point is.
+        :param sell_threshold: the confidence level we determine that a good sale point is.
+        :param speed: bar time replayed per wall clock second, 1 is real time, None replays as fast as possible.
+        :param initial_cash: cash of the simulated exchange.
+        :param commission: fraction of the order value paid on every buy and sell.
+        :param trade_intent: trade intent of the inspected assets.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError(f"MarketReplay: speed must be positive or None, not {speed}.")
+        self.__data: Dict[str, pandas.DataFrame] = {str(ticker).upper(): bars for ticker, bars in data.items()}
+        self.__indicators: Dict[common.Indicator, Window] = dict(indicators)
+        self.__buy_threshold: float = buy_threshold
+        self.__sell_threshold: float = sell_threshold
+        self.__speed: Optional[float] = speed
+        self.__initial_cash: float = initial_cash
+        self.__commission: float = commission
+        self.__trade_intent: common.TradeIntent = trade_intent
+        self.__exchange: Optional[ExchangeSimulated] = None
+        self.__confidences: Dict[str, numpy.ndarray] = {}
+        self.__cursor: Dict[str, int] = {}
+        self.__order_responses: int = 0
+
+    @classmethod
+    def from_store(cls, store: BarStore, tickers: List[str], start=None, end=None, **kwargs) -> 'MarketReplay':
+        """
+        Creates a replay of the bars held in the bar store. \n
+        :param store: bar store.
+        :param tickers: names of tickers.
+        :param start: optional first date or timestamp.
+        :param end: optional last date or timestamp.
+        :return: replay.
+        """
+        return cls({ticker: store.read_frame(ticker, start, end) for ticker in tickers}, **kwargs)
+
+    @property
+    def exchange(self) -> Optional[ExchangeSimulated]:
+        return self.__exchange
+
+    def run(self) -> ReplayResult:
+        """
+        Replays every bar, paced by the replay speed. \n
+        :return: result.
+        """
+        prices, events = self.__prepare()
+        self.__exchange = ExchangeSimulated(cash=self.__initial_cash, commission=self.__commission)
+        sql_manager = ReplaySQLManager(self.__buy_threshold, self.__sell_threshold)
+        # orders are reconciled on every pass, a bar is the replay's unit of time.
+        exchange_manager = ExchangeManager(common.RunType.REPLAY, paper_stock_exchange=self.__exchange,
+                                           sql_manager=sql_manager, reconcile_interval=0.0)
+        trading_manager = TradingManager(common.RunType.REPLAY, analyser=self.__analyse)
+        dispatcher.connect(self.__exchange_manager_receive, signal=common.Signal.EXCHANGE_MANAGER.value,
+                           sender=common.Signal.EXCHANGE_MANAGER.value)
+
+        decision_latency, order_latency = [], []
+        self.__order_responses = 0
+        first_ts = events[0][0] if len(events) > 0 else 0
+        started = time.perf_counter()
+        try:
+            for ts, bars in events:
+                if self.__speed is not None:
+                    delay = started + (ts - first_ts) / self.__speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                for ticker, i in bars:
+                    self.__exchange.set_price(ticker, prices[ticker][i], ts)
+                # picks up the fills first, an asset with an order still processing can't be ordered again.
+                exchange_manager.process_orders()
+                for ticker, i in bars:
+                    self.__cursor[ticker] = i
+                    asset = common.Asset(ticker, common.AssetType.PAPER_STOCK)
+                    asset.trade_intent = self.__trade_intent
+                    responses = self.__order_responses
+                    before = time.perf_counter()
+                    trading_manager.inspect(asset)
+                    latency = time.perf_counter() - before
+                    decision_latency.append(latency)
+                    if self.__order_responses > responses:
+                        order_latency.append(latency)
+                exchange_manager.process_orders()
+        finally:
+            wall_time = time.perf_counter() - started
+            dispatcher.disconnect(self.__exchange_manager_receive, signal=common.Signal.EXCHANGE_MANAGER.value,
+                                  sender=common.Signal.EXCHANGE_MANAGER.value)
+            trading_manager.stop()
+            exchange_manager.stop()
+
+        trades = self.__trades()
+        result = ReplayResult(bars=sum(len(bars) for _, bars in events), inspections=len(decision_latency),
+                              orders=self.__order_responses, fills=len(trades),
+                              decision_latency=numpy.array(decision_latency), order_latency=numpy.array(order_latency),
+                              wall_time=wall_time, final_equity=self.__exchange.equity(), trades=trades)
+        result.stats = self.__stats(result)
+        return result
+
+    def __prepare(self) -> Tuple[Dict[str, numpy.ndarray], List[Tuple[int, List[Tuple[str, int]]]]]:
+        """
+        Computes the confidence of every bar up front, the indicators only look back so this is the same as computing
+        them as the bars arrive, and merges the bars of every ticker into a single timeline.
+        """
+        backtest = Backtest(self.__indicators, self.__buy_threshold, self.__sell_threshold)
+        prices, timeline = {}, {}
+        for ticker, data in self.__data.items():
+            close = data['adjclose'] if 'adjclose' in data.columns else data['Adj Close']
+            prices[ticker] = close.to_numpy(dtype=numpy.float64)
+            self.__confidences[ticker] = backtest.run(data).confidence.to_numpy()
+            for i, ts in enumerate(to_timestamps(data.index)):
+                timeline.setdefault(int(ts), []).append((ticker, i))
+        return prices, sorted(timeline.items())
+
+    def __analyse(self, asset: common.Asset) -> float:
+        """
+        Confidence of the asset at the current bar.  The strategy is long only, so a buy while holding the asset or a
+        sell while not holding it is turned into no decision, as is a buy that the cash cannot pay for.
+        """
+        confidence = float(self.__confidences[asset.name][self.__cursor[asset.name]])
+        neutral = (self.__buy_threshold + self.__sell_threshold) / 2.0
+        holding = asset.name in self.__exchange.positions
+        if confidence >= self.__buy_threshold and (holding or self.__exchange.request_quantity(asset) <= 0):
+            return neutral
+        if confidence <= self.__sell_threshold and not holding:
+            return neutral
+        return confidence
+
+    def __exchange_manager_receive(self, **kwargs):
+        """
+        Counts the orders the Exchange Manager accepts, the end of a decision.
+        """
+        if kwargs.get("response_type") == common.ResponseType.TRADE \
+                and kwargs.get("status") == common.ResponseStatus.SUCCESSFUL:
+            self.__order_responses += 1
+
+    def __trades(self) -> pandas.DataFrame:
+        filled = [order for order in self.__exchange.orders.values() if order.status == common.OrderStatus.FILLED]
+        return pandas.DataFrame({"ticker": [order.name for order in filled],
+                                 "side": [order.side.name for order in filled],
+                                 "qty": [order.filled_qty for order in filled],
+                                 "price": [order.filled_price for order in filled],
+                                 "date": pandas.to_datetime([order.filled_at for order in filled], unit="s")})
+
+    @staticmethod
+    def __stats(result: ReplayResult) -> Dict[str, float]:
+        def percentile(latency: numpy.ndarray, q: float) -> float:
+            return float(numpy.percentile(latency, q)) if len(latency) > 0 else 0.0
+
+        wall_time = max(result.wall_time, 1e-9)
+        return {"bars_per_second": result.bars / wall_time,
+                "decisions_per_second": result.inspections / wall_time,
+                "decision_latency_p50": percentile(result.decision_latency, 50),
+                "decision_latency_p99": percentile(result.decision_latency, 99),
+                "order_latency_p50": percentile(result.order_latency, 50),
+                "order_latency_p99": percentile(result.order_latency, 99)}
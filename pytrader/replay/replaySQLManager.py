@@ -0,0 +1,125 @@
+import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pytrader import common
+from pytrader.sql.sqlDb.sqlDb import SQLQueryResponseType
+
+
+class ReplayTradesDb:
+    """
+    In-memory stand-in for the trades and open trades tables, keyed by order id.
+    """
+
+    def __init__(self):
+        self.__trades: Dict[int, common.Order] = {}
+
+    def get_all_trades(self) -> List[common.Order]:
+        return list(self.__trades.values())
+
+    def commit_trade(self, order: common.Order) -> SQLQueryResponseType:
+        if order.asset.id in self.__trades:
+            return SQLQueryResponseType.UNSUCCESSFUL
+        self.__trades[order.asset.id] = order
+        return SQLQueryResponseType.SUCCESSFUL
+
+    def delete_trade(self, order: common.Order) -> SQLQueryResponseType:
+        if self.__trades.pop(order.asset.id, None) is None:
+            return SQLQueryResponseType.UNSUCCESSFUL
+        return SQLQueryResponseType.SUCCESSFUL
+
+    def update_trade(self, order: common.Order) -> SQLQueryResponseType:
+        if order.asset.id not in self.__trades:
+            return SQLQueryResponseType.UNSUCCESSFUL
+        self.__trades[order.asset.id] = order
+        return SQLQueryResponseType.SUCCESSFUL
+
+    def is_order_id_unique(self, order_id: int) -> bool:
+        return order_id not in self.__trades
+
+    def get_max_order_ids(self) -> List[int]:
+        return [max(self.__trades)] if len(self.__trades) > 0 else []
+
+
+class ReplayTradeWriter:
+    """
+    Applies the writes of the trade tables straight away, in place of the batching SQLTradeWriter.
+    """
+
+    def __init__(self, open_trades_db: ReplayTradesDb, trades_db: ReplayTradesDb):
+        self.__open_trades_db: ReplayTradesDb = open_trades_db
+        self.__trades_db: ReplayTradesDb = trades_db
+
+    def open_trade(self, order: common.Order):
+        self.__open_trades_db.commit_trade(order)
+
+    def update_trade(self, order: common.Order):
+        self.__open_trades_db.update_trade(order)
+
+    def close_trade(self, order: common.Order):
+        self.__trades_db.commit_trade(order)
+        self.__open_trades_db.delete_trade(order)
+
+    def flush(self) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+
+class ReplayThresholdsDb:
+    """
+    In-memory stand-in for the buy/sell thresholds table.
+    """
+
+    def __init__(self, buy_threshold: float, sell_threshold: float,
+                 thresholds: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.__default: Tuple[float, float] = (buy_threshold, sell_threshold)
+        self.__thresholds: Dict[str, Tuple[float, float]] = dict(thresholds) if thresholds is not None else {}
+
+    def get_threshold(self, asset: common.Asset) -> Tuple[float, float]:
+        return self.__thresholds.get(asset.name, self.__default)
+
+    def warm(self):
+        pass
+
+
+class ReplaySQLManager:
+    """
+    Holds the in-memory tables used by the Exchange Manager during a replay, in place of the MySQL databases.
+    """
+
+    def __init__(self, buy_threshold: float, sell_threshold: float,
+                 thresholds: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.__last_updated: datetime.datetime = datetime.datetime.min
+        self.__buySellThresholdDb: ReplayThresholdsDb = ReplayThresholdsDb(buy_threshold, sell_threshold, thresholds)
+        self.__tradesDb: ReplayTradesDb = ReplayTradesDb()
+        self.__openTradesDb: ReplayTradesDb = ReplayTradesDb()
+        self.__tradeWriter: ReplayTradeWriter = ReplayTradeWriter(self.__openTradesDb, self.__tradesDb)
+
+    @property
+    def buy_sell_threshold_db(self) -> ReplayThresholdsDb:
+        return self.__buySellThresholdDb
+
+    @property
+    def threshold_cache(self) -> ReplayThresholdsDb:
+        # already in memory, so it is its own cache.
+        return self.__buySellThresholdDb
+
+    @property
+    def trades_db(self) -> ReplayTradesDb:
+        return self.__tradesDb
+
+    @property
+    def open_trades_db(self) -> ReplayTradesDb:
+        return self.__openTradesDb
+
+    @property
+    def trade_writer(self) -> ReplayTradeWriter:
+        return self.__tradeWriter
+
+    @property
+    def last_updated(self):
+        return self.__last_updated
+
+    def update_local_stores(self):
+        self.__last_updated = datetime.datetime.now()
@@ -1 +1,4 @@
+from pytrader.sql.sqlConnectionPool import SQLConnectionPool
 from pytrader.sql.sqlManager import SQLManager
+from pytrader.sql.sqlTradeWriter import SQLTradeWrite, SQLTradeWriter
+from pytrader.sql.sqlThresholdCache import SQLThresholdCache
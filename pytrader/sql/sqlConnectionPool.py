@@ -0,0 +1,194 @@
+import collections
+import contextlib
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import mysql.connector as mysql
+import numpy
+
+DEFAULT_POOL_SIZE: int = 4
+DEFAULT_VALIDATION_INTERVAL: float = 30.0
+WAIT_SAMPLES: int = 1024
+# errors after which a connection can't be trusted, anything else (e.g. a bad query) leaves it usable.
+CONNECTION_ERRORS: Tuple[type, ...] = (OSError, mysql.errors.InterfaceError, mysql.errors.OperationalError)
+
+
+class SQLConnectionPool:
+    """
+    Pool of open MySQL connections, shared by the tables of a SQLManager so a query doesn't pay for a new connection.
+    Connections are opened on demand up to the pool size and borrowing blocks once they are all in use.  A thread that
+    borrows while it already holds a connection is given the same one, so nested queries can't deadlock the pool.  A
+    connection that has been idle for longer than the validation interval is pinged before it is handed out and
+    reconnected if it has gone stale, and one that raises a connection error is closed rather than returned.
+    Each connection keeps a prepared cursor per query it has run as a prepared statement, so the statement is parsed by
+    the server once per connection rather than once per call.
+    """
+
+    def __init__(self, host: str, database: str, user: str, password: str, size: Optional[int] = DEFAULT_POOL_SIZE,
+                 validation_interval: Optional[float] = DEFAULT_VALIDATION_INTERVAL,
+                 connect: Optional[Callable[..., Any]] = None):
+        """
+        :param host: host of the server.
+        :param database: name of the database.
+        :param user: user name.
+        :param password: user's password.
+        :param size: maximum number of connections.
+        :param validation_interval: seconds a connection can be idle before it is pinged again.
+        :param connect: opens a connection from the keyword arguments above, defaults to mysql.connect.
+        """
+        if size < 1:
+            raise ValueError(f"SQLConnectionPool: size must be at least 1, not {size}.")
+        self.__connect_args: dict = dict(host=host, database=database, user=user, password=password)
+        self.__connect: Callable[..., Any] = connect if connect is not None else mysql.connect
+        self.__size: int = size
+        self.__validation_interval: float = validation_interval
+        # idle connections and the time they were returned, most recently used last.
+        self.__idle: List[Tuple[Any, float]] = []
+        self.__open: int = 0
+        self.__closed: bool = False
+        self.__condition: threading.Condition = threading.Condition()
+        self.__local: threading.local = threading.local()
+        # prepared cursors of each connection by query, keyed by id() of the connection.
+        self.__statements: Dict[int, Dict[str, Any]] = {}
+        self.__borrows: int = 0
+        self.__created: int = 0
+        self.__reconnects: int = 0
+        self.__discarded: int = 0
+        self.__prepared: int = 0
+        self.__executions: int = 0
+        self.__waits: Deque[float] = collections.deque(maxlen=WAIT_SAMPLES)
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def open(self) -> int:
+        """
+        number of connections currently open, idle or borrowed.
+        """
+        return self.__open
+
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Borrows a connection for the duration of the with block. \n
+        :return: connection.
+        """
+        held = getattr(self.__local, "connection", None)
+        if held is not None:
+            yield held
+            return
+        connection = self.__acquire()
+        self.__local.connection = connection
+        discard = False
+        try:
+            yield connection
+        except CONNECTION_ERRORS:
+            discard = True
+            raise
+        finally:
+            self.__local.connection = None
+            self.__release(connection, discard)
+
+    def prepared_cursor(self, connection: Any, query: str) -> Any:
+        """
+        Returns the connection's prepared cursor for the query, creating it the first time.  The cursor prepares the
+        query on its first execute and reuses the statement while it is given the same query object, so pass the
+        registered query itself rather than an equal copy. \n
+        :param connection: borrowed connection.
+        :param query: query the cursor executes.
+        :return: cursor.
+        """
+        statements = self.__statements.setdefault(id(connection), {})
+        cursor = statements.get(query)
+        if cursor is None:
+            cursor = connection.cursor(prepared=True)
+            statements[query] = cursor
+            self.__prepared += 1
+        self.__executions += 1
+        return cursor
+
+    def stats(self) -> dict:
+        """
+        Returns the usage of the pool, waits are the seconds a borrow blocked for a connection over the latest borrows.
+        """
+        waits = numpy.array(self.__waits)
+        return {"size": self.__size, "open": self.__open, "idle": len(self.__idle), "borrows": self.__borrows,
+                "created": self.__created, "reconnects": self.__reconnects, "discarded": self.__discarded,
+                "prepared": self.__prepared, "statement_reuse_rate":
+                    1.0 - self.__prepared / self.__executions if self.__executions > 0 else 0.0,
+                "wait_mean": float(waits.mean()) if len(waits) > 0 else 0.0,
+                "wait_p50": float(numpy.percentile(waits, 50)) if len(waits) > 0 else 0.0,
+                "wait_p99": float(numpy.percentile(waits, 99)) if len(waits) > 0 else 0.0,
+                "wait_max": float(waits.max()) if len(waits) > 0 else 0.0}
+
+    def close(self):
+        """
+        Closes every idle connection, borrowed connections are closed when they are returned.
+        """
+        with self.__condition:
+            idle, self.__idle = self.__idle, []
+            self.__open -= len(idle)
+            self.__closed = True
+            self.__condition.notify_all()
+        for connection, _ in idle:
+            self.__close(connection)
+
+    def __acquire(self) -> Any:
+        before = time.perf_counter()
+        with self.__condition:
+            while not self.__closed and not self.__idle and self.__open >= self.__size:
+                self.__condition.wait()
+            if self.__closed:
+                raise RuntimeError("SQLConnectionPool: the pool is closed.")
+            self.__waits.append(time.perf_counter() - before)
+            self.__borrows += 1
+            if self.__idle:
+                connection, returned = self.__idle.pop()
+            else:
+                self.__open += 1
+                self.__created += 1
+                connection, returned = None, None
+        try:
+            if connection is None:
+                return self.__connect(**self.__connect_args)
+            if time.monotonic() - returned >= self.__validation_interval:
+                self.__validate(connection)
+            return connection
+        except BaseException:
+            with self.__condition:
+                self.__open -= 1
+                self.__discarded += 1 if connection is not None else 0
+                self.__condition.notify()
+            if connection is not None:
+                self.__close(connection)
+            raise
+
+    def __validate(self, connection: Any):
+        # the server drops connections that are idle for longer than its wait_timeout, reconnect rather than fail.
+        if not connection.is_connected():
+            self.__reconnects += 1
+            # the server drops the statements prepared by the old session.
+            self.__statements.pop(id(connection), None)
+            connection.reconnect(attempts=1)
+
+    def __release(self, connection: Any, discard: bool):
+        with self.__condition:
+            discard = discard or self.__closed
+            if discard:
+                self.__open -= 1
+                self.__discarded += 1
+            else:
+                self.__idle.append((connection, time.monotonic()))
+            self.__condition.notify()
+        if discard:
+            self.__close(connection)
+
+    def __close(self, connection: Any):
+        self.__statements.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -2,11 +2,13 @@ import datetime
 import enum
 import json
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Optional, Sequence, Tuple
 
-import mysql.connector as mysql
+from pydispatch import dispatcher
 
 import pytrader.cfg as cfg
+from pytrader import common
+from pytrader.sql.sqlConnectionPool import SQLConnectionPool
 
 
 def sql_response_to_json(sql_response: list, column_names: list) -> json:
@@ -57,7 +59,11 @@ class SQLDb:
     Class that holds all info for a table reference
     """
 
-    def __init__(self, db_type: SQLDbType):
+    def __init__(self, db_type: SQLDbType, pool: Optional[SQLConnectionPool] = None):
+        """
+        :param db_type: type of the db.
+        :param pool: connection pool shared with the other dbs, the db opens its own if None.
+        """
         self.__db_type: SQLDbType = db_type
         self.__db_name: str = self.__get_db_name()
         self.__table_name: str = self.table_name
@@ -66,11 +72,19 @@ class SQLDb:
         self.__host: str = self.__get_host()
         self.__local_dir: Path = self.__get_local_dir()
         self.__last_updated: datetime.datetime = datetime.datetime.min
+        self.__pool: SQLConnectionPool = pool if pool is not None else \
+            SQLConnectionPool(host=self.__host, database=self.__db_name, user=self.__user, password=self.__password)
+        # queries declared by the table, by name.
+        self.__statements: Dict[str, str] = {}
 
     @property
     def last_updated(self):
         return self.__last_updated
 
+    @property
+    def pool(self) -> SQLConnectionPool:
+        return self.__pool
+
     @property
     def table_name(self) -> str:
         if self.__db_type == SQLDbType.WINDOW:
@@ -111,49 +125,96 @@ class SQLDb:
         elif self.__db_type == SQLDbType.TRADES:
             return local_dir / 'data/trades.json'
 
+    def register_statement(self, name: str, query: str):
+        """
+        Declares a query of the table once, so it runs as a server-side prepared statement that each pooled connection
+        prepares on first use and then reuses.  Values are bound to %s placeholders, never formatted into the query. \n
+        :param name: name the query is run by.
+        :param query: the query.
+        """
+        self.__statements[name] = query
+
+    def statement(self, name: str) -> str:
+        """
+        Returns a registered query. \n
+        :param name: name of the query.
+        :return: query.
+        """
+        return self.__statements[name]
+
+    def run_statement(self, name: str, params: Optional[Sequence] = ()) -> Tuple[any, any]:
+        """
+        Runs a registered query and returns the response and column_names as a tuple. \n
+        :param name: name of the query.
+        :param params: values bound to the query's placeholders.
+        """
+        return self.__run_query(self.__statements[name], params, prepared=True)
+
+    def run_statement_no_response(self, name: str, params: Optional[Sequence] = ()) -> SQLQueryResponseType:
+        """
+        Runs a registered query that changes the table and commits it. \n
+        :param name: name of the query.
+        :param params: values bound to the query's placeholders.
+        :return: whether the query was successful.
+        """
+        return self.__run_query_no_response(self.__statements[name], params, prepared=True)
+
     def run_sql_query(self, query: str, expect_output: Optional[bool] = True, params: Optional = None) -> Tuple[any,
                                                                                                                 any]:
         """
         Runs a specified query on the db and returns the response and column_names as a tuple
         """
+        return self.__run_query(query, params, prepared=False)
+
+    def run_sql_query_no_response(self, query, params) -> SQLQueryResponseType:
+        """
+        Runs a specified query on the db and returns the response and column_names as a tuple
+        """
+        return self.__run_query_no_response(query, params, prepared=False)
+
+    def __cursor(self, db_connection, query: str, prepared: bool):
+        return self.__pool.prepared_cursor(db_connection, query) if prepared else db_connection.cursor()
+
+    def __run_query(self, query: str, params: Optional[Sequence], prepared: bool) -> Tuple[any, any]:
         # TODO - this should be a little more bulletproof
-        # default params and setup types
-        db_connection = mysql.connect(host=self.__host, database=self.__db_name, user=self.__user,
-                                      password=self.__password)
-        cursor = db_connection.cursor()
         try:
-            cursor.execute(query)
-            response = cursor.fetchall()
-
-            if cursor.description is not None:
-                column_names = [i[0] for i in cursor.description]
-            else:
-                column_names = None
-            cursor.close()
-            return response, column_names
+            with self.__pool.connection() as db_connection:
+                cursor = self.__cursor(db_connection, query, prepared)
+                try:
+                    cursor.execute(query, params)
+                    response = cursor.fetchall()
+                    if cursor.description is not None:
+                        column_names = [i[0] for i in cursor.description]
+                    else:
+                        column_names = None
+                finally:
+                    if not prepared:
+                        cursor.close()
+                # ends the read's transaction, or the pooled connection would keep reading from its old snapshot.
+                db_connection.commit()
+                return response, column_names
         except Exception as e:
             print(f"sqlDb.runQuery failed. query: {query}, exception: {e}")
             return None, None
 
-    def run_sql_query_no_response(self, query, params) -> SQLQueryResponseType:
-        """
-        Runs a specified query on the db and returns the response and column_names as a tuple
-        """
+    def __run_query_no_response(self, query: str, params: Optional[Sequence], prepared: bool) -> SQLQueryResponseType:
         # TODO - this should be a little more bulletproof
-        # default params and setup types
-        db_connection = mysql.connect(host=self.__host, database=self.__db_name, user=self.__user,
-                                      password=self.__password)
-        cursor = db_connection.cursor()
         try:
-            cursor.execute(query, params)
-            db_connection.commit()
-            return SQLQueryResponseType.SUCCESSFUL
+            with self.__pool.connection() as db_connection:
+                cursor = self.__cursor(db_connection, query, prepared)
+                try:
+                    cursor.execute(query, params)
+                    db_connection.commit()
+                    return SQLQueryResponseType.SUCCESSFUL
+                except Exception:
+                    db_connection.rollback()
+                    raise
+                finally:
+                    if not prepared:
+                        cursor.close()
         except Exception as e:
             print(f"sqlDb.runQuery failed. query: {query}, exception: {e}")
-            db_connection.rollback()
             return SQLQueryResponseType.UNSUCCESSFUL
-        finally:
-            db_connection.close()
 
     def update_local_store(self, sql_query: str):
         """
@@ -184,3 +245,6 @@ class SQLDb:
             self.update_local_store(sql_query)
 
         self.__last_updated = datetime.datetime.now()
+        # let anything indexing the local stores know that they need to be reloaded.
+        dispatcher.send(response_type=common.ResponseType.UPDATE, db_type=self.__db_type, local_dir=self.__local_dir,
+                        signal=common.Signal.SQL_MANAGER.value, sender=common.Sender.SQL_MANAGER.value)
@@ -1,42 +1,50 @@
 from datetime import datetime
-from typing import Tuple, List
+from typing import List, Optional, Tuple
 
 from pytrader import common, config
 from pytrader.sql import sqlDb
+from pytrader.sql.sqlConnectionPool import SQLConnectionPool
 
 Log: common.Log = common.Log(__file__)
 
 
 class SQLDbBuySellThresholds(sqlDb.SQLDb):
 
-    def __init__(self):
-        super().__init__(sqlDb.SQLDbType.BUY_SELL_THRESHOLDS)
+    def __init__(self, pool: Optional[SQLConnectionPool] = None):
+        super().__init__(sqlDb.SQLDbType.BUY_SELL_THRESHOLDS, pool)
         self.__column_name: str = config.SQL_SERVER_BUY_SELL_THRESHOLDS_COLUMN_NAME
         self.__column_buy: str = config.SQL_SERVER_BUY_SELL_THRESHOLDS_COLUMN_BUY
         self.__column_sell: str = config.SQL_SERVER_BUY_SELL_THRESHOLDS_COLUMN_SELL
         self.__column_last_updated: str = config.SQL_SERVER_BUY_SELL_THRESHOLDS_COLUMN_LAST_UPDATED
+        self.register_statement("get_threshold", f"SELECT buy, sell FROM {self.table_name} WHERE name = %s;")
+        self.register_statement("create_threshold", f"INSERT INTO {self.table_name} (`name`, `buy`, `sell`, "
+                                                    f"`last_updated`) VALUES (%s, '1.0','-1.0',%s);")
+        self.register_statement("get_thresholds", f"SELECT name, buy, sell, last_updated "
+                                                  f"FROM {self.table_name} WHERE name LIKE '%';")
+        self.register_statement("get_thresholds_updated_since", f"SELECT name, buy, sell, last_updated "
+                                                                f"FROM {self.table_name} WHERE last_updated >= %s;")
 
-    def get_threshold(self, asset: common.Asset) -> Tuple[float, float]:
+    def get_threshold(self, asset: common.Asset) -> Optional[Tuple[float, float]]:
         """
-        Gets the thresholds for the specific asset, returns default values if it doesn't exist.  To be fair this should
-        be a massive red flag and require some recalculations...
+        Gets the thresholds for the specific asset, creating an entry with the default values if it doesn't exist.  To
+        be fair this should be a massive red flag and require some recalculations...
         :param asset: The asset we are trying to inspect for.
-        :return: buy and sell thresholds, defaults to default values if cannot find them.
+        :return: buy and sell thresholds, None if they can't be read or created.
         """
         # TODO - what if it doesnt exist?  Should we queue it??
-        rows, headers = self.run_sql_query(f"SELECT buy, sell FROM {self.table_name} WHERE name = '{asset.name}';")
-        if len(rows) == 1:
+        rows, headers = self.run_statement("get_threshold", (asset.name,))
+        if rows is not None and len(rows) == 1:
             return rows[0][0], rows[0][1]
         else:
             Log.d(f"tradingManager.determineBuySellThresholdValues - no db entry for {asset.name}. creating now...")
-            query = f"INSERT INTO {self.table_name} (`name`, `buy`, `sell`, `last_updated`) VALUES (%s, '1.0','-1.0',%s);"
             params = [asset.name, datetime.now().__str__()]
-            success: sqlDb.SQLQueryResponseType = self.run_sql_query_no_response(query, params)
-            if success:
-                rows, headers = self.run_sql_query(
-                    f"SELECT buy, sell FROM {self.table_name} WHERE name = '{asset.name}';")
-                return rows[0][0], rows[0][1]
+            success: sqlDb.SQLQueryResponseType = self.run_statement_no_response("create_threshold", params)
+            if success == sqlDb.SQLQueryResponseType.SUCCESSFUL:
+                rows, headers = self.run_statement("get_threshold", (asset.name,))
+                if rows is not None and len(rows) > 0:
+                    return rows[0][0], rows[0][1]
             Log.w(f"determineBuySellThresholdValues - couldn't create new entry for {asset.name}.")
+            return None
 
     def get_thresholds(self) -> List:
         """
@@ -44,6 +52,14 @@ class SQLDbBuySellThresholds(sqlDb.SQLDb):
         :return: buy and sell thresholds, defaults to default values if cannot find them.
         """
         # TODO - what if it doesnt exist?  Should we queue it??
-        rows, headers = self.run_sql_query(f"SELECT name, buy, sell, last_updated "
-                                           f"FROM {self.table_name} WHERE name LIKE '%';")
+        rows, headers = self.run_statement("get_thresholds")
+        return rows if rows is not None else []
+
+    def get_thresholds_updated_since(self, last_updated) -> List:
+        """
+        Gets the thresholds of the assets updated at or after the given time.
+        :param last_updated: last_updated value of the newest row already read.
+        :return: rows of name, buy, sell and last_updated.
+        """
+        rows, headers = self.run_statement("get_thresholds_updated_since", (last_updated,))
         return rows if rows is not None else []
@@ -1,9 +1,9 @@
 import datetime
-import random
-from typing import Optional
+from typing import List, Optional
 
 from pytrader import common, config
 from pytrader.sql import sqlDb
+from pytrader.sql.sqlConnectionPool import SQLConnectionPool
 
 
 class SQLDbOpenTrades(sqlDb.SQLDb):
@@ -11,8 +11,8 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
     the sql db class that relates to the Trades db.
     """
 
-    def __init__(self):
-        super().__init__(sqlDb.SQLDbType.OPEN_TRADES)
+    def __init__(self, pool: Optional[SQLConnectionPool] = None):
+        super().__init__(sqlDb.SQLDbType.OPEN_TRADES, pool)
         self.__column_name: str = config.SQL_SERVER_OPEN_TRADES_COLUMN_NAME
         self.__column_asset_type: str = config.SQL_SERVER_OPEN_TRADES_COLUMN_ASSET_TYPE
         self.__column_order_type: str = config.SQL_SERVER_OPEN_TRADES_COLUMN_ORDER_TYPE
@@ -20,6 +20,29 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
         self.__column_quantity: str = config.SQL_SERVER_OPEN_TRADES_COLUMN_QUANTITY
         self.__column_order_id: str = config.SQL_SERVER_OPEN_TRADES_COLUMN_ORDER_ID
         self.__column_timestamp: str = config.SQL_SERVER_OPEN_TRADES_COLUMN_LAST_UPDATED
+        self.__register_statements()
+
+    def __register_statements(self):
+        table = super().table_name
+        self.register_statement("get_trade_by_order_id",
+                                f"SELECT * FROM `{table}` WHERE {self.__column_order_id} = %s")
+        self.register_statement("get_trade_by_timestamp",
+                                f"SELECT * FROM `{table}` WHERE {self.__column_timestamp} = %s")
+        self.register_statement("get_all_trades", f"SELECT * FROM `{table}` WHERE 1")
+        self.register_statement("get_trades_by_order_type",
+                                f"SELECT * FROM `{table}` WHERE {self.__column_order_type} = %s")
+        self.register_statement("commit_trade",
+                                f"INSERT INTO `{table}` ({self.__column_name}, {self.__column_asset_type}, "
+                                f"{self.__column_trade_intent}, {self.__column_order_type}, {self.__column_quantity}, "
+                                f"{self.__column_order_id}, {self.__column_timestamp}) "
+                                f"VALUES (%s, %s, %s, %s, %s, %s, %s);")
+        self.register_statement("delete_trade", f"DELETE FROM `{table}` WHERE {self.__column_order_id} = %s;")
+        self.register_statement("update_trade", f"UPDATE `{table}` SET {self.__column_quantity} = %s, "
+                                                f"{self.__column_timestamp} = %s WHERE {self.__column_order_id} = %s;")
+        # cast, so ids of different lengths compare as numbers whatever the column type.
+        self.register_statement("get_max_order_ids",
+                                f"SELECT MAX(CAST({self.__column_order_id} AS UNSIGNED)) FROM `{table}` "
+                                f"GROUP BY {self.__column_order_type}")
 
     @property
     def column_order_id(self):
@@ -43,9 +66,8 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
         gets a specific trade from the sql server by the order id. \n
         :param order_id: the id of the trade.
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE {self.__column_order_id} = {order_id}"
-        rows, columns = self.run_sql_query(query)
-        if len(rows) == 0:
+        rows, columns = self.run_statement("get_trade_by_order_id", (order_id.__str__(),))
+        if rows is None or len(rows) == 0:
             return None
         return self.__create_dao(rows[0])
 
@@ -54,16 +76,14 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
         gets a specific trade from the sql server by the timestamp. if multiple exist, will return first instance. \n
         :param timestamp: the datetime of the trade.
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE {self.__column_timestamp} = {timestamp}"
-        rows, columns = self.run_sql_query(query)
+        rows, columns = self.run_statement("get_trade_by_timestamp", (timestamp.__str__(),))
         return self.__create_dao(rows[0])
 
     def get_all_trades(self) -> [sqlDb.daos.SQLDbOpenTradesDao]:
         """
         gets all trades from the sql server.
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE 1"
-        rows, columns = self.run_sql_query(query)
+        rows, columns = self.run_statement("get_all_trades")
         trade_list: list = []
         if rows is None or columns is None:
             return trade_list
@@ -79,9 +99,7 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
         """
         gets all buy trades from the sql server.
         """
-        query = f"SELECT * FROM `{super().table_name}` " \
-                f"WHERE {self.__column_order_type} = '{common.OrderType.BUY.name}' "
-        rows, columns = self.run_sql_query(query)
+        rows, columns = self.run_statement("get_trades_by_order_type", (common.OrderType.BUY.name,))
         trade_list: list = []
         if rows is None or columns is None:
             return trade_list
@@ -97,9 +115,7 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
         """
         gets all sell trades from the sql server.
         """
-        query = f"SELECT * FROM `{super().table_name}` " \
-                f"WHERE {self.column_order_type} = '{common.OrderType.SELL.name}';"
-        rows, columns = self.run_sql_query(query)
+        rows, columns = self.run_statement("get_trades_by_order_type", (common.OrderType.SELL.name,))
         trade_list: list = []
         if rows is None or columns is None:
             return trade_list
@@ -117,13 +133,16 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
         :param order: trade object being sent to db
         :return: whether the commit was successful or not
         """
-        query = f"INSERT INTO `{super().table_name}` ({self.__column_name}, {self.__column_asset_type}, " \
-                f"{self.__column_trade_intent}, {self.__column_order_type}, {self.__column_quantity}, " \
-                f"{self.__column_order_id}, {self.__column_timestamp}) VALUES (%s, %s, %s, %s, %s, %s, %s);"
-        params = (order.asset.name,
-                  order.asset.type.name.__str__(), order.asset.trade_intent.name.__str__(), order.type.name.__str__(),
-                  order.asset.qty.__str__(), order.asset.id.__str__(), order.asset.last_updated.__str__())
-        return self.run_sql_query_no_response(query, params)
+        return self.run_statement_no_response("commit_trade", self.commit_trade_params(order))
+
+    @staticmethod
+    def commit_trade_params(order: common.Order) -> tuple:
+        """
+        values of the commit_trade statement for the order.
+        """
+        return (order.asset.name,
+                order.asset.type.name.__str__(), order.asset.trade_intent.name.__str__(), order.type.name.__str__(),
+                order.asset.qty.__str__(), order.asset.id.__str__(), order.asset.last_updated.__str__())
 
     def delete_trade(self, order: common.Order) -> sqlDb.SQLQueryResponseType:
         """
@@ -132,9 +151,14 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
         :param order: order to be deleted
         :return: whether the deletion was successful
         """
-        query = f"DELETE FROM {super().table_name} WHERE {self.column_order_id} = %s;"
-        params = [order.asset.id]
-        return self.run_sql_query_no_response(query, params)
+        return self.run_statement_no_response("delete_trade", self.delete_trade_params(order))
+
+    @staticmethod
+    def delete_trade_params(order: common.Order) -> tuple:
+        """
+        values of the delete_trade statement for the order.
+        """
+        return (order.asset.id.__str__(),)
 
     def update_trade(self, order: common.Order) -> sqlDb.SQLQueryResponseType:
         """
@@ -142,12 +166,14 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
         :param order: order to update
         :return: response from sql query.
         """
-        query = f"UPDATE `{super().table_name}` " \
-                f"SET {self.__column_quantity} = %s, {self.__column_timestamp} = %s " \
-                f"WHERE {self.__column_order_id} = %s;"
-        params = (order.asset.qty.__str__(), order.asset.last_updated.__str__(), order.asset.id.__str__())
+        return self.run_statement_no_response("update_trade", self.update_trade_params(order))
 
-        return self.run_sql_query_no_response(query, params)
+    @staticmethod
+    def update_trade_params(order: common.Order) -> tuple:
+        """
+        values of the update_trade statement for the order.
+        """
+        return order.asset.qty.__str__(), order.asset.last_updated.__str__(), order.asset.id.__str__()
 
     def is_order_id_unique(self, order_id: int) -> bool:
         """
@@ -155,8 +181,7 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
         :param order_id: id of the order
         :return: whether the order id exist in db
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE {self.__column_order_id} = {order_id}"
-        rows, columns = self.run_sql_query(query)
+        rows, columns = self.run_statement("get_trade_by_order_id", (order_id.__str__(),))
         if rows is None and columns is not None:
             return True
         elif len(rows) == 0:
@@ -164,15 +189,12 @@ class SQLDbOpenTrades(sqlDb.SQLDb):
         else:
             return False
 
-    def generate_new_asset_id(self, order: common.Order) -> int:
+    def get_max_order_ids(self) -> List[int]:
         """
-        Generates a new unique ID for use within the table. \n
-        :param order: the order, used to generate a prefix based on trade type.
-        :return: id.
+        gets the largest order id of each order type, used to recover the order id generator after a restart. \n
+        :return: largest order ids, empty if there are no trades.
         """
-        pref: str = "1" if order.type == common.OrderType.BUY else "2"
-        new_id: int = int(pref + str(random.randrange(100000)))
-        if self.is_order_id_unique(new_id):
-            return new_id
-        else:
-            return self.generate_new_asset_id(order)
+        rows, columns = self.run_statement("get_max_order_ids")
+        if rows is None:
+            return []
+        return [int(row[0]) for row in rows if row[0] is not None]
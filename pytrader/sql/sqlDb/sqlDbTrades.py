@@ -1,6 +1,7 @@
 import datetime
-from typing import Optional
+from typing import List, Optional
 
+from pytrader.sql.sqlConnectionPool import SQLConnectionPool
 from pytrader.sql.sqlDb.daos.sqlDbTradesDao import SQLDbTradesDao
 from pytrader.sql.sqlDb.sqlDb import SQLDb, SQLDbType, SQLQueryResponseType
 from pytrader.common.order import Order, OrderType
@@ -15,14 +16,34 @@ class SQLDbTrades(SQLDb):
     the sql db class that relates to the Trades db.
     """
 
-    def __init__(self):
-        super().__init__(SQLDbType.TRADES)
+    def __init__(self, pool: Optional[SQLConnectionPool] = None):
+        super().__init__(SQLDbType.TRADES, pool)
         self.__column_name: str = SQL_SERVER_TRADES_TABLE_COLUMN_NAME
         self.__column_order_type: str = SQL_SERVER_TRADES_TABLE_COLUMN_ORDER_TYPE
         self.__column_quantity: str = SQL_SERVER_TRADES_TABLE_COLUMN_QUANTITY
         self.__column_order_id: str = SQL_SERVER_TRADES_TABLE_COLUMN_ORDER_ID
         self.__column_timestamp: str = SQL_SERVER_TRADES_TABLE_COLUMN_TIMESTAMP
         self.__column_exchange: str = SQL_SERVER_TRADES_TABLE_COLUMN_ASSET_TYPE
+        self.__register_statements()
+
+    def __register_statements(self):
+        table = super().table_name
+        self.register_statement("get_trade_by_order_id",
+                                f"SELECT * FROM `{table}` WHERE {self.__column_order_id} = %s")
+        self.register_statement("get_trade_by_timestamp",
+                                f"SELECT * FROM `{table}` WHERE {self.__column_timestamp} = %s")
+        self.register_statement("get_all_trades", f"SELECT * FROM `{table}` WHERE 1")
+        self.register_statement("get_trades_by_order_type",
+                                f"SELECT * FROM `{table}` WHERE {self.__column_order_type} = %s")
+        self.register_statement("commit_trade",
+                                f"INSERT INTO `{table}` ({self.__column_name}, {self.__column_order_type}, "
+                                f"{self.__column_quantity}, {self.__column_order_id}, {self.__column_timestamp}, "
+                                f"{self.__column_exchange}) VALUES (%s, %s, %s, %s, %s, %s);")
+        self.register_statement("delete_trade", f"DELETE FROM `{table}` WHERE {self.__column_order_id} = %s;")
+        # cast, so ids of different lengths compare as numbers whatever the column type.
+        self.register_statement("get_max_order_ids",
+                                f"SELECT MAX(CAST({self.__column_order_id} AS UNSIGNED)) FROM `{table}` "
+                                f"GROUP BY {self.__column_order_type}")
 
     @property
     def column_order_id(self):
@@ -46,9 +67,8 @@ class SQLDbTrades(SQLDb):
         gets a specific trade from the sql server by the order id. \n
         :param order_id: the id of the trade.
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE {self.__column_order_id} = {order_id}"
-        rows, columns = self.run_sql_query(query)
-        if len(rows) == 0:
+        rows, columns = self.run_statement("get_trade_by_order_id", (order_id.__str__(),))
+        if rows is None or len(rows) == 0:
             return None
         return self.__create_dao(rows[0])
 
@@ -57,16 +77,14 @@ class SQLDbTrades(SQLDb):
         gets a specific trade from the sql server by the timestamp. if multiple exist, will return first instance. \n
         :param timestamp: the datetime of the trade.
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE {self.__column_timestamp} = {timestamp}"
-        rows, columns = self.run_sql_query(query)
+        rows, columns = self.run_statement("get_trade_by_timestamp", (timestamp.__str__(),))
         return self.__create_dao(rows[0])
 
     def get_all_trades(self) -> [SQLDbTradesDao]:
         """
         gets all trades from the sql server.
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE 1"
-        rows, columns = self.run_sql_query(query)
+        rows, columns = self.run_statement("get_all_trades")
         trade_list: list = []
         if rows is None or columns is None:
             return trade_list
@@ -82,8 +100,7 @@ class SQLDbTrades(SQLDb):
         """
         gets all buy trades from the sql server.
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE {self.__column_order_type} = '{OrderType.BUY.name}'"
-        rows, columns = self.run_sql_query(query)
+        rows, columns = self.run_statement("get_trades_by_order_type", (OrderType.BUY.name,))
         trade_list: list = []
         if rows is None or columns is None:
             return trade_list
@@ -99,8 +116,7 @@ class SQLDbTrades(SQLDb):
         """
         gets all sell trades from the sql server.
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE {self.column_order_type} = '{OrderType.SELL.name}';"
-        rows, columns = self.run_sql_query(query)
+        rows, columns = self.run_statement("get_trades_by_order_type", (OrderType.SELL.name,))
         trade_list: list = []
         if rows is None or columns is None:
             return trade_list
@@ -118,13 +134,16 @@ class SQLDbTrades(SQLDb):
         :param order: trade object being sent to db
         :return: whether the commit was successful or not
         """
-        query = f"INSERT INTO `{super().table_name}` ({self.__column_name}, {self.__column_order_type}, " \
-                f"{self.__column_quantity}, {self.__column_order_id}, {self.__column_timestamp}, {self.__column_exchange}) " \
-                f"VALUES (%s, %s, %s, %s, %s, %s);"
-        params = (order.asset.name.__str__(),
-                  order.type.name.__str__(), order.asset.qty.__str__(), order.asset.id.__str__(),
-                  order.asset.last_updated.__str__(), order.asset.type.name.__str__())
-        return self.run_sql_query_no_response(query, params)
+        return self.run_statement_no_response("commit_trade", self.commit_trade_params(order))
+
+    @staticmethod
+    def commit_trade_params(order: Order) -> tuple:
+        """
+        values of the commit_trade statement for the order.
+        """
+        return (order.asset.name.__str__(),
+                order.type.name.__str__(), order.asset.qty.__str__(), order.asset.id.__str__(),
+                order.asset.last_updated.__str__(), order.asset.type.name.__str__())
 
     def delete_trade(self, order: Order) -> SQLQueryResponseType:
         """
@@ -133,9 +152,7 @@ class SQLDbTrades(SQLDb):
         :param order: trade to be deleted
         :return: whether the deletion was successful
         """
-        query = f"DELETE FROM {super().table_name} WHERE {self.column_order_id} = %s;"
-        params = [order.asset.id.__str__()]
-        return self.run_sql_query_no_response(query, params)
+        return self.run_statement_no_response("delete_trade", (order.asset.id.__str__(),))
 
     def is_order_id_unique(self, order_id: int) -> bool:
         """
@@ -143,11 +160,20 @@ class SQLDbTrades(SQLDb):
         :param order_id: id of the order
         :return: whether the order id exist in db
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE {self.__column_order_id} = {order_id}"
-        rows, columns = self.run_sql_query(query)
+        rows, columns = self.run_statement("get_trade_by_order_id", (order_id.__str__(),))
         if rows is None and columns is not None:
             return True
         elif len(rows) == 0:
             return True
         else:
             return False
+
+    def get_max_order_ids(self) -> List[int]:
+        """
+        gets the largest order id of each order type, used to recover the order id generator after a restart. \n
+        :return: largest order ids, empty if there are no trades.
+        """
+        rows, columns = self.run_statement("get_max_order_ids")
+        if rows is None:
+            return []
+        return [int(row[0]) for row in rows if row[0] is not None]
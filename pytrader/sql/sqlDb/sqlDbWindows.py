@@ -1,13 +1,14 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pytrader import common
 from pytrader import config
 from pytrader.sql import sqlDb
+from pytrader.sql.sqlConnectionPool import SQLConnectionPool
 
 
 class SQLDbWindows(sqlDb.SQLDb):
-    def __init__(self):
-        super().__init__(sqlDb.SQLDbType.WINDOW)
+    def __init__(self, pool: Optional[SQLConnectionPool] = None):
+        super().__init__(sqlDb.SQLDbType.WINDOW, pool)
         self.__column_name: str = config.SQL_SERVER_WINDOWS_COLUMN_NAME
         self.__column_sma_short_trade: str = config.SQL_SERVER_WINDOWS_COLUMN_SMA_SHORT_TRADE
         self.__column_sma_long_trade: str = config.SQL_SERVER_WINDOWS_COLUMN_SMA_LONG_TRADE
@@ -33,6 +34,9 @@ class SQLDbWindows(sqlDb.SQLDb):
         self.__column_bolb_short_trade: str = config.SQL_SERVER_WINDOWS_COLUMN_BOLB_SHORT_TRADE
         self.__column_bolb_long_trade: str = config.SQL_SERVER_WINDOWS_COLUMN_BOLB_LONG_TRADE
         self.__column_bolb_long_hold: str = config.SQL_SERVER_WINDOWS_COLUMN_BOLB_LONG_HOLD
+        self.register_statement("get_window", f"SELECT * FROM `{self.table_name}` WHERE {self.__column_name} = %s")
+        self.register_statement("get_windows",
+                                f"SELECT * FROM `{self.table_name}` WHERE {self.__column_name} LIKE '%';")
 
     @staticmethod
     def __create_dao(row: List) -> sqlDb.daos.SQLDbWindowsDao:
@@ -52,9 +56,8 @@ class SQLDbWindows(sqlDb.SQLDb):
         :param asset: specified asset that we want data for.
         :return: dao object with all relevant data, or None if doesn't exist.
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE {self.__column_name} = {asset.name}"
-        rows, columns = self.run_sql_query(query)
-        if len(rows) == 0:
+        rows, columns = self.run_statement("get_window", (asset.name,))
+        if rows is None or len(rows) == 0:
             return None
         return self.__create_dao(rows[0])
 
@@ -63,11 +66,27 @@ class SQLDbWindows(sqlDb.SQLDb):
         retrieves all window data for all saved assets.
         :return: list of all data as ROWS.
         """
-        query = f"SELECT * FROM `{super().table_name}` WHERE {self.__column_name} LIKE '%';"
-        rows, columns = self.run_sql_query(query)
-        if len(rows) == 0:
+        rows, columns = self.run_statement("get_windows")
+        if rows is None or len(rows) == 0:
             return []
         windows: List = []
         for row in rows:
             windows.append(self.__create_dao(row))
         return windows
+
+    def update_window(self, asset: common.Asset, windows: Dict[str, int]) -> sqlDb.SQLQueryResponseType:
+        """
+        updates the windows of the asset, creating its row if it doesn't exist. \n
+        :param asset: asset the windows are for.
+        :param windows: dict of column name to window, e.g. {"sma_short_trade": 7}.
+        :return: whether the query was successful.
+        """
+        columns = list(windows.keys())
+        params = [int(windows[column]) for column in columns] + [asset.name]
+        if self.get_window(asset) is not None:
+            assignments = ", ".join(f"`{column}` = %s" for column in columns)
+            query = f"UPDATE `{super().table_name}` SET {assignments} WHERE `{self.__column_name}` = %s;"
+        else:
+            names = ", ".join(f"`{column}`" for column in columns + [self.__column_name])
+            query = f"INSERT INTO `{super().table_name}` ({names}) VALUES ({', '.join(['%s'] * len(params))});"
+        return self.run_sql_query_no_response(query, params)
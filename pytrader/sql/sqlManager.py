@@ -1,8 +1,12 @@
 import datetime
 from typing import Optional, Tuple
 
+import pytrader.cfg as cfg
 import pytrader.sql.sqlDb as sqlDb
-from pytrader import common
+from pytrader import common, config
+from pytrader.sql.sqlConnectionPool import SQLConnectionPool
+from pytrader.sql.sqlThresholdCache import SQLThresholdCache
+from pytrader.sql.sqlTradeWriter import SQLTradeWriter
 
 
 class SQLManager:
@@ -10,12 +14,21 @@ class SQLManager:
     Holds all sql databases and makes querying easier.
     """
 
-    def __init__(self):
+    def __init__(self, pool_size: Optional[int] = config.USER_SQL_POOL_SIZE):
+        """
+        :param pool_size: maximum number of connections shared by the dbs.
+        """
         self.__last_updated: datetime.datetime = datetime.datetime.min
-        self.__windowDb: sqlDb.sqlDbWindows = sqlDb.SQLDbWindows()
-        self.__buySellThresholdDb: sqlDb.sqlDbBuySellThresholds = sqlDb.sqlDbBuySellThresholds.SQLDbBuySellThresholds()
-        self.__tradesDb: sqlDb.sqlDbTrades = sqlDb.sqlDbTrades.SQLDbTrades()
-        self.__openTradesDb: sqlDb.sqlDbOpenTrades = sqlDb.sqlDbOpenTrades.SQLDbOpenTrades()
+        self.__pool: SQLConnectionPool = SQLConnectionPool(host=cfg.SQL_SERVER_HOST, database=cfg.SQL_SERVER_DATABASE,
+                                                           user=cfg.SQL_SERVER_USER, password=cfg.SQL_SERVER_PASSWORD,
+                                                           size=pool_size)
+        self.__windowDb: sqlDb.sqlDbWindows = sqlDb.SQLDbWindows(self.__pool)
+        self.__buySellThresholdDb: sqlDb.sqlDbBuySellThresholds = \
+            sqlDb.sqlDbBuySellThresholds.SQLDbBuySellThresholds(self.__pool)
+        self.__tradesDb: sqlDb.sqlDbTrades = sqlDb.sqlDbTrades.SQLDbTrades(self.__pool)
+        self.__openTradesDb: sqlDb.sqlDbOpenTrades = sqlDb.sqlDbOpenTrades.SQLDbOpenTrades(self.__pool)
+        self.__thresholdCache: SQLThresholdCache = SQLThresholdCache(self.__buySellThresholdDb)
+        self.__tradeWriter: SQLTradeWriter = SQLTradeWriter(self.__openTradesDb, self.__tradesDb)
 
     @property
     def window_db(self):
@@ -25,6 +38,10 @@ class SQLManager:
     def buy_sell_threshold_db(self):
         return self.__buySellThresholdDb
 
+    @property
+    def threshold_cache(self):
+        return self.__thresholdCache
+
     @property
     def trades_db(self):
         return self.__tradesDb
@@ -33,10 +50,25 @@ class SQLManager:
     def open_trades_db(self):
         return self.__openTradesDb
 
+    @property
+    def trade_writer(self):
+        return self.__tradeWriter
+
     @property
     def last_updated(self):
         return self.__last_updated
 
+    @property
+    def pool(self) -> SQLConnectionPool:
+        return self.__pool
+
+    def close(self):
+        """
+        Writes the queued trades and closes the connections of every db.
+        """
+        self.__tradeWriter.close()
+        self.__pool.close()
+
     def update_local_stores(self):
         """
         Updates local stored sql data to be used for reference later
@@ -0,0 +1,127 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from pytrader import common, config
+from pytrader.sql import sqlDb
+
+Log = common.Log(__file__)
+
+# thresholds used for an asset that has no entry and one couldn't be created, the same as a new entry's.
+DEFAULT_THRESHOLDS: Tuple[float, float] = (1.0, -1.0)
+
+
+class SQLThresholdCache:
+    """
+    Read-through cache of the buy/sell thresholds table.  It is warmed with every row at startup, and once entries pass
+    their time to live they are refreshed in bulk with the rows whose last_updated has moved on since the newest one
+    seen, which confirms the rest are still current.  An asset without a row is created through the table once, and if
+    that fails its default thresholds are cached for the negative time to live rather than retried on every request.
+    """
+
+    def __init__(self, thresholds_db: sqlDb.SQLDbBuySellThresholds,
+                 ttl: Optional[float] = config.USER_THRESHOLD_CACHE_TTL,
+                 negative_ttl: Optional[float] = config.USER_THRESHOLD_CACHE_NEGATIVE_TTL):
+        """
+        :param thresholds_db: the thresholds table.
+        :param ttl: seconds an entry is used for before the table is checked for changes.
+        :param negative_ttl: seconds an asset without an entry is given the default thresholds before retrying.
+        """
+        self.__thresholds_db: sqlDb.SQLDbBuySellThresholds = thresholds_db
+        self.__ttl: float = ttl
+        self.__negative_ttl: float = negative_ttl
+        # thresholds and expiry time by asset name.
+        self.__entries: Dict[str, Tuple[Tuple[float, float], float]] = {}
+        self.__negative: Dict[str, float] = {}
+        # newest last_updated seen, the next refresh reads the rows updated from then on.
+        self.__last_updated: Any = None
+        self.__warmed: bool = False
+        self.__lock: threading.RLock = threading.RLock()
+        self.__hits: int = 0
+        self.__misses: int = 0
+        self.__refreshes: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def refreshes(self) -> int:
+        return self.__refreshes
+
+    def warm(self):
+        """
+        Loads every row of the table, replacing the cached entries.
+        """
+        with self.__lock:
+            self.__entries, self.__negative, self.__last_updated = {}, {}, None
+            self.__load(self.__thresholds_db.get_thresholds())
+            self.__warmed = True
+            Log.i(f"threshold cache warmed with {len(self.__entries)} assets.")
+
+    def refresh(self):
+        """
+        Reloads the rows updated since the newest row seen, and extends every entry's time to live.
+        """
+        with self.__lock:
+            if not self.__warmed or self.__last_updated is None:
+                self.warm()
+                return
+            self.__refreshes += 1
+            expires = time.monotonic() + self.__ttl
+            self.__entries = {name: (thresholds, expires) for name, (thresholds, _) in self.__entries.items()}
+            self.__load(self.__thresholds_db.get_thresholds_updated_since(self.__last_updated))
+
+    def invalidate(self, name: Optional[str] = None):
+        """
+        Drops the entry for an asset, or every entry, so it is read from the table on the next request. \n
+        :param name: name of asset, every asset if None.
+        """
+        with self.__lock:
+            if name is None:
+                self.__warmed = False
+                self.__entries, self.__negative = {}, {}
+            else:
+                self.__entries.pop(name, None)
+                self.__negative.pop(name, None)
+
+    def get_threshold(self, asset: common.Asset) -> Tuple[float, float]:
+        """
+        Gets the thresholds for the asset from the cache, reading through to the table if they aren't cached. \n
+        :param asset: The asset we are trying to inspect for.
+        :return: buy and sell thresholds.
+        """
+        with self.__lock:
+            if not self.__warmed:
+                self.warm()
+            now = time.monotonic()
+            entry = self.__entries.get(asset.name)
+            if entry is not None and entry[1] <= now:
+                self.refresh()
+                entry = self.__entries.get(asset.name)
+            if entry is not None:
+                self.__hits += 1
+                return entry[0]
+            if self.__negative.get(asset.name, float("-inf")) > now:
+                self.__hits += 1
+                return DEFAULT_THRESHOLDS
+            self.__misses += 1
+            thresholds = self.__thresholds_db.get_threshold(asset)
+            if thresholds is None:
+                self.__negative[asset.name] = now + self.__negative_ttl
+                return DEFAULT_THRESHOLDS
+            self.__negative.pop(asset.name, None)
+            self.__entries[asset.name] = (thresholds, now + self.__ttl)
+            return thresholds
+
+    def __load(self, rows):
+        expires = time.monotonic() + self.__ttl
+        for name, buy, sell, last_updated in rows:
+            self.__entries[name] = ((buy, sell), expires)
+            self.__negative.pop(name, None)
+            if last_updated is not None and (self.__last_updated is None or last_updated > self.__last_updated):
+                self.__last_updated = last_updated
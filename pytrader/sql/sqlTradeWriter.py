@@ -0,0 +1,233 @@
+import enum
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pytrader import common, config
+from pytrader.sql import sqlDb
+from pytrader.sql.sqlConnectionPool import CONNECTION_ERRORS
+
+Log = common.Log(__file__)
+
+# seconds to wait before retrying a batch that failed to commit.
+RETRY_DELAY: float = 1.0
+
+
+class SQLTradeWrite(enum.Enum):
+    """
+    Writes to the trade tables, in the order a batch applies them.  An order is opened before it can be updated and
+    updated before it is closed, so applying a batch grouped in this order gives the same tables as applying the writes
+    one by one.
+    """
+    OPEN = 0
+    UPDATE = 1
+    CLOSE = 2
+
+
+class SQLTradeWriter:
+    """
+    Write-behind batching of the writes to the open trades and trades tables.  Writes are queued and applied by a
+    background thread once batch_size of them are queued or the oldest has waited max_delay seconds, with one
+    executemany per statement and a single commit, so a batch of inserts is one multi-row INSERT and one transaction.
+    Repeated updates of an order are coalesced to the latest.  Closing a trade inserts it into the trades table and
+    deletes it from the open trades table in the same transaction, so it is never in both or neither.  Both tables must
+    share a connection pool for that.  A batch that fails on a lost connection is retried, while one the server rejects
+    is written again one write at a time, so the bad write is found and dropped rather than holding up the rest.
+    """
+
+    def __init__(self, open_trades_db: sqlDb.SQLDbOpenTrades, trades_db: sqlDb.SQLDbTrades,
+                 batch_size: Optional[int] = config.USER_SQL_BATCH_SIZE,
+                 max_delay: Optional[float] = config.USER_SQL_BATCH_DELAY):
+        """
+        :param open_trades_db: open trades table.
+        :param trades_db: trades table, using the same connection pool as the open trades table.
+        :param batch_size: number of queued writes that are flushed straight away.
+        :param max_delay: most seconds a write is queued for before it is flushed.
+        """
+        if open_trades_db.pool is not trades_db.pool:
+            raise ValueError("SQLTradeWriter: the open trades and trades tables must share a connection pool.")
+        self.__open_trades_db: sqlDb.SQLDbOpenTrades = open_trades_db
+        self.__trades_db: sqlDb.SQLDbTrades = trades_db
+        self.__batch_size: int = batch_size
+        self.__max_delay: float = max_delay
+        # queued writes, and the time the oldest was queued.
+        self.__pending: List[Tuple[SQLTradeWrite, common.Order]] = []
+        self.__oldest: Optional[float] = None
+        self.__retry_at: float = float("-inf")
+        self.__condition: threading.Condition = threading.Condition()
+        # held while a batch is written, so flush returns only once every write queued before it is committed.
+        self.__write_lock: threading.Lock = threading.Lock()
+        self.__thread: Optional[threading.Thread] = None
+        self.__closed: bool = False
+        self.__batches: int = 0
+        self.__writes: int = 0
+        self.__failures: int = 0
+        # writes the server rejected, kept so they can be inspected.
+        self.__dropped: List[Tuple[SQLTradeWrite, common.Order]] = []
+
+    @property
+    def pending(self) -> int:
+        return len(self.__pending)
+
+    @property
+    def dropped(self) -> List[Tuple[SQLTradeWrite, common.Order]]:
+        return list(self.__dropped)
+
+    def open_trade(self, order: common.Order):
+        """
+        Queues the insert of an order into the open trades table. \n
+        :param order: order that has been placed.
+        """
+        self.__queue(SQLTradeWrite.OPEN, order)
+
+    def update_trade(self, order: common.Order):
+        """
+        Queues the update of an order's quantity and last update within the open trades table. \n
+        :param order: order that has changed.
+        """
+        self.__queue(SQLTradeWrite.UPDATE, order)
+
+    def close_trade(self, order: common.Order):
+        """
+        Queues the move of an order from the open trades table to the trades table. \n
+        :param order: order that has filled.
+        """
+        self.__queue(SQLTradeWrite.CLOSE, order)
+
+    def flush(self) -> bool:
+        """
+        Writes every queued write now, e.g. on shutdown. \n
+        :return: whether everything queued was committed, False if any is still queued or was dropped.
+        """
+        with self.__write_lock:
+            with self.__condition:
+                batch, self.__pending, self.__oldest = self.__pending, [], None
+            return self.__write(batch)
+
+    def stats(self) -> dict:
+        """
+        Returns the number of batches and writes committed, batches that failed and writes that were dropped.
+        """
+        return {"batches": self.__batches, "writes": self.__writes, "failures": self.__failures,
+                "dropped": len(self.__dropped), "pending": len(self.__pending)}
+
+    def close(self):
+        """
+        Stops the background thread and flushes the queued writes.
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        if self.__thread is not None:
+            self.__thread.join()
+        self.flush()
+
+    def __queue(self, write: SQLTradeWrite, order: common.Order):
+        with self.__condition:
+            if self.__closed:
+                raise RuntimeError("SQLTradeWriter: the writer is closed.")
+            self.__pending.append((write, order))
+            if self.__oldest is None:
+                self.__oldest = time.monotonic()
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run, name="SQLTradeWriter", daemon=True)
+                self.__thread.start()
+            if len(self.__pending) >= self.__batch_size:
+                self.__condition.notify()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while not self.__closed:
+                    now = time.monotonic()
+                    if self.__pending and now >= self.__retry_at and \
+                            (len(self.__pending) >= self.__batch_size or now - self.__oldest >= self.__max_delay):
+                        break
+                    wait = None
+                    if self.__pending:
+                        wait = max(self.__oldest + self.__max_delay, self.__retry_at) - now
+                    self.__condition.wait(wait)
+                if self.__closed:
+                    return
+            self.flush()
+
+    def __write(self, batch: List[Tuple[SQLTradeWrite, common.Order]]) -> bool:
+        if len(batch) == 0:
+            return True
+        try:
+            self.__commit(batch)
+        except CONNECTION_ERRORS as e:
+            Log.e(f"SQLTradeWriter failed to write {len(batch)} trades, retrying. exception: {e}")
+            self.__failures += 1
+            self.__requeue(batch)
+            return False
+        except Exception as e:
+            Log.e(f"SQLTradeWriter failed to write {len(batch)} trades, writing them one at a time. exception: {e}")
+            self.__failures += 1
+            return self.__isolate(batch)
+        self.__batches += 1
+        self.__writes += len(batch)
+        return True
+
+    def __isolate(self, batch: List[Tuple[SQLTradeWrite, common.Order]]) -> bool:
+        """
+        Writes the batch one write at a time, dropping the writes the server rejects.
+        """
+        dropped = False
+        for i, (write, order) in enumerate(batch):
+            try:
+                self.__commit([(write, order)])
+            except CONNECTION_ERRORS as e:
+                Log.e(f"SQLTradeWriter failed to write {len(batch) - i} trades, retrying. exception: {e}")
+                self.__requeue(batch[i:])
+                return False
+            except Exception as e:
+                Log.e(f"SQLTradeWriter dropped the {write.name} of order {order.asset.id} ({order.asset.name}). "
+                      f"exception: {e}")
+                self.__dropped.append((write, order))
+                dropped = True
+                continue
+            self.__batches += 1
+            self.__writes += 1
+        return not dropped
+
+    def __requeue(self, batch: List[Tuple[SQLTradeWrite, common.Order]]):
+        with self.__condition:
+            # put back in front of anything queued since, so the writes stay in order.
+            self.__pending = batch + self.__pending
+            self.__oldest = time.monotonic() if self.__oldest is None else self.__oldest
+            self.__retry_at = time.monotonic() + RETRY_DELAY
+
+    def __commit(self, batch: List[Tuple[SQLTradeWrite, common.Order]]):
+        """
+        Writes the batch in a single transaction, with an executemany per statement.
+        """
+        opens: List[tuple] = []
+        updates: Dict[int, common.Order] = {}
+        closes: List[common.Order] = []
+        for write, order in batch:
+            if write == SQLTradeWrite.OPEN:
+                opens.append(self.__open_trades_db.commit_trade_params(order))
+            elif write == SQLTradeWrite.UPDATE:
+                updates[order.asset.id] = order
+            else:
+                closes.append(order)
+        statements = [(self.__open_trades_db, "commit_trade", opens),
+                      (self.__open_trades_db, "update_trade",
+                       [self.__open_trades_db.update_trade_params(order) for order in updates.values()]),
+                      (self.__trades_db, "commit_trade",
+                       [self.__trades_db.commit_trade_params(order) for order in closes]),
+                      (self.__open_trades_db, "delete_trade",
+                       [self.__open_trades_db.delete_trade_params(order) for order in closes])]
+        with self.__open_trades_db.pool.connection() as db_connection:
+            cursor = db_connection.cursor()
+            try:
+                for db, name, rows in statements:
+                    if len(rows) > 0:
+                        cursor.executemany(db.statement(name), rows)
+                db_connection.commit()
+            except Exception:
+                db_connection.rollback()
+                raise
+            finally:
+                cursor.close()
@@ -1,13 +1,18 @@
 import datetime
+import functools
 import json
+import threading
+import time
 from pathlib import Path
 from typing import List
 
 import mysql.connector as mysql
+import pytest
 
 from pytrader import cfg as cfg
 from pytrader import common
 from pytrader.marketData.marketData_SQL import get_sql_window_data_as_json, update_window_data
+from pytrader import sql
 from pytrader.sql import sqlDb as sqlDb
 
 THIS_DIR = Path(__file__).parent
@@ -24,6 +29,267 @@ def test_sql_connection():
     assert db_connection.is_connected()
 
 
+class FakeCursor:
+    """
+    Cursor of a :class:`FakeConnection`, counts the statements it prepares and records what it runs on its connection.
+    """
+
+    def __init__(self, connection, prepared):
+        self.connection = connection
+        self.prepared = prepared
+        self.prepares = 0
+        self.statement = None
+        self.executed = []
+        self.description = [("order_id",)]
+
+    def execute(self, query, params):
+        self.connection.run([params])
+        if query is not self.statement:
+            self.statement = query
+            self.prepares += 1
+        self.executed.append(params)
+
+    def executemany(self, query, rows):
+        self.connection.run(rows)
+        self.connection.executed.append((query, list(rows)))
+
+    def fetchall(self):
+        return list(self.connection.rows)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    Stands in for a mysql connection in the tests, passed to SQLConnectionPool as connect.
+    """
+
+    def __init__(self, rows=(), error=None, bad_rows=None, **kwargs):
+        """
+        :param rows: rows every query returns.
+        :param error: exception the queries raise, if not None.
+        :param bad_rows: values of the queries that raise the error, every query if None.
+        """
+        self.rows = rows
+        self.error = error
+        self.bad_rows = bad_rows
+        self.connected = True
+        self.reconnects = 0
+        self.closed = False
+        self.cursors = []
+        self.executed = []
+        self.commits = []
+        self.rollbacks = 0
+
+    def run(self, rows):
+        if self.error is not None and (self.bad_rows is None or any(row in self.bad_rows for row in rows)):
+            raise self.error
+
+    def is_connected(self):
+        return self.connected
+
+    def reconnect(self, attempts):
+        self.connected = True
+        self.reconnects += 1
+
+    def cursor(self, prepared=False):
+        self.cursors.append(FakeCursor(self, prepared))
+        return self.cursors[-1]
+
+    def commit(self):
+        self.commits.append(self.executed)
+        self.executed = []
+
+    def rollback(self):
+        self.executed = []
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def test_sql_connection_pool():
+    """
+    Tests that connections are reused, nested borrows on a thread share a connection, borrowing blocks at the pool
+    size, stale connections are reconnected and connections that raise a connection error are replaced.
+    """
+    def borrow():
+        with pool.connection() as c:
+            borrowed.append(c)
+
+    pool = sql.SQLConnectionPool("host", "db", "user", "password", size=1, validation_interval=0.0,
+                                 connect=FakeConnection)
+    borrowed = []
+    with pool.connection() as first:
+        with pool.connection() as nested:
+            assert nested is first
+        waiting = threading.Thread(target=borrow)
+        waiting.start()
+        time.sleep(0.1)
+        assert borrowed == []
+    waiting.join(1.0)
+    assert borrowed == [first] and pool.open == 1 and pool.stats()["wait_max"] >= 0.1
+
+    first.connected = False
+    with pool.connection() as connection:
+        assert connection is first and first.reconnects == 1
+    with pytest.raises(mysql.errors.OperationalError):
+        with pool.connection():
+            raise mysql.errors.OperationalError()
+    with pool.connection() as connection:
+        assert connection is not first and first.closed
+    stats = pool.stats()
+    assert stats["created"] == 2 and stats["borrows"] == 5 and stats["reconnects"] == 1 and stats["discarded"] == 1
+    pool.close()
+
+
+def test_sql_prepared_statements():
+    """
+    Tests that the registered queries of a table are prepared once per pooled connection and run with bound values.
+    """
+    pool = sql.SQLConnectionPool("host", "db", "user", "password", size=1, connect=FakeConnection)
+    db: sqlDb.SQLDbTrades = sqlDb.SQLDbTrades(pool)
+    for order_id in [1, 2, 3]:
+        assert db.get_trade_by_order_id(order_id) is None
+    assert db.is_order_id_unique(4)
+    with pool.connection() as connection:
+        assert len(connection.cursors) == 1 and connection.cursors[0].prepared and connection.cursors[0].prepares == 1
+        assert connection.cursors[0].executed == [("1",), ("2",), ("3",), ("4",)]
+    assert pool.stats()["prepared"] == 1 and pool.stats()["statement_reuse_rate"] == 0.75
+
+
+def test_sql_trade_writer():
+    """
+    Tests that trade writes are batched into one transaction per flush with an executemany per statement, flushed on
+    size and deadline, and that closing a trade moves it between the tables in the same transaction.
+    """
+    pool = sql.SQLConnectionPool("host", "db", "user", "password", size=1, connect=FakeConnection)
+    open_trades_db, trades_db = sqlDb.SQLDbOpenTrades(pool), sqlDb.SQLDbTrades(pool)
+    writer = sql.SQLTradeWriter(open_trades_db, trades_db, batch_size=3, max_delay=60.0)
+    orders = []
+    for order_id in [1, 2]:
+        order = common.Order(common.OrderType.BUY, common.Asset("TEST", common.AssetType.PAPER_STOCK))
+        order.asset.id = order_id
+        writer.open_trade(order)
+        orders.append(order)
+    writer.update_trade(orders[0])
+    deadline = time.monotonic() + 1.0
+    while writer.pending > 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.stats()["batches"] == 1
+
+    writer.update_trade(orders[0])
+    writer.update_trade(orders[0])
+    writer.close_trade(orders[1])
+    assert writer.flush() and writer.pending == 0
+    with pool.connection() as connection:
+        first, second = connection.commits
+    assert [query for query, _ in first] == [open_trades_db.statement("commit_trade"),
+                                             open_trades_db.statement("update_trade")]
+    assert len(first[0][1]) == 2 and len(first[1][1]) == 1
+    assert second == [(open_trades_db.statement("update_trade"), [open_trades_db.update_trade_params(orders[0])]),
+                      (trades_db.statement("commit_trade"), [trades_db.commit_trade_params(orders[1])]),
+                      (open_trades_db.statement("delete_trade"), [("2",)])]
+    writer.close()
+
+
+def test_sql_trade_writer_failures():
+    """
+    Tests that a batch rejected by the server is written one write at a time so only the bad write is dropped, and that
+    a batch that loses its connection is kept queued to be retried.
+    """
+    pool = sql.SQLConnectionPool("host", "db", "user", "password", size=1, connect=FakeConnection)
+    open_trades_db, trades_db = sqlDb.SQLDbOpenTrades(pool), sqlDb.SQLDbTrades(pool)
+    writer = sql.SQLTradeWriter(open_trades_db, trades_db, batch_size=10, max_delay=60.0)
+    orders = []
+    for order_id in [1, 2, 3]:
+        order = common.Order(common.OrderType.BUY, common.Asset("TEST", common.AssetType.PAPER_STOCK))
+        order.asset.id = order_id
+        orders.append(order)
+    with pool.connection() as connection:
+        connection.error = mysql.errors.DataError()
+        connection.bad_rows = [open_trades_db.commit_trade_params(orders[1])]
+    for order in orders:
+        writer.open_trade(order)
+    assert not writer.flush() and writer.pending == 0
+    assert writer.dropped == [(sql.SQLTradeWrite.OPEN, orders[1])]
+    assert [rows for commit in connection.commits for _, rows in commit] == \
+           [[open_trades_db.commit_trade_params(orders[0])], [open_trades_db.commit_trade_params(orders[2])]]
+
+    connection.error, connection.bad_rows = mysql.errors.OperationalError(), None
+    writer.close_trade(orders[0])
+    assert not writer.flush() and writer.pending == 1
+    # the connection that failed is replaced, and the retry goes through.
+    assert writer.flush() and writer.pending == 0
+    stats = writer.stats()
+    assert stats["writes"] == 3 and stats["failures"] == 2 and stats["dropped"] == 1
+    writer.close()
+
+
+def test_sql_threshold_cache():
+    """
+    Tests that thresholds are served from the cache once warmed, refreshed in bulk with the rows updated since the
+    newest seen once expired, created on a miss, and defaulted without retrying when they can't be created.
+    """
+    class ThresholdsDb:
+        def __init__(self):
+            self.rows = {"TSLA": (0.6, -0.4, datetime.datetime(2022, 1, 1)),
+                         "AAPL": (0.7, -0.3, datetime.datetime(2022, 1, 2))}
+            self.requests = []
+
+        def get_thresholds(self):
+            self.requests.append("all")
+            return [(name, buy, sell, last_updated) for name, (buy, sell, last_updated) in self.rows.items()]
+
+        def get_thresholds_updated_since(self, last_updated):
+            self.requests.append(last_updated)
+            return [(name, buy, sell, updated) for name, (buy, sell, updated) in self.rows.items()
+                    if updated >= last_updated]
+
+        def get_threshold(self, asset):
+            self.requests.append(asset.name)
+            if asset.name == "FAIL":
+                return None
+            self.rows[asset.name] = (1.0, -1.0, datetime.datetime(2022, 1, 3))
+            return 1.0, -1.0
+
+    db = ThresholdsDb()
+    cache = sql.SQLThresholdCache(db, ttl=60.0, negative_ttl=60.0)
+    cache.warm()
+    tsla, amzn, fail = [common.Asset(name, common.AssetType.PAPER_STOCK) for name in ["TSLA", "AMZN", "FAIL"]]
+    assert [cache.get_threshold(tsla) for _ in range(3)] == [(0.6, -0.4)] * 3
+    assert cache.get_threshold(amzn) == (1.0, -1.0) and cache.get_threshold(amzn) == (1.0, -1.0)
+    assert cache.get_threshold(fail) == (1.0, -1.0) and cache.get_threshold(fail) == (1.0, -1.0)
+    assert db.requests == ["all", "AMZN", "FAIL"] and cache.hits == 5 and cache.misses == 2
+
+    db.rows["TSLA"] = (0.5, -0.5, datetime.datetime(2022, 1, 4))
+    cache = sql.SQLThresholdCache(db, ttl=0.0)
+    cache.warm()
+    db.rows["TSLA"] = (0.4, -0.6, datetime.datetime(2022, 1, 5))
+    assert cache.get_threshold(tsla) == (0.4, -0.6)
+    assert db.requests[-2:] == ["all", datetime.datetime(2022, 1, 4)] and cache.refreshes == 1
+
+
+def test_sql_threshold_cache_failing_pool():
+    """
+    Tests that the thresholds table returns None when an asset's entry can't be read or created, and that the cache
+    then defaults it for the negative time to live rather than retrying.
+    """
+    tsla = common.Asset("TSLA", common.AssetType.PAPER_STOCK)
+    failing = sql.SQLConnectionPool("host", "db", "user", "password", size=1,
+                                    connect=functools.partial(FakeConnection, error=mysql.errors.ProgrammingError()))
+    assert sqlDb.SQLDbBuySellThresholds(failing).get_threshold(tsla) is None
+    # the entry is created, but the read after it still finds no row.
+    empty = sql.SQLConnectionPool("host", "db", "user", "password", size=1, connect=FakeConnection)
+    assert sqlDb.SQLDbBuySellThresholds(empty).get_threshold(tsla) is None
+
+    thresholds_db = sqlDb.SQLDbBuySellThresholds(failing)
+    cache = sql.SQLThresholdCache(thresholds_db, ttl=60.0, negative_ttl=60.0)
+    assert cache.get_threshold(tsla) == (1.0, -1.0) and cache.get_threshold(tsla) == (1.0, -1.0)
+    assert cache.misses == 1 and cache.hits == 1
+
+
 @common.timed
 def test_sql_table_windows_data():
     """
@@ -230,17 +496,23 @@ def test_sql_open_trades_unique_id():
 
 
 @common.timed
-def test_sql_open_trades_generate_unique_id():
+def test_sql_open_trades_max_order_ids():
     asset_name: str = "TEST"
-    order_id: int = 0
     # commit trade to db
     sql_db: sqlDb.SQLDbOpenTrades = sqlDb.SQLDbOpenTrades()
     order: common.Order = common.Order(common.OrderType.BUY, common.Asset(asset_name, common.AssetType.PAPER_STOCK))
     order.asset.qty = 1.23
-    order.asset.id = order_id
+    order.asset.id = common.OrderIdGenerator().next_id(order.type)
     order.asset.trade_intent = common.TradeIntent.SHORT_TRADE
-    new_id: int = sql_db.generate_new_asset_id(order)
-    assert new_id != 0
+    response: sqlDb.SQLQueryResponseType = sql_db.commit_trade(order)
+    assert response == sqlDb.SQLQueryResponseType.SUCCESSFUL
+
+    # the new id is the largest buy id.
+    assert order.asset.id in sql_db.get_max_order_ids()
+
+    # delete created trade from db
+    delete_successful = sql_db.delete_trade(order)
+    assert delete_successful == sqlDb.SQLQueryResponseType.SUCCESSFUL
 
 
 @common.timed
@@ -1,7 +1,13 @@
+import multiprocessing
+import os
+import shutil
+import time
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
+from pydispatch import dispatcher
 
 from pytrader import common
 from pytrader import marketData
@@ -91,3 +97,262 @@ def test_window_data():
     indicator = common.Indicator.EMA
     window = marketData.get_window(indicator, trade_intent, STOCK_NAME, str(WINDOWS_TEST_JSON_PATH))
     assert window == 7
+
+
+def test_bar_cache():
+    """
+    Tests that the bar cache only fetches once per key, and that it expires and evicts entries.
+    """
+    fetch_count = {"n": 0}
+
+    def fetch():
+        fetch_count["n"] += 1
+        return STOCK_DATA
+
+    cache = marketData.BarCache(ttl=60, max_size=2)
+    for _ in range(6):
+        cache.get(STOCK_NAME, fetch)
+    assert fetch_count["n"] == 1 and cache.hits == 5 and cache.misses == 1
+    assert cache.bars_saved == 5 * len(STOCK_DATA)
+
+    cache.get("AAPL", fetch)
+    cache.get("AMZN", fetch)
+    assert len(cache) == 2 and cache.evictions == 1
+
+    expired_cache = marketData.BarCache(ttl=0)
+    expired_cache.get(STOCK_NAME, fetch)
+    expired_cache.get(STOCK_NAME, fetch)
+    assert expired_cache.misses == 2 and expired_cache.expirations == 1
+
+
+def test_window_registry(tmp_path):
+    """
+    Tests that the window registry parses the windows file once and only reloads it when it changes.
+    """
+    windows_file: Path = tmp_path / "windows.json"
+    shutil.copy(WINDOWS_TEST_JSON_PATH, windows_file)
+    registry = marketData.WindowRegistry(windows_file)
+    for _ in range(100):
+        assert registry.get(STOCK_NAME, common.Indicator.EMA, common.TradeIntent.SHORT_TRADE) == 7
+    assert registry.get(STOCK_NAME, common.Indicator.MACD, common.TradeIntent.LONG_HOLD) == (12, 26, 9)
+    assert registry.get("NOT_A_TICKER", common.Indicator.EMA, common.TradeIntent.SHORT_TRADE) is None
+    assert registry.load_count == 1
+
+    # updating the local stores should force a reload.
+    dispatcher.send(response_type=common.ResponseType.UPDATE, signal=common.Signal.SQL_MANAGER.value,
+                    sender=common.Sender.SQL_MANAGER.value)
+    registry.get(STOCK_NAME, common.Indicator.EMA, common.TradeIntent.SHORT_TRADE)
+    assert registry.load_count == 2
+
+    # as should a change to the file.
+    mtime = os.stat(windows_file).st_mtime_ns + 1_000_000_000
+    os.utime(windows_file, ns=(mtime, mtime))
+    reloading_registry = marketData.WindowRegistry(windows_file, mtime_check_interval=0)
+    reloading_registry.get(STOCK_NAME, common.Indicator.EMA, common.TradeIntent.SHORT_TRADE)
+    os.utime(windows_file, ns=(mtime + 1_000_000_000, mtime + 1_000_000_000))
+    reloading_registry.get(STOCK_NAME, common.Indicator.EMA, common.TradeIntent.SHORT_TRADE)
+    assert reloading_registry.load_count == 2
+
+
+def test_batch_indicators():
+    """
+    Tests that the multi-ticker indicators match the single ticker methods for every column.
+    """
+    closes = STOCK_DATA.loc[:, 'Adj Close'].to_numpy()
+    volumes = STOCK_DATA.loc[:, 'Volume'].to_numpy()
+    matrix = np.column_stack([closes, closes[::-1], closes * 0.5])
+    tickers = ["TSLA", "REVERSED", "HALVED"]
+    batch = marketData.compute_batch_indicators(tickers, matrix, np.column_stack([volumes] * 3), sma_window=7,
+                                                ema_window=7, rsi_window=7, bollinger_window=20)
+    assert batch.sma.shape == matrix.shape and batch.signal.shape == (len(tickers),)
+    for i in range(len(tickers)):
+        data = pd.DataFrame({'Adj Close': matrix[:, i]})
+        np.testing.assert_allclose(batch.sma[:, i], marketData.get_SMA(7, data.copy()), rtol=1e-9)
+        np.testing.assert_allclose(batch.ema[:, i], marketData.get_EMA(7, data.copy()), rtol=1e-9)
+        np.testing.assert_allclose(batch.rsi[:, i], marketData.get_RSI(7, data.copy()), rtol=1e-9)
+        bollinger = marketData.append_bollinger(20, data.copy())
+        np.testing.assert_allclose(batch.bollinger_upper[:, i], bollinger['upper_bb'], rtol=1e-9)
+        np.testing.assert_allclose(batch.bollinger_lower[:, i], bollinger['lower_bb'], rtol=1e-9)
+    assert batch.signal.tolist() == [int(batch.ema[-1, i] > batch.sma[-1, i]) for i in range(len(tickers))]
+
+
+def pandas_ema(values, window: int) -> pd.Series:
+    """
+    EMA of a column in pandas, seeded with the mean of its first window without a NaN and skipping later NaNs.
+    """
+    series = pd.Series(values)
+    start = int(series.notna().rolling(window).sum().eq(window).to_numpy().argmax())
+    seeded = series.iloc[start:].copy()
+    seeded.iloc[0] = series.iloc[start - window + 1:start + 1].mean()
+    return seeded.ewm(span=window, adjust=False, ignore_na=True).mean().reindex(series.index)
+
+
+def test_batch_indicators_nan():
+    """
+    Tests that a missing close only spoils the SMA and standard deviation of the windows that hold it, and that the EMA
+    and MACD carry on across it and start from the first full window of a ticker whose history starts later, as in
+    pandas.
+    """
+    closes = STOCK_DATA.loc[:, 'Adj Close'].to_numpy()
+    matrix = np.column_stack([closes, closes[::-1], closes])
+    matrix[[0, 30, 31, 100], 0] = np.nan
+    matrix[-1, 1] = np.nan
+    matrix[:40, 2] = np.nan
+    rolling = pd.DataFrame(matrix).rolling(20)
+    np.testing.assert_allclose(marketData.batch_sma(matrix, 20), rolling.mean().to_numpy(), rtol=1e-9)
+    np.testing.assert_allclose(marketData.batch_rolling_std(matrix, 20), rolling.std().to_numpy(), rtol=1e-9)
+    assert not np.isnan(marketData.batch_sma(matrix, 20)[-2]).any()
+
+    ema = marketData.batch_ema(matrix, 5)
+    macd, histogram, signal = marketData.batch_macd(matrix, 12, 26, 9)
+    assert not np.isnan(ema[-3:]).any() and not np.isnan(signal[-3:]).any()
+    for i in range(matrix.shape[1]):
+        np.testing.assert_allclose(ema[:, i], pandas_ema(matrix[:, i], 5), rtol=1e-9)
+        expected_macd = pandas_ema(matrix[:, i], 12) - pandas_ema(matrix[:, i], 26)
+        np.testing.assert_allclose(macd[:, i], expected_macd, rtol=1e-9)
+        np.testing.assert_allclose(signal[:, i], pandas_ema(expected_macd, 9), rtol=1e-9)
+
+
+def test_indicator_plan():
+    """
+    Tests that the indicator plan matches the single indicator methods and computes shared intermediates once.
+    """
+    plan = marketData.IndicatorPlan([(common.Indicator.SMA, 20), (common.Indicator.BOLLINGER, 20),
+                                     (common.Indicator.EMA, 12), (common.Indicator.MACD, (12, 26, 9)),
+                                     (common.Indicator.RSI, 7), (common.Indicator.VOLUME, 7)])
+    data = STOCK_DATA.copy()
+    results = plan.execute(data)
+    assert data.columns.tolist() == STOCK_DATA.columns.tolist()
+    assert len(plan.computed_nodes) == len(set(plan.computed_nodes)) == len(plan.nodes())
+    assert ("rolling_mean", 20) in plan.computed_nodes and ("ema", 12) in plan.computed_nodes
+    np.testing.assert_allclose(results[(common.Indicator.SMA, 20)], marketData.get_SMA(20, data.copy()), rtol=1e-9)
+    np.testing.assert_allclose(results[(common.Indicator.EMA, 12)], marketData.get_EMA(12, data.copy()), rtol=1e-9)
+    np.testing.assert_allclose(results[(common.Indicator.RSI, 7)], marketData.get_RSI(7, data.copy()), rtol=1e-9)
+    bollinger = marketData.append_bollinger(20, data.copy())
+    np.testing.assert_allclose(results[(common.Indicator.BOLLINGER, 20)]['upper_bb'], bollinger['upper_bb'], rtol=1e-9)
+    np.testing.assert_allclose(results[(common.Indicator.BOLLINGER, 20)]['lower_bb'], bollinger['lower_bb'], rtol=1e-9)
+    macd = results[(common.Indicator.MACD, (12, 26, 9))]
+    np.testing.assert_allclose(macd['MACD_12_26_9'].iloc[-1], 6.8590096786056165, rtol=1e-9)
+    np.testing.assert_allclose(macd['MACDs_12_26_9'].iloc[-1], -4.753227581486499, rtol=1e-9)
+
+
+def test_bar_store(tmp_path):
+    """
+    Tests that bars ingested into the bar store are appended once and read back by date range.
+    """
+    store = marketData.BarStore(tmp_path)
+    assert store.ingest_csv(STOCK_NAME, DATA_DIR_PATH / "TSLA_historical_data.csv") == len(STOCK_DATA)
+    assert store.ingest_csv(STOCK_NAME, DATA_DIR_PATH / "TSLA_historical_data.csv") == 0
+    assert store.tickers() == [STOCK_NAME] and store.length(STOCK_NAME) == len(STOCK_DATA)
+    np.testing.assert_allclose(store.read_frame(STOCK_NAME)['adjclose'], STOCK_DATA['Adj Close'])
+    bars = store.read(STOCK_NAME, "2021-01-05", "2021-01-07")
+    assert bars["close"].tolist() == STOCK_DATA['Close'].iloc[1:4].tolist()
+
+    # an interrupted append leaves the columns with different lengths, the partial bar is ignored.
+    with open(store.path(STOCK_NAME) / "close.bin", "ab") as file:
+        file.write(np.zeros(1).tobytes())
+    assert store.length(STOCK_NAME) == len(STOCK_DATA)
+    extra = STOCK_DATA.iloc[-1:].copy()
+    extra['Date'] = "2022-01-03"
+    assert store.append(STOCK_NAME, extra) == 1
+    assert store.read_frame(STOCK_NAME, start="2022-01-01")['close'].tolist() == [STOCK_DATA['Close'].iloc[-1]]
+
+
+def test_bar_store_nasdaq_csv(tmp_path):
+    """
+    Tests that the nasdaq export, with '$' prefixed prices and mm/dd/yyyy dates newest first, is stored oldest first.
+    """
+    store = marketData.BarStore(tmp_path)
+    assert store.ingest_csv(STOCK_NAME, DATA_DIR_PATH / "TSLA_nasdaq_data.csv") == 10
+    bars = store.read_frame(STOCK_NAME)
+    assert bars.index[0] == pd.Timestamp("2022-05-20") and bars.index[-1] == pd.Timestamp("2022-06-03")
+    assert bars.index.is_monotonic_increasing
+    assert bars["close"].iloc[0] == 663.9 and bars["adjclose"].iloc[-1] == 703.55
+    assert bars["volume"].iloc[-1] == 37464580
+    assert store.read(STOCK_NAME, "2022-05-31", "2022-06-01")["ts"].tolist() == [1653955200, 1654041600]
+
+
+def test_bar_sync(tmp_path):
+    """
+    Tests that a sync only requests bars after the last stored bar, and that holes in the history are backfilled.
+    """
+    history = marketData.load_csv(DATA_DIR_PATH / "TSLA_historical_data.csv")
+    requests = []
+
+    def fetch(ticker, start_date, end_date, interval):
+        requests.append((start_date, end_date))
+        data = history if start_date is None else history[history.index >= start_date]
+        return data if end_date is None else data[data.index < end_date]
+
+    store = marketData.BarStore(tmp_path)
+    store.append(STOCK_NAME, pd.concat([history.iloc[:100], history.iloc[110:-5]]))
+    sync = marketData.BarSync(store, fetch)
+    assert sync.sync(STOCK_NAME) == 5 and sync.bars_fetched == 6
+    assert len(sync.find_gaps(STOCK_NAME)) == 1
+    assert sync.backfill(STOCK_NAME) == 10 and sync.find_gaps(STOCK_NAME) == []
+    assert sync.backfill(STOCK_NAME) == 0 and len(requests) == 2
+    np.testing.assert_allclose(store.read_frame(STOCK_NAME)['close'], history['close'])
+
+
+def publish_constant_bars(name: str, updates: int):
+    """
+    writer for the shared bars test, publishes bars whose every value is the number of the update.
+    """
+    bars = marketData.SharedBars(name)
+    for update in range(1, updates + 1):
+        bars.publish(STOCK_NAME, constant_bars(update))
+    bars.close()
+
+
+def constant_bars(value: int) -> dict:
+    """
+    columns of 500 bars whose every value is the given one.
+    """
+    return {column: np.full(500, value, dtype=dtype) for column, dtype in marketData.barStore.BAR_COLUMNS.items()}
+
+
+def fetch_test_bars(ticker: str) -> pd.DataFrame:
+    """
+    fetch for the shared bars feeder test.
+    """
+    return marketData.load_csv(DATA_DIR_PATH / "TSLA_historical_data.csv")
+
+
+def test_shared_bars():
+    """
+    Tests that bars published to shared memory are read back zero-copy by other processes, and that a read never mixes
+    two updates.
+    """
+    history = marketData.load_csv(DATA_DIR_PATH / "TSLA_historical_data.csv")
+    bars = marketData.SharedBars(create=True, tickers=2, length=100)
+    try:
+        assert bars.read_frame(STOCK_NAME) is None
+        assert bars.publish(STOCK_NAME, history) == 100
+        reader = marketData.SharedBars(bars.name)
+        np.testing.assert_allclose(reader.read_frame(STOCK_NAME)['close'], history['close'].iloc[-100:])
+        assert reader.apply(STOCK_NAME, lambda columns: columns['close'].flags.writeable) is False
+
+        # the reads below only hold for constant bars, so they must be published before the writer gets going.
+        bars.publish(STOCK_NAME, constant_bars(0))
+        writer = multiprocessing.Process(target=publish_constant_bars, args=(bars.name, 2000))
+        writer.start()
+        while writer.is_alive():
+            low, high = reader.apply(STOCK_NAME, lambda columns: (columns['close'].min(), columns['volume'].max()))
+            assert low == high
+        writer.join()
+        assert reader.read(STOCK_NAME)['ts'][0] == 2000
+        reader.close()
+    finally:
+        bars.close()
+        bars.unlink()
+
+    feeder = marketData.SharedBarsFeeder(tickers=2, length=100, fetch=fetch_test_bars)
+    try:
+        feeder.add(STOCK_NAME)
+        deadline = time.monotonic() + 30
+        while STOCK_NAME not in feeder.bars and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert feeder.bars.tickers() == [STOCK_NAME]
+        assert feeder.bars.read(STOCK_NAME)['close'][-1] == history['close'].iloc[-1]
+    finally:
+        feeder.close()
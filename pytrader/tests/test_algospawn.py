@@ -1,5 +1,24 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
 import pytest
 
+from pytrader.algo import algo_ipc, algo_main
+from pytrader.algo.algo_forkserver import ForkServer, FORK_SERVER_SUPPORTED
+from pytrader.algo.algo_ipc import Channel, FrameDecoder, MessageType, decodeAllowanceRequest, \
+    decodeAllowanceResponse, encodeAllowanceRequest, encodeAllowanceResponse, encodeFrame
+from pytrader.algo.algo_pool import TickerState, TickerWorkerPool
+
+
+def count_analyses(state: TickerState) -> float:
+    """
+    analysis for the worker pool tests, the number of times the ticker has been analysed before.
+    """
+    return float(state.analyses)
+
 
 @pytest.mark.xfail
 def test_spawn_buy():
@@ -14,3 +33,140 @@ def test_spawn_sell():
 @pytest.mark.xfail
 def test_spawn_interpretMarket():
     pass
+
+
+def test_ticker_worker_pool():
+    """
+    tickers are analysed by the worker that owns them, which keeps their state between analyses and hands it over
+    when they are rebalanced onto another worker.
+    """
+    pool = TickerWorkerPool(2, analyse=count_analyses)
+    try:
+        names = ["TSLA", "AAPL", "AMZN", "BABA"]
+        for name in names:
+            pool.add(name)
+        assert len(pool) == 4
+        assert len(pool.tickers(0)) == 2 and len(pool.tickers(1)) == 2
+        for expected in range(2):
+            for name in names:
+                pool.submit(name)
+            results = []
+            while len(results) < len(names):
+                results += pool.results(timeout=5)
+            assert all(result.error is None for result in results)
+            assert all(result.worker == pool.owner(result.name) for result in results)
+            assert [result.confidence for result in results] == [expected] * len(names)
+
+        # empty a worker, the other's extra ticker moves over with its state.
+        for name in pool.tickers(1):
+            pool.remove(name)
+        assert pool.rebalance() == 1
+        assert len(pool.tickers(0)) == 1 and len(pool.tickers(1)) == 1
+        moved = pool.tickers(1)[0]
+        pool.submit(moved)
+        results = []
+        while len(results) == 0:
+            results = pool.results(timeout=5)
+        assert results[0].name == moved and results[0].worker == 1 and results[0].confidence == 2
+    finally:
+        pool.close()
+
+
+@pytest.mark.skipif(not FORK_SERVER_SUPPORTED, reason="the fork server needs linux.")
+def test_fork_server(tmp_path):
+    """
+    children forked by the fork server run their script with its arguments on their own stdin and stdout pipes.
+    """
+    script = tmp_path / "echo.py"
+    script.write_text("import sys\nsys.stdout.write(sys.argv[1] + sys.stdin.readline())\n")
+    server = ForkServer()
+    try:
+        children = [server.spawn(str(script), [name], name=name) for name in ["TSLA", "AAPL"]]
+        assert len({child.pid for child in children}) == 2
+        for child in children:
+            assert child.poll() is None
+            child.stdin.write(b" ready\n")
+            assert child.stdout.readline() == f"{child.name} ready\n".encode()
+            assert child.wait(5) == 0
+    finally:
+        server.close()
+
+
+def test_ipc_frame_decoder():
+    """
+    frames are decoded however the stream is split up.
+    """
+    frames = encodeFrame(MessageType.ALLOWANCE, 7, encodeAllowanceRequest("TSLA", 0.5)) + \
+        encodeFrame(MessageType.ERROR, 8, b"")
+    decoder = FrameDecoder()
+    decoded = []
+    for i in range(len(frames)):
+        decoded += decoder.feed(frames[i:i + 1])
+    assert [(frame.type, frame.request_id) for frame in decoded] == [(MessageType.ALLOWANCE, 7), (MessageType.ERROR, 8)]
+    assert decodeAllowanceRequest(decoded[0].payload) == ("TSLA", 0.5)
+
+
+def test_ipc_allowance_round_trip():
+    """
+    allowance requests are answered as soon as the parent reads them, rather than after a fixed sleep.
+    """
+    child_read, parent_write = os.pipe()
+    parent_read, child_write = os.pipe()
+    parent, child = Channel(parent_read, parent_write), Channel(child_read, child_write)
+
+    def answer():
+        try:
+            while True:
+                for request in parent.receive(None):
+                    name, confidence = decodeAllowanceRequest(request.payload)
+                    parent.respond(request, encodeAllowanceResponse(confidence * 100))
+        except EOFError:
+            pass
+
+    thread = threading.Thread(target=answer, daemon=True)
+    thread.start()
+    try:
+        before = time.perf_counter()
+        for i in range(1000):
+            request_id = child.request(MessageType.ALLOWANCE, encodeAllowanceRequest("TSLA", i / 1000))
+            assert decodeAllowanceResponse(child.wait(request_id, 5).payload) == pytest.approx(i / 10)
+        assert time.perf_counter() - before < 5
+        # requests are matched to their responses by id, whatever order they are collected in.
+        first = child.request(MessageType.ALLOWANCE, encodeAllowanceRequest("AAPL", 0.1))
+        second = child.request(MessageType.ALLOWANCE, encodeAllowanceRequest("AAPL", 0.2))
+        assert decodeAllowanceResponse(child.wait(second, 5).payload) == pytest.approx(20)
+        assert decodeAllowanceResponse(child.wait(first, 5).payload) == pytest.approx(10)
+        assert child.poll(second) is None
+    finally:
+        os.close(child_write)
+        thread.join(5)
+        for fd in [child_read, parent_write, parent_read]:
+            os.close(fd)
+
+
+def test_subprocess_selector():
+    """
+    one selector answers every subprocess' requests as they arrive and sees them exit, without a thread per subprocess.
+    """
+    # asks for something algo_main doesn't know, and exits with the type of the answer.
+    script = "import sys\n" \
+             "from pytrader.algo.algo_ipc import Channel\n" \
+             "channel = Channel.fromStdio()\n" \
+             "sys.exit(channel.wait(channel.request(99), 5).type)\n"
+    selector = algo_main.SubprocessSelector()
+    threads = threading.active_count()
+    children = []
+    for name in ["TSLA", "AAPL", "AMZN"]:
+        process = algo_main.NamedPopen([sys.executable, "-c", script], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       bufsize=0, name=name)
+        child = algo_main.Subprocess(name, process, algo_ipc.Channel(process.stdout.fileno(), process.stdin.fileno()))
+        selector.register(child)
+        children.append(child)
+    assert threading.active_count() == threads
+    exited = []
+    deadline = time.monotonic() + 30
+    while len(exited) < len(children) and time.monotonic() < deadline:
+        exited += selector.select(1)
+    assert sorted(child.name for child in exited) == ["AAPL", "AMZN", "TSLA"]
+    assert all(child.process.returncode == algo_ipc.MessageType.ERROR for child in exited)
+    assert len(selector) == 0
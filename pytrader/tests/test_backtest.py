@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from pytrader import common
+from pytrader.backtest import Backtest, WindowOptimiser, determine_buy_or_sell, walk_forward_segments
+
+DIR_PATH: Path = Path(__file__).parent
+DATA_DIR_PATH: Path = DIR_PATH / 'data'
+STOCK_DATA = pd.read_csv(DATA_DIR_PATH / "TSLA_historical_data.csv")
+STOCK_NAME: str = "TSLA"
+WINDOWS_TEST_JSON_PATH: Path = DIR_PATH / "data/test_algo_windows.json"
+INDICATORS = [common.Indicator.SMA, common.Indicator.EMA, common.Indicator.RSI, common.Indicator.MACD,
+              common.Indicator.BOLLINGER, common.Indicator.VOLUME]
+
+
+def test_determine_buy_or_sell():
+    """
+    Tests the array threshold rule against the single value rule.
+    """
+    signal = determine_buy_or_sell(np.array([0.9, 0.5, 0.0, -0.5, -0.9]), 0.5, -0.5)
+    assert signal.tolist() == [1, 1, 0, -1, -1]
+
+
+@common.timed
+def test_backtest():
+    """
+    Tests that the backtest's equity curve, trades and statistics agree with each other.
+    """
+    backtest = Backtest.from_windows(STOCK_NAME, common.TradeIntent.SHORT_TRADE, INDICATORS, 0.3, -0.3,
+                                     WINDOWS_TEST_JSON_PATH)
+    result = backtest.run(STOCK_DATA)
+    assert len(result.equity) == len(STOCK_DATA) and result.position.iloc[0] == 0.0
+    assert set(result.position.unique()) <= {0.0, 1.0}
+    # a position is only taken on the bar after a buy signal.
+    entries = np.flatnonzero(np.diff(result.position.to_numpy(), prepend=0.0) > 0)
+    assert (result.signal.to_numpy()[entries - 1] == 1).all()
+    assert result.stats["trade_count"] == len(result.trades) == len(entries)
+    np.testing.assert_allclose(result.equity.iloc[-1], 10000.0 * np.prod(1.0 + result.trades["return"]))
+    assert result.stats["max_drawdown"] <= 0.0
+
+
+def test_walk_forward_segments():
+    """
+    Tests that every test segment directly follows its train segment and the test segments tile the end of history.
+    """
+    folds = walk_forward_segments(len(STOCK_DATA), 100, 30)
+    assert folds[-1][1][1] == len(STOCK_DATA)
+    for (train_start, train_end), (test_start, test_end) in folds:
+        assert train_end - train_start == 100 and test_end - test_start == 30 and train_end == test_start
+
+
+@common.timed
+def test_window_optimiser(tmp_path):
+    """
+    Tests that the pooled optimiser matches the serial one and writes the winning windows back in the same schema.
+    """
+    grid = {common.Indicator.SMA: [5, 10, 20], common.Indicator.RSI: [7, 14],
+            common.Indicator.MACD: [(12, 26, 9), (8, 17, 9)]}
+    serial = WindowOptimiser(grid, train_bars=100, test_bars=30, max_workers=1)
+    pooled = WindowOptimiser(grid, train_bars=100, test_bars=30, max_workers=2, chunk_size=4)
+    result = serial.optimise(STOCK_NAME, common.TradeIntent.SHORT_TRADE, STOCK_DATA)
+    assert pooled.optimise(STOCK_NAME, common.TradeIntent.SHORT_TRADE, STOCK_DATA).windows == result.windows
+    assert result.points_evaluated == 12 and len(result.fold_test_scores) == len(result.fold_windows) == 5
+
+    windows_file = tmp_path / "windows.json"
+    shutil.copy(WINDOWS_TEST_JSON_PATH, windows_file)
+    WindowOptimiser.write_json(result, windows_file)
+    with open(windows_file) as json_file:
+        row = json.load(json_file)[0]
+    fast, slow, sig = result.windows[common.Indicator.MACD]
+    assert row["sma_short_trade"] == result.windows[common.Indicator.SMA] and row["sma_long_trade"] == 14
+    assert (row["macd_fast_short_trade"], row["macd_slow_short_trade"], row["macd_sig_short_trade"]) == (fast, slow,
+                                                                                                          sig)
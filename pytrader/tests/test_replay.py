@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import numpy as np
+
+from pytrader import common
+from pytrader.backtest import Backtest
+from pytrader.marketData.barStore import load_csv
+from pytrader.replay import MarketReplay
+
+DIR_PATH: Path = Path(__file__).parent
+DATA_DIR_PATH: Path = DIR_PATH / 'data'
+STOCK_DATA = load_csv(DATA_DIR_PATH / "TSLA_historical_data.csv")
+STOCK_NAME: str = "TSLA"
+WINDOWS = {common.Indicator.SMA: 10, common.Indicator.RSI: 14, common.Indicator.MACD: (12, 26, 9)}
+
+
+@common.timed
+def test_market_replay():
+    """
+    Tests that replaying the bars through the managers fills an order on the bar after every position change of the
+    backtest, and that the simulated exchange's cash and holdings add up.
+    """
+    replay = MarketReplay({STOCK_NAME: STOCK_DATA}, WINDOWS, 0.3, -0.3, initial_cash=1000000.0)
+    result = replay.run()
+    assert result.bars == result.inspections == len(STOCK_DATA)
+    assert result.orders == result.fills == len(result.trades) > 0
+    assert len(result.order_latency) == result.orders and result.stats["decisions_per_second"] > 0
+
+    position = Backtest(WINDOWS, 0.3, -0.3).run(STOCK_DATA).position.to_numpy()
+    changes = np.flatnonzero(np.diff(position, prepend=0.0))
+    assert result.trades["date"].tolist() == STOCK_DATA.index[changes].tolist()
+    assert result.trades["side"].tolist() == ["BUY" if position[i] == 1.0 else "SELL" for i in changes]
+
+    flows = result.trades["qty"] * result.trades["price"] * np.where(result.trades["side"] == "BUY", -1, 1)
+    assert np.isclose(replay.exchange.get_cash(), 1000000.0 + flows.sum())
+    assert np.isclose(result.final_equity, replay.exchange.equity())
+
+
+def test_market_replay_speed():
+    """
+    Tests that an accelerated replay is paced by the timestamps of the bars, and so takes longer than an unpaced one.
+    """
+    bars = STOCK_DATA.iloc[-40:]
+    # 40 daily bars in ~0.5s.
+    speed = (bars.index[-1] - bars.index[0]).total_seconds() / 0.5
+    result = MarketReplay({STOCK_NAME: bars}, WINDOWS, 0.3, -0.3, speed=speed).run()
+    unpaced = MarketReplay({STOCK_NAME: bars}, WINDOWS, 0.3, -0.3, speed=None).run()
+    assert result.wall_time >= 0.5 and result.wall_time > unpaced.wall_time
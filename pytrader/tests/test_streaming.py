@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import pandas as pd
+from ta.volume import on_balance_volume
+
+from pytrader import common
+from pytrader import marketData
+
+DIR_PATH: Path = Path(__file__).parent
+DATA_DIR_PATH: Path = DIR_PATH / 'data'
+STOCK_DATA = pd.read_csv(DATA_DIR_PATH / "TSLA_historical_data.csv")
+STOCK_NAME: str = "TSLA"
+WINDOWS_TEST_JSON_PATH: Path = DIR_PATH / "data/test_algo_windows.json"
+TOLERANCE: float = 1e-6
+
+
+def stream(indicator: marketData.StreamingIndicator) -> list:
+    """
+    Feeds the test data through the streaming indicator one bar at a time.
+    """
+    return [indicator.update(close, volume) for close, volume in zip(STOCK_DATA['Adj Close'], STOCK_DATA['Volume'])]
+
+
+def assert_matches(streamed: list, batch: pd.Series):
+    """
+    Asserts that the streamed values match the batch values, including where they are undefined.
+    """
+    assert len(streamed) == len(batch)
+    for streamed_value, batch_value in zip(streamed, batch):
+        if pd.isna(batch_value):
+            assert streamed_value is None
+        else:
+            assert abs(streamed_value - batch_value) < TOLERANCE
+
+
+def get_window(indicator: common.Indicator):
+    return marketData.get_window(indicator, common.TradeIntent.SHORT_TRADE, STOCK_NAME, str(WINDOWS_TEST_JSON_PATH))
+
+
+def test_streaming_sma():
+    window = get_window(common.Indicator.SMA)
+    assert_matches(stream(marketData.StreamingSMA(window)), marketData.get_SMA(window, STOCK_DATA.copy()))
+
+
+def test_streaming_ema():
+    window = get_window(common.Indicator.EMA)
+    assert_matches(stream(marketData.StreamingEMA(window)), marketData.get_EMA(window, STOCK_DATA.copy()))
+
+
+def test_streaming_rsi():
+    window = get_window(common.Indicator.RSI)
+    assert_matches(stream(marketData.StreamingRSI(window)), marketData.get_RSI(window, STOCK_DATA.copy()))
+
+
+def test_streaming_macd():
+    window_fast, window_slow, window_sig = get_window(common.Indicator.MACD)
+    streamed = stream(marketData.StreamingMACD(window_fast, window_slow, window_sig))
+    batch = marketData.get_MACD(window_fast, window_slow, window_sig, STOCK_DATA.copy())
+    suffix = f"_{window_fast}_{window_slow}_{window_sig}"
+    assert_matches([value[0] if value is not None else None for value in streamed], batch["MACD" + suffix])
+    assert_matches([value[1] if value is not None else None for value in streamed], batch["MACDh" + suffix])
+    assert_matches([value[2] if value is not None else None for value in streamed], batch["MACDs" + suffix])
+
+
+def test_streaming_bollinger():
+    window = get_window(common.Indicator.BOLLINGER)
+    streamed = stream(marketData.StreamingBollinger(window))
+    batch = marketData.append_bollinger(window, STOCK_DATA.copy())
+    assert_matches([value[0] if value is not None else None for value in streamed], batch["sma_" + str(window)])
+    assert_matches([value[1] if value is not None else None for value in streamed], batch["upper_bb"])
+    assert_matches([value[2] if value is not None else None for value in streamed], batch["lower_bb"])
+
+
+def test_streaming_obv():
+    batch = on_balance_volume(close=STOCK_DATA['Adj Close'], volume=STOCK_DATA['Volume'])
+    assert_matches(stream(marketData.StreamingOBV()), batch)
+
+
+def test_streaming_snapshot_restore():
+    """
+    Tests that an indicator restored from a snapshot carries on exactly where the original left off.
+    """
+    half = len(STOCK_DATA) // 2
+    closes = list(STOCK_DATA['Adj Close'])
+    volumes = list(STOCK_DATA['Volume'])
+    for indicator in [common.Indicator.SMA, common.Indicator.EMA, common.Indicator.RSI, common.Indicator.MACD,
+                      common.Indicator.BOLLINGER, common.Indicator.VOLUME]:
+        window = get_window(indicator)
+        original = marketData.create_streaming_indicator(indicator, window)
+        for close, volume in zip(closes[:half], volumes[:half]):
+            original.update(close, volume)
+        restored = marketData.create_streaming_indicator(indicator, window)
+        restored.restore(original.snapshot())
+        for close, volume in zip(closes[half:], volumes[half:]):
+            assert original.update(close, volume) == restored.update(close, volume)
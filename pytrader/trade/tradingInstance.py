@@ -6,7 +6,7 @@ from datetime import datetime
 
 from pytrader.common.indicator import Indicator
 from pytrader.common.tradeIntent import TradeIntent
-from pytrader.marketData.marketData import analyse
+from pytrader.marketData.marketData import analyse_indicators
 
 logging.basicConfig(filename='trade.log', format='%(name)s - %(levelname)s - %(message)s')
 
@@ -60,10 +60,7 @@ def interpretMarket(stock_name: str, trade_intent: TradeIntent, indicator_list:
     """
     logging.warning(
         '{} : {} started successfully'.format(datetime.now().strftime("%x %X"), stock_name))
-    confidence = 0
-    for i in indicator_list:
-        i_conf = analyse(stock_name, trade_intent, i)
-        confidence = confidence + i_conf
+    confidence = sum(analyse_indicators(stock_name, trade_intent, indicator_list).values())
 
     return confidence / len(indicator_list)
 
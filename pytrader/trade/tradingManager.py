@@ -1,7 +1,7 @@
 import datetime
 import random
 import time
-from typing import Optional, List
+from typing import Callable, Optional, List
 
 from pydispatch import dispatcher
 
@@ -51,8 +51,16 @@ class TradingManager:
     trades.
     """
 
-    def __init__(self):
+    def __init__(self, run_type: Optional[common.RunType] = common.RunType.PRODUCTION,
+                 analyser: Optional[Callable[[common.Asset], float]] = None):
+        """
+        :param run_type: run type, REPLAY connects to the Exchange Manager without blocking and only inspects the
+        assets passed to inspect.
+        :param analyser: returns the confidence of an asset, defaults to analyse_asset.
+        """
         self.__threads = None
+        self.__run_type: common.RunType = run_type
+        self.__analyser: Callable[[common.Asset], float] = analyser if analyser is not None else analyse_asset
         self.__status = common.State.STARTING
         self.__assets: Optional[List[common.Asset]] = None
         self.__sender: common.Sender = common.Sender.TRADE_MANAGER
@@ -71,6 +79,10 @@ class TradingManager:
         Log.d("TradingManager is starting.")
         dispatcher.connect(self.__dispatcher_receive, signal=common.Signal.EXCHANGE_MANAGER.value,
                            sender=common.Signal.EXCHANGE_MANAGER.value)
+        if self.__run_type == common.RunType.REPLAY:
+            # the replay feeds the assets to inspect, one bar at a time.
+            self.__status = common.State.RUNNING
+            return
 
         # TODO - probe ALL exchanges for asset list
         self.__status = common.State.STARTING
@@ -131,6 +143,21 @@ class TradingManager:
         """
         return self.__status == common.State.STOPPED
 
+    def stop(self):
+        """
+        Stops the manager and disconnects it from the Exchange Manager.
+        """
+        self.__status = common.State.STOPPED
+        dispatcher.disconnect(self.__dispatcher_receive, signal=common.Signal.EXCHANGE_MANAGER.value,
+                              sender=common.Signal.EXCHANGE_MANAGER.value)
+
+    def inspect(self, asset: common.Asset):
+        """
+        Inspects the asset for a buy or sell opportunity, starting with a request for its thresholds.
+        :param asset: asset being evaluated.
+        """
+        self.__request_asset_thresholds(asset)
+
     def request_exchange_manager_status(self):
         """
         Requests the status of the exchange manager.
@@ -159,7 +186,7 @@ class TradingManager:
             if order.status == common.OrderStatus.PROCESSING or order.status == common.OrderStatus.FILLED:
                 return
             if self.__assets is None:
-                self.__assets = List[order.asset]
+                self.__assets = [order.asset]
             else:
                 self.__assets.append(order.asset)
 
@@ -233,7 +260,7 @@ class TradingManager:
         :param buy_threshold: the buy threshold from the SQL table
         :param sell_threshold: the sell threshold from the SQL table
         """
-        confidence: float = analyse_asset(asset)
+        confidence: float = self.__analyser(asset)
         order_type: common.OrderType = determine_buy_or_sell(confidence, buy_threshold, sell_threshold)
         if order_type == common.OrderType.BUY or order_type == common.OrderType.SELL:
             # we send a request for an allowance to the EM here, then on response of the allowance,